@@ -0,0 +1,325 @@
+"""
+data_manager benchmarks on a seeded local SQLite database.
+
+For each size (number of registrations) a fresh database is seeded, then every
+public data_manager function is timed (micro benchmarks, plus "cold" variants with
+the shared caches cleared) along with a few page-shaped flows (macro benchmarks).
+Results are written as JSON and can be compared against a stored baseline:
+
+    python benchmark.py --sizes 100 10000 1000000 --out bench.json
+    python benchmark.py --sizes 100 10000 --baseline bench.json --threshold 0.25
+
+The comparison fails (exit status 1) when a case's median is more than `threshold`
+slower than the baseline's, ignoring differences below `min_delta_ms`.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import data_manager as dm
+from db_backends import SQLiteBackend
+from loadtest import percentile
+
+SIZES = (100, 10_000, 1_000_000)
+
+BENCH_DEFAULTS = {
+    "repeat": 30,      # timed calls per case (fewer if max_time runs out)
+    "max_time": 1.0,   # seconds per case
+    "activities": 10,  # synthetic activities the registrations are spread over
+    "teams": 20,
+    "games": 10,
+    "seed": 0,
+}
+
+SEED_BATCH = 50_000
+
+
+@contextmanager
+def benchmark_activities(size, count):
+    """
+    Swaps dm.ACTIVITIES for `count` synthetic activities with room for `size`
+    registrations (plus headroom, so timed signups still succeed).
+    """
+    original = dm.ACTIVITIES
+    timeslots = len(dm.get_timeslots(20))
+    slots = size // (count * timeslots) + 1000
+    dm.ACTIVITIES = [
+        {"name": f"Bench Activity {i}", "slots": slots, "duration": 20, "id": f"bench_{i}"} for i in range(count)
+    ]
+    try:
+        yield dm.ACTIVITIES
+    finally:
+        dm.ACTIVITIES = original
+
+
+def seed_database(size, settings):
+    """
+    Fills the current (empty) database with `size` participants and registrations
+    (about half checked in), plus teams, games and a full score matrix. Returns
+    samples of ids and passphrases for the benchmark cases.
+    """
+    rng = random.Random(settings["seed"])
+    slots = [(activity["name"], timeslot) for activity in dm.ACTIVITIES for timeslot in dm.get_timeslots(activity["duration"])]
+    now = datetime.now()
+    with dm.pooled_connection() as conn:
+        cursor = conn.cursor()
+        for start in range(0, size, SEED_BATCH):
+            batch = range(start, min(size, start + SEED_BATCH))
+            cursor.executemany(
+                "INSERT INTO participants (id, name, created_time) VALUES (?, ?, ?)",
+                [(f"bench-user-{i}", f"Bench User {i}", now) for i in batch]
+            )
+            cursor.executemany(
+                "INSERT INTO registrations (user_id, participant_name, activity, timeslot, registration_passphrase, "
+                "registration_time, checked_in) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(f"bench-user-{i}", f"Bench User {i}", *slots[i % len(slots)], f"bench-phrase-{i}", now, i % 2) for i in batch]
+            )
+        conn.commit()
+        cursor.execute("SELECT id FROM registrations")
+        registration_ids = [row[0] for row in cursor.fetchall()]
+    dm.reconcile_slot_counters() # Builds the slot counters from the seeded rows
+
+    for i in range(settings["teams"]):
+        dm.add_team(f"Bench Team {i}")
+    for i in range(settings["games"]):
+        dm.add_competitive_game(f"Bench Game {i}")
+    games, teams = dm.get_competitive_games(), dm.get_teams()
+    dm.update_scores_bulk([(game.id, team.id, rng.randint(0, 100)) for game in games for team in teams])
+
+    sample = rng.sample(range(size), min(size, 1000))
+    return {
+        "slots": slots,
+        "registration_ids": registration_ids,
+        "user_ids": [f"bench-user-{i}" for i in sample],
+        "passphrases": [f"bench-phrase-{i}" for i in sample],
+        "game_ids": [game.id for game in games],
+        "team_ids": [team.id for team in teams],
+    }
+
+
+def benchmark_cases(seeded, rng):
+    """(name, call, setup) for every case; setup() returns the call's arguments and isn't timed."""
+    new_users = (f"bench-new-{i}" for i in itertools.count())
+    slots, activities = seeded["slots"], [activity["name"] for activity in dm.ACTIVITIES]
+    pick = lambda key: (lambda: (rng.choice(seeded[key]),))
+    no_args = lambda: ()
+
+    def cold(setup=no_args):
+        # Clear the shared caches first, so the call hits the database
+        def prepare():
+            dm.invalidate_availability()
+            return setup()
+        return prepare
+
+    def new_booking():
+        activity, timeslot = rng.choice(slots)
+        return (next(new_users), "Bench New", activity, timeslot)
+
+    def fresh_registration():
+        registration_id, _, _ = dm.add_registration(*new_booking())
+        return (registration_id,)
+
+    def score_change():
+        return ([(rng.choice(seeded["game_ids"]), rng.choice(seeded["team_ids"]), rng.randint(0, 100))],)
+
+    def signup_flow(user_id, name, activity, timeslot):
+        dm.fetch_together(
+            lambda: dm.find_participant_by_id(user_id),
+            dm.get_availability_snapshot,
+            lambda: dm.get_user_registrations(user_id),
+        )
+        dm.add_registration(user_id, name, activity, timeslot)
+
+    def check_in_flow(passphrase):
+        registration = dm.get_registration_by_passphrase(passphrase)
+        dm.check_in_registration(registration.id)
+        dm.uncheck_in_registration(registration.id)
+
+    def admin_dashboard_flow():
+        dm.invalidate_availability()
+        dm.get_registration_stats()
+        activity, timeslot = slots[0]
+        dm.get_availability_snapshot()
+        dm.get_registrations_frame(activity, timeslot)
+
+    return [
+        # Micro: one public function per case
+        ("create_participant", dm.create_participant, lambda: (next(new_users), "Bench New")),
+        ("find_participant_by_id", dm.find_participant_by_id, pick("user_ids")),
+        ("get_user_registrations", dm.get_user_registrations, pick("user_ids")),
+        ("get_registrations_for_participant", dm.get_registrations_for_participant, pick("user_ids")),
+        ("add_registration", dm.add_registration, new_booking),
+        ("cancel_registration", dm.cancel_registration, fresh_registration),
+        ("get_signup_count", dm.get_signup_count, lambda: rng.choice(slots)),
+        ("get_signup_count[cold]", dm.get_signup_count, cold(lambda: rng.choice(slots))),
+        ("get_availability_snapshot", dm.get_availability_snapshot, no_args),
+        ("get_availability_snapshot[cold]", dm.get_availability_snapshot, cold()),
+        ("get_registration_by_passphrase", dm.get_registration_by_passphrase, pick("passphrases")),
+        ("check_in_registration", dm.check_in_registration, fresh_registration),
+        ("uncheck_in_registration", dm.uncheck_in_registration, pick("registration_ids")),
+        ("get_registrations_for_timeslot", dm.get_registrations_for_timeslot, lambda: rng.choice(slots)),
+        ("get_registrations_frame[slot]", dm.get_registrations_frame, lambda: rng.choice(slots)),
+        ("get_registrations_frame[all]", dm.get_registrations_frame, no_args),
+        ("get_total_registration_count", dm.get_total_registration_count, no_args),
+        ("get_checked_in_count", dm.get_checked_in_count, no_args),
+        ("get_total_registration_count_for_activity", dm.get_total_registration_count_for_activity, lambda: (rng.choice(activities),)),
+        ("get_checked_in_count_for_activity", dm.get_checked_in_count_for_activity, lambda: (rng.choice(activities),)),
+        ("get_registration_stats", dm.get_registration_stats, no_args),
+        ("get_registration_stats[cold]", dm.get_registration_stats, cold()),
+        ("reconcile_slot_counters[check]", dm.reconcile_slot_counters, lambda: (False,)),
+        ("get_competitive_games", dm.get_competitive_games, no_args),
+        ("get_teams", dm.get_teams, no_args),
+        ("get_all_scores", dm.get_all_scores, no_args),
+        ("get_scores_frame", dm.get_scores_frame, no_args),
+        ("get_score_matrix", dm.get_score_matrix, no_args),
+        ("get_scores_for_game", dm.get_scores_for_game, pick("game_ids")),
+        ("get_scores_for_team", dm.get_scores_for_team, pick("team_ids")),
+        ("get_team_standings", dm.get_team_standings, no_args),
+        ("get_team_total_scores", dm.get_team_total_scores, no_args),
+        ("get_scoreboard_version", dm.get_scoreboard_version, no_args),
+        ("update_scores_bulk", dm.update_scores_bulk, score_change),
+        ("add_points", dm.add_points, lambda: (rng.choice(seeded["game_ids"]), rng.choice(seeded["team_ids"]), 1)),
+        # Macro: what one page rerun or background refresh does
+        ("flow:signup", signup_flow, cold(new_booking)),
+        ("flow:check_in", check_in_flow, pick("passphrases")),
+        ("flow:admin_dashboard", admin_dashboard_flow, no_args),
+        ("flow:scoreboard_rebuild", dm._load_scoreboard_snapshot, lambda: (dm.get_scoreboard_version(),)),
+    ]
+
+
+def time_case(call, setup, repeat, max_time):
+    """Times call(*setup()) after one warm-up call; returns summary statistics in milliseconds."""
+    call(*setup())
+    timings = []
+    deadline = time.perf_counter() + max_time
+    while len(timings) < repeat and (len(timings) < 3 or time.perf_counter() < deadline):
+        args = setup()
+        started = time.perf_counter()
+        call(*args)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        "iterations": len(timings),
+        "min_ms": timings[0],
+        "median_ms": statistics.median(timings),
+        "mean_ms": statistics.fmean(timings),
+        "p95_ms": percentile(timings, 95),
+    }
+
+
+def run_size(size, workdir, settings, only=None):
+    """Seeds a fresh database with `size` registrations and times every case. Returns {case: stats}."""
+    db_path = os.path.join(workdir, f"bench-{size}.db")
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    dm.use_backend(SQLiteBackend(db_path), max_size=4)
+    try:
+        with benchmark_activities(size, settings["activities"]):
+            dm.initialize_database()
+            started = time.perf_counter()
+            seeded = seed_database(size, settings)
+            print(f"Seeded {size} registrations in {time.perf_counter() - started:.1f}s")
+            rng = random.Random(settings["seed"])
+            results = {}
+            for name, call, setup in benchmark_cases(seeded, rng):
+                if only and not any(part in name for part in only):
+                    continue
+                results[name] = time_case(call, setup, settings["repeat"], settings["max_time"])
+            return results
+    finally:
+        dm.use_backend(None)
+
+
+def run_benchmarks(sizes=SIZES, workdir=None, only=None, **settings):
+    """Runs every size; returns the JSON-ready results document."""
+    settings = {**BENCH_DEFAULTS, **settings}
+    with tempfile.TemporaryDirectory() as scratch:
+        results = {str(size): run_size(size, workdir or scratch, settings, only) for size in sizes}
+    return {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "machine": platform.machine(),
+            "settings": settings,
+        },
+        "results": results,
+    }
+
+
+def compare(results, baseline, threshold=0.25, min_delta_ms=0.05):
+    """
+    Cases whose median got slower than the baseline by more than `threshold` (a
+    fraction) and by at least `min_delta_ms`. Returns a list of dicts with size,
+    case, baseline_ms, current_ms and ratio; cases missing from either side are skipped.
+    """
+    regressions = []
+    for size, cases in results["results"].items():
+        for case, stats in cases.items():
+            before = baseline["results"].get(size, {}).get(case)
+            if before is None:
+                continue
+            current, previous = stats["median_ms"], before["median_ms"]
+            if current > previous * (1 + threshold) and current - previous >= min_delta_ms:
+                regressions.append({
+                    "size": size, "case": case, "baseline_ms": previous, "current_ms": current,
+                    "ratio": current / previous if previous else float("inf"),
+                })
+    return regressions
+
+
+def format_results(results):
+    lines = []
+    for size, cases in results["results"].items():
+        lines.append(f"--- {size} registrations ---")
+        lines.append(f"{'case':<44}{'median ms':>11}{'p95 ms':>10}{'runs':>6}")
+        for case, stats in cases.items():
+            lines.append(f"{case:<44}{stats['median_ms']:>11.3f}{stats['p95_ms']:>10.3f}{stats['iterations']:>6}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark data_manager on seeded SQLite databases.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    parser.add_argument("--only", nargs="+", help="Only run cases whose name contains one of these")
+    parser.add_argument("--workdir", help="Where to create the databases (default: a temporary directory)")
+    parser.add_argument("--out", help="Write the results JSON here")
+    parser.add_argument("--baseline", help="Compare against this results JSON")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown as a fraction (0.25 = 25%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05, help="Ignore slowdowns smaller than this")
+    for key, default in BENCH_DEFAULTS.items():
+        parser.add_argument(f"--{key.replace('_', '-')}", type=type(default), default=default)
+    args = vars(parser.parse_args(argv))
+    sizes, only, workdir = args.pop("sizes"), args.pop("only"), args.pop("workdir")
+    out, baseline_path = args.pop("out"), args.pop("baseline")
+    threshold, min_delta_ms = args.pop("threshold"), args.pop("min_delta_ms")
+
+    results = run_benchmarks(sizes, workdir, only, **args)
+    print(format_results(results))
+    if out:
+        with open(out, "w") as f:
+            json.dump(results, f, indent=2)
+    if baseline_path:
+        with open(baseline_path) as f:
+            regressions = compare(results, json.load(f), threshold, min_delta_ms)
+        for r in regressions:
+            print(f"REGRESSION {r['size']} {r['case']}: {r['baseline_ms']:.3f} ms -> {r['current_ms']:.3f} ms ({r['ratio']:.2f}x)")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {threshold:.0%} against {baseline_path}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
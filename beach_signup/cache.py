@@ -0,0 +1,90 @@
+import threading
+import time
+
+
+class _Flight:
+    """One in-progress load that concurrent callers of the same key wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlightCache:
+    """
+    Process-wide TTL cache shared by all Streamlit sessions.
+
+    - get(key, load) returns the cached value while it is younger than `ttl`
+      seconds; otherwise exactly one caller runs load() and everyone else asking
+      for the same key waits for that result (single flight).
+    - invalidate() drops cached values and detaches in-flight loads, so the next
+      get() always sees data loaded after the invalidation. A load that started
+      before an invalidation still answers its own waiters but is not cached.
+
+    Cached values are shared between sessions and must be treated as read-only.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}   # key -> (expires_at, value)
+        self._inflight = {}  # key -> _Flight
+        self._generation = 0
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+
+    def get(self, key, load):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._hits += 1
+                return entry[1]
+            self._misses += 1
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+                generation = self._generation
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = load()
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._inflight.get(key) is flight:
+                    del self._inflight[key]
+                if flight.error is None and generation == self._generation:
+                    self._entries[key] = (time.monotonic() + self.ttl, flight.value)
+            flight.done.set()
+        return flight.value
+
+    def invalidate(self, key=None):
+        """Forgets `key` (or everything) so the next get() reloads from the database."""
+        with self._lock:
+            self._generation += 1
+            self._invalidations += 1
+            if key is None:
+                self._entries.clear()
+                self._inflight.clear()
+            else:
+                self._entries.pop(key, None)
+                self._inflight.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self._hits,
+                "misses": self._misses,
+                "invalidations": self._invalidations,
+            }
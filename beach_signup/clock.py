@@ -0,0 +1,94 @@
+import datetime
+import threading
+import time
+
+import ntplib
+import pytz
+
+
+class ClockService:
+    """
+    Process-wide NTP-corrected clock.
+
+    A background thread asks `server` for the local clock's offset every `interval`
+    seconds and caches it; now() only adds the cached offset to time.time(), so
+    callers never wait on the network. Until the first successful sync, or if the
+    server can't be reached, the last known offset is kept (0, i.e. the system
+    clock, if there has never been one) and the error is recorded in status().
+    """
+
+    def __init__(self, server="pool.ntp.org", port=123, interval=300.0, retry_interval=30.0,
+                 timeout=2.0, version=3, timezone="Asia/Singapore"):
+        self.server = server
+        self.port = port
+        self.interval = interval
+        self.retry_interval = retry_interval
+        self.timeout = timeout
+        self.version = version
+        self.timezone = pytz.timezone(timezone)
+        self._offset = 0.0
+        self._synced_at = None # time.time() of the last successful sync
+        self._last_error = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self.syncs = 0
+        self.failures = 0
+
+    def now(self):
+        """Current time in the service's timezone, corrected by the cached NTP offset."""
+        self.start()
+        return datetime.datetime.fromtimestamp(time.time() + self._offset, self.timezone)
+
+    def status(self):
+        """Offset (seconds), whether it came from NTP, when it was measured, and the last error."""
+        return {
+            "server": self.server,
+            "offset": self._offset,
+            "synced": self._synced_at is not None,
+            "synced_at": self._synced_at,
+            "last_error": self._last_error,
+            "syncs": self.syncs,
+            "failures": self.failures,
+        }
+
+    def sync(self):
+        """Measures the offset now (blocking). Returns True on success; failures keep the old offset."""
+        try:
+            response = ntplib.NTPClient().request(self.server, version=self.version, port=self.port, timeout=self.timeout)
+            if response.mode != 4 or not 1 <= response.stratum <= 15: # Not a usable server reply (e.g. kiss-of-death)
+                raise ntplib.NTPException(f"Unusable reply from {self.server} (mode {response.mode}, stratum {response.stratum}).")
+        except (ntplib.NTPException, OSError) as e:
+            with self._lock:
+                self._last_error = str(e)
+                self.failures += 1
+            print(f"Clock sync with {self.server} failed, keeping offset {self._offset:+.3f}s: {e}")
+            return False
+        with self._lock:
+            self._offset = response.offset
+            self._synced_at = time.time()
+            self._last_error = None
+            self.syncs += 1
+        return True
+
+    def start(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None and not self._stopped.is_set():
+                    self._thread = threading.Thread(target=self._run, name="clock-sync", daemon=True)
+                    self._thread.start()
+
+    def poke(self):
+        """Re-syncs in the background right away."""
+        self._wake.set()
+
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            ok = self.sync()
+            self._wake.wait(self.interval if ok else self.retry_interval)
+            self._wake.clear()
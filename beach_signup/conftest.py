@@ -0,0 +1,25 @@
+import os
+import sys
+
+import pytest
+
+# Path adjustment so tests import modules the same way the page scripts do (e.g. `import data_manager as dm`)
+beach_signup_dir = os.path.dirname(os.path.abspath(__file__))
+if beach_signup_dir not in sys.path:
+    sys.path.append(beach_signup_dir)
+
+collect_ignore = [
+    "pages",
+]
+
+
+@pytest.fixture
+def dm(tmp_path):
+    """data_manager running against a fresh SQLite database."""
+    import data_manager
+    from db_backends import SQLiteBackend
+
+    data_manager.use_backend(SQLiteBackend(str(tmp_path / "beach_day.db")), max_size=8)
+    data_manager.initialize_database()
+    yield data_manager
+    data_manager.use_backend(None)
@@ -1,33 +1,337 @@
-import pyodbc
+import functools
 import os
-import random
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
+import pandas as pd
 import streamlit as st # Added for secrets access
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 
-# DB_FILE = "beach_day.db" # No longer needed for Azure SQL
+from db_backends import DB_ERRORS, INTEGRITY_ERRORS, backend_from_settings
+from cache import SingleFlightCache
+from clock import ClockService
+from db_pool import ConnectionPool, PoolTimeout
+from fetch_pool import FetchPool
+from instrumentation import Instrumentation
+from metrics_server import MetricsServer, render_prometheus
+import migrations
+import scoreboard
+import standings
+from passphrase_codec import PassphraseCodec
+from passphrases import PassphraseAllocator
+from rows import Game, Participant, Registration, ScoreEntry, Team, TeamStanding, TeamTotal, fetch_all, fetch_columns, fetch_one
+from scoreboard_broadcast import ScoreboardBroadcaster, freeze_scoreboard
+
+# Pool defaults; any of these can be overridden in a [db_pool] section of secrets.toml
+POOL_DEFAULTS = {
+    "min_size": 1,
+    "max_size": 10,
+    "timeout": 10.0,     # seconds to wait for a free connection before giving up
+    "recycle": 1800.0,   # seconds before a connection is closed and replaced
+    "pre_ping": True,    # test connections that have been idle before reusing them
+    "ping_after": 30.0,  # idle seconds after which a connection is pinged
+}
+
+# Passphrase settings, overridable in a [passphrases] secrets section.
+# mode = "reserved": random phrases from a per-process pool, reserved in batches of
+#   batch_size whenever fewer than low_water remain.
+# mode = "derived": phrases computed from the registration id with a keyed permutation
+#   (needs `key`); no passphrase queries at signup, check-in looks up by primary key.
+PASSPHRASE_DEFAULTS = {
+    "mode": "reserved",
+    "batch_size": 50,
+    "low_water": 10,
+}
+
+# Seconds that availability counts may be served from the shared cache. Writes in this
+# process invalidate it immediately. Overridable as availability_ttl in a [cache] secrets section.
+CACHE_DEFAULTS = {
+    "availability_ttl": 2.0,
+    "stats_ttl": 5.0,
+}
+
+# Public scoreboard, overridable in a [scoreboard] secrets section: the background thread
+# checks the scoreboard version every poll_interval seconds, and the page checks every
+# page_refresh seconds whether that moved past the version it shows, redrawing only then.
+SCOREBOARD_DEFAULTS = {
+    "poll_interval": 2.0,
+    "page_refresh": 5.0,
+}
+
+# Worker threads that run a page's independent reads in parallel (see fetch_together),
+# overridable in a [fetch] secrets section. Keep max_workers below the pool's max_size.
+FETCH_DEFAULTS = {
+    "max_workers": 4,
+}
+
+# NTP-corrected event clock, overridable in a [clock] secrets section. The offset is
+# measured in the background every interval seconds (retry_interval after a failure);
+# point server/port at a local NTP server on isolated hosts.
+CLOCK_DEFAULTS = {
+    "server": "pool.ntp.org",
+    "port": 123,
+    "interval": 300.0,
+    "retry_interval": 30.0,
+    "timeout": 2.0,
+    "timezone": "Asia/Singapore",
+}
+
+# Per-function / per-statement metrics (see instrumentation.py), overridable in an
+# [instrumentation] secrets section. dump_path is where dump_instrumentation() writes by default.
+INSTRUMENTATION_DEFAULTS = {
+    "enabled": True,
+    "dump_path": "instrumentation.json",
+}
+
+# Prometheus /metrics and /ready endpoints on a side port (see metrics_server.py),
+# overridable in a [metrics] secrets section. serve.py starts them; they listen on
+# localhost only unless host is changed (e.g. to "0.0.0.0" for a scraper in another
+# container). A database ping is reused for
+# ping_cache seconds so frequent probes don't each borrow a connection; sessions
+# count as active while they reran within session_window seconds.
+METRICS_DEFAULTS = {
+    "enabled": True,
+    "host": "127.0.0.1",
+    "port": 9101,
+    "ping_timeout": 2.0,
+    "ping_cache": 1.0,
+    "session_window": 300.0,
+}
+
+_backend = None
+_pool = None
+_passphrase_allocator = None
+_passphrase_codec = None
+_passphrase_codec_loaded = False
+_pool_lock = threading.Lock()
+_backend_lock = threading.Lock()
+_schema_lock = threading.Lock()
+_scoreboard_lock = threading.Lock()
+_scoreboard_broadcaster = None
+_fetch_pool = None
+_clock = None
+_metrics_server = None
+_metrics_server_started = False
+_database_ready = False
+
+def _read_secrets_section(name):
+    try:
+        return dict(st.secrets.get(name, {}))
+    except FileNotFoundError: # No secrets.toml at all
+        return {}
+
+_cache_settings = {**CACHE_DEFAULTS, **_read_secrets_section("cache")}
+_availability_cache = SingleFlightCache(float(_cache_settings["availability_ttl"]))
+_stats_cache = SingleFlightCache(float(_cache_settings["stats_ttl"]))
+_instrumentation_settings = {**INSTRUMENTATION_DEFAULTS, **_read_secrets_section("instrumentation")}
+_instrumentation = Instrumentation(enabled=bool(_instrumentation_settings["enabled"]))
+_instrumented = _instrumentation.instrumented
+_metrics_settings = {**METRICS_DEFAULTS, **_read_secrets_section("metrics")}
+_ping_cache = SingleFlightCache(float(_metrics_settings["ping_cache"]))
+
+def get_backend():
+    """
+    Returns the active storage backend. Chosen from the [database] secrets section
+    (backend = "azure_sql" or "sqlite") or the BEACH_DB_BACKEND environment variable.
+    """
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = backend_from_settings(
+                    _read_secrets_section("database"),
+                    _read_secrets_section("azure_sql"),
+                    _read_secrets_section("sqlite"),
+                )
+    return _backend
+
+def use_backend(backend, **pool_settings):
+    """
+    Switches data_manager to `backend` (e.g. a SQLiteBackend for local load tests),
+    replacing the connection pool. Given pool settings override POOL_DEFAULTS;
+    without any, the pool is rebuilt from secrets on next use.
+    """
+    global _backend, _pool, _passphrase_allocator, _database_ready, _scoreboard_broadcaster
+    with _pool_lock, _backend_lock:
+        old_pool = _pool
+        if _scoreboard_broadcaster is not None:
+            _scoreboard_broadcaster.stop()
+            _scoreboard_broadcaster = None
+        _backend = backend
+        _database_ready = False
+        _pool = None
+        _passphrase_allocator = None # Its reservations belong to the old database
+        _availability_cache.invalidate()
+        _stats_cache.invalidate()
+        _ping_cache.invalidate()
+        if pool_settings:
+            _pool = ConnectionPool(_open_db_connection, wrap_cursor=_instrumentation.wrap_cursor, **{**POOL_DEFAULTS, **pool_settings})
+    if old_pool is not None:
+        old_pool.close()
+
+def _open_db_connection():
+    return get_backend().connect()
+
+def get_connection_pool():
+    """Returns the process-wide connection pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                settings = {**POOL_DEFAULTS, **_read_secrets_section("db_pool")}
+                pool = ConnectionPool(_open_db_connection, wrap_cursor=_instrumentation.wrap_cursor, **settings)
+                pool.warm()
+                _pool = pool
+    return _pool
+
+def get_pool_stats():
+    """Connection pool counters (in use, idle, waits, wait time) for monitoring."""
+    return get_connection_pool().stats()
 
 def get_db_connection():
-    # Read Azure SQL connection info from Streamlit secrets
-    server = st.secrets["azure_sql"]["server"]
-    database = st.secrets["azure_sql"]["database"]
-    username = st.secrets["azure_sql"]["username"]
-    password = st.secrets["azure_sql"]["password"]
-    driver = st.secrets["azure_sql"].get("driver", "{ODBC Driver 17 for SQL Server}") # Default driver
-
-    conn_str = (
-        f"DRIVER={driver};"
-        f"SERVER={server};"
-        f"DATABASE={database};"
-        f"UID={username};"
-        f"PWD={password};"
-        "Encrypt=yes;"
-        "TrustServerCertificate=no;"
-        "Connection Timeout=30;"
-    )
-    conn = pyodbc.connect(conn_str)
-    # conn.row_factory = pyodbc.Row # pyodbc cursors return Row objects by default when iterating
+    """Borrows a connection from the shared pool. Calling close() returns it to the pool."""
+    if not _instrumentation.enabled:
+        return get_connection_pool().connection()
+    started = time.perf_counter()
+    try:
+        conn = get_connection_pool().connection()
+    except Exception as e:
+        _instrumentation.record_acquire(time.perf_counter() - started, e)
+        raise
+    _instrumentation.record_acquire(time.perf_counter() - started)
     return conn
 
+def get_instrumentation():
+    """The process-wide Instrumentation; snapshot() has the per-function and per-statement metrics."""
+    return _instrumentation
+
+def dump_instrumentation(path=None):
+    """Writes the current metrics as JSON (default: dump_path from the [instrumentation] settings)."""
+    return _instrumentation.dump(path or _instrumentation_settings["dump_path"])
+
+def get_fetch_pool():
+    """The process-wide FetchPool used by fetch_together."""
+    global _fetch_pool
+    if _fetch_pool is None:
+        with _pool_lock:
+            if _fetch_pool is None:
+                settings = {**FETCH_DEFAULTS, **_read_secrets_section("fetch")}
+                _fetch_pool = FetchPool(int(settings["max_workers"]))
+    return _fetch_pool
+
+def fetch_together(*calls):
+    """
+    Runs independent reads concurrently and returns their results in order, e.g.
+        profile, bookings = dm.fetch_together(
+            lambda: dm.find_participant_by_id(user_id),
+            lambda: dm.get_user_registrations(user_id),
+        )
+    Each call borrows its own pooled connection, so the wait is the slowest read rather
+    than the sum. Don't call st.* inside the calls.
+    """
+    return get_fetch_pool().gather(*calls)
+
+def get_clock():
+    """The process-wide ClockService; now() never blocks on the network."""
+    global _clock
+    if _clock is None:
+        with _pool_lock:
+            if _clock is None:
+                settings = {**CLOCK_DEFAULTS, **_read_secrets_section("clock")}
+                _clock = ClockService(
+                    settings["server"], port=int(settings["port"]), interval=float(settings["interval"]),
+                    retry_interval=float(settings["retry_interval"]), timeout=float(settings["timeout"]),
+                    timezone=settings["timezone"],
+                )
+                _clock.start()
+    return _clock
+
+def ping_database():
+    """
+    Borrows a connection (waiting at most ping_timeout seconds) and reads the schema
+    version. Returns {"ok", "latency_ms", "schema_version", "error"}; the result is
+    shared for ping_cache seconds.
+    """
+    return _ping_cache.get("ping", _ping_database)
+
+def _ping_database():
+    started = time.perf_counter()
+    try:
+        conn = get_connection_pool().connection(timeout=float(_metrics_settings["ping_timeout"]))
+        try:
+            version = migrations.current_version(conn)
+        finally:
+            conn.close()
+    except (*DB_ERRORS, PoolTimeout) as e:
+        return {"ok": False, "latency_ms": (time.perf_counter() - started) * 1000, "schema_version": None, "error": str(e)}
+    return {"ok": True, "latency_ms": (time.perf_counter() - started) * 1000, "schema_version": version, "error": None}
+
+def get_readiness():
+    """(ready, details): ready once the database answers and its schema is at migrations.LATEST_VERSION."""
+    ping = ping_database()
+    details = {**ping, "expected_schema_version": migrations.LATEST_VERSION}
+    if not ping["ok"]:
+        details["reason"] = "database unreachable"
+    elif ping["schema_version"] != migrations.LATEST_VERSION:
+        details["reason"] = "schema not migrated"
+    return "reason" not in details, details
+
+def render_metrics():
+    """
+    The /metrics body: pool, ping, session, rerun, signup and per-function latency metrics.
+    Always renders, so beach_db_up 0 is exported while the database is unreachable.
+    """
+    try:
+        ping = ping_database()
+    except (*DB_ERRORS, PoolTimeout) as e:
+        ping = {"ok": False, "latency_ms": 0.0, "schema_version": None, "error": str(e)}
+    pool = _pool # Don't create (and connect) a pool just to report on it; no pool exports zeros
+    return render_prometheus(
+        _instrumentation.snapshot(), pool.stats() if pool is not None else None, ping,
+        _instrumentation.active_sessions(float(_metrics_settings["session_window"])),
+    )
+
+def start_metrics_server():
+    """
+    Starts the /metrics and /ready endpoints once per process (no-op when disabled
+    in the [metrics] settings). Called by serve.py, never from page code, so tests
+    and plain `streamlit run` don't open a port. The BEACH_METRICS_HOST environment
+    variable overrides the bind address (the Dockerfile sets 0.0.0.0). If the port is taken, e.g. by another app process on
+    the same host, it prints why and carries on without them. Returns the server or None.
+    """
+    global _metrics_server, _metrics_server_started
+    if not _metrics_server_started:
+        with _pool_lock:
+            if not _metrics_server_started:
+                _metrics_server_started = True
+                if _metrics_settings["enabled"]:
+                    try:
+                        _metrics_server = MetricsServer(
+                            render_metrics, get_readiness,
+                            host=os.environ.get("BEACH_METRICS_HOST") or _metrics_settings["host"],
+                            port=int(_metrics_settings["port"]),
+                        ).start()
+                    except OSError as e:
+                        print(f"Metrics endpoint not started on port {_metrics_settings['port']}: {e}")
+    return _metrics_server
+
+def record_page_run(page):
+    """Called at the top of each page script: counts the rerun and marks the session as active."""
+    _instrumentation.count("page_reruns", page)
+    ctx = get_script_run_ctx()
+    if ctx is not None: # None outside a Streamlit session, e.g. in scripts
+        _instrumentation.touch_session(ctx.session_id)
+
+@contextmanager
+def pooled_connection():
+    conn = get_db_connection()
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+@functools.lru_cache(maxsize=None) # words.txt is read once per process
 def load_word_list():
     word_file_path = os.path.join(os.path.dirname(__file__), 'words.txt')
     try:
@@ -39,334 +343,559 @@ def load_word_list():
         print(f"Warning: {word_file_path} not found or empty. Using fallback word list.")
         return ['alpha', 'bravo', 'charlie', 'delta', 'echo', 'foxtrot', 'golf', 'hotel', 'india', 'juliet', 'kilo', 'lima']
 
-def generate_registration_passphrase(conn):
-    words = load_word_list()
-    cursor = conn.cursor()
-    if len(words) < 4:
-        idx = 1
-        while True:
-            passphrase = f"reg-code-{idx}"
-            cursor.execute("SELECT 1 FROM registrations WHERE registration_passphrase = ?", (passphrase,))
-            if cursor.fetchone() is None: return passphrase
-            idx += 1
-    attempts = 0
-    max_attempts = 300
-    while attempts < max_attempts:
-        passphrase = '-'.join(random.sample(words, 4))
-        cursor.execute("SELECT 1 FROM registrations WHERE registration_passphrase = ?", (passphrase,))
-        if cursor.fetchone() is None: return passphrase
-        attempts += 1
-    base_passphrase = '-'.join(random.sample(words,4)) if words else "fallback-pass"
-    suffix = 1
-    while True:
-        new_passphrase = f"{base_passphrase}-{suffix}"
-        cursor.execute("SELECT 1 FROM registrations WHERE registration_passphrase = ?", (new_passphrase,))
-        if cursor.fetchone() is None: return new_passphrase
-        suffix += 1
+def _reserve_passphrases(candidates):
+    with pooled_connection() as conn:
+        try:
+            reserved = get_backend().reserve_passphrases(conn.cursor(), candidates, datetime.now())
+            conn.commit()
+            return reserved
+        except DB_ERRORS:
+            conn.rollback()
+            raise
+
+def get_passphrase_allocator():
+    """Process-wide pool of reserved, unused registration passphrases."""
+    global _passphrase_allocator
+    if _passphrase_allocator is None:
+        with _backend_lock:
+            if _passphrase_allocator is None:
+                settings = {**PASSPHRASE_DEFAULTS, **_read_secrets_section("passphrases")}
+                _passphrase_allocator = PassphraseAllocator(
+                    _reserve_passphrases, load_word_list(),
+                    batch_size=int(settings["batch_size"]), low_water=int(settings["low_water"])
+                )
+    return _passphrase_allocator
+
+def get_passphrase_codec():
+    """The PassphraseCodec when passphrases are derived from ids, None in reserved mode."""
+    global _passphrase_codec, _passphrase_codec_loaded
+    if not _passphrase_codec_loaded:
+        with _backend_lock:
+            if not _passphrase_codec_loaded:
+                settings = {**PASSPHRASE_DEFAULTS, **_read_secrets_section("passphrases")}
+                if settings["mode"] == "derived":
+                    _passphrase_codec = PassphraseCodec(load_word_list(), settings.get("key"))
+                elif settings["mode"] != "reserved":
+                    raise ValueError(f"Unknown passphrase mode: {settings['mode']!r}")
+                _passphrase_codec_loaded = True
+    return _passphrase_codec
 
+def use_passphrase_codec(codec):
+    """Switches to derived passphrases with `codec`, or back to reserved ones with None."""
+    global _passphrase_codec, _passphrase_codec_loaded
+    with _backend_lock:
+        _passphrase_codec = codec
+        _passphrase_codec_loaded = True
+
+@_instrumented
 def initialize_database():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    # Note: Azure SQL uses 'IF OBJECT_ID' for checking existence, but CREATE TABLE IF NOT EXISTS is simpler if supported or for general use.
-    # For Azure SQL, it's generally better to ensure tables are created via a separate script or migration tool.
-    # However, for this exercise, we'll adapt it to run, acknowledging it might warn if tables exist.
-    # Or, we can query INFORMATION_SCHEMA.TABLES first. Let's try a more robust way for Azure SQL.
-
-    # Check if participants table exists
-    cursor.execute("SELECT TABLE_NAME FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_NAME = 'participants'")
-    if cursor.fetchone() is None:
-        cursor.execute('''
-            CREATE TABLE participants (
-                id NVARCHAR(255) PRIMARY KEY,
-                name NVARCHAR(255) NOT NULL,
-                created_time DATETIME2 NOT NULL
-            )
-        ''')
-        print("Created participants table.")
-    else:
-        print("Participants table already exists.")
-
-    # Check if registrations table exists
-    cursor.execute("SELECT TABLE_NAME FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_NAME = 'registrations'")
-    if cursor.fetchone() is None:
-        cursor.execute('''
-            CREATE TABLE registrations (
-                id INT PRIMARY KEY IDENTITY(1,1),
-                user_id NVARCHAR(255) NOT NULL,
-                participant_name NVARCHAR(255) NOT NULL,
-                activity NVARCHAR(100) NOT NULL,
-                timeslot NVARCHAR(50) NOT NULL,
-                registration_passphrase NVARCHAR(255) NOT NULL UNIQUE,
-                registration_time DATETIME2 NOT NULL,
-                checked_in INT DEFAULT 0,
-                FOREIGN KEY (user_id) REFERENCES participants (id),
-                CONSTRAINT UQ_user_activity_timeslot UNIQUE (user_id, activity, timeslot)
-            )
-        ''')
-        print("Created registrations table.")
-    else:
-        print("Registrations table already exists.")
-
-    # Check if competitive_games table exists
-    cursor.execute("SELECT TABLE_NAME FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_NAME = 'competitive_games'")
-    if cursor.fetchone() is None:
-        cursor.execute('''
-            CREATE TABLE competitive_games (
-                id INT PRIMARY KEY IDENTITY(1,1),
-                name NVARCHAR(255) NOT NULL UNIQUE
-            )
-        ''')
-        print("Created competitive_games table.")
-    else:
-        print("Competitive_games table already exists.")
-
-    # Check if teams table exists
-    cursor.execute("SELECT TABLE_NAME FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_NAME = 'teams'")
-    if cursor.fetchone() is None:
-        cursor.execute('''
-            CREATE TABLE teams (
-                id INT PRIMARY KEY IDENTITY(1,1),
-                name NVARCHAR(255) NOT NULL UNIQUE
-            )
-        ''')
-        print("Created teams table.")
-    else:
-        print("Teams table already exists.")
-
-    # Check if game_scores table exists
-    cursor.execute("SELECT TABLE_NAME FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_NAME = 'game_scores'")
-    if cursor.fetchone() is None:
-        cursor.execute('''
-            CREATE TABLE game_scores (
-                id INT PRIMARY KEY IDENTITY(1,1),
-                game_id INT NOT NULL,
-                team_id INT NOT NULL,
-                score INT DEFAULT 0,
-                last_updated_time DATETIME2 NOT NULL,
-                FOREIGN KEY (game_id) REFERENCES competitive_games (id) ON DELETE CASCADE,
-                FOREIGN KEY (team_id) REFERENCES teams (id) ON DELETE CASCADE,
-                CONSTRAINT UQ_game_team UNIQUE (game_id, team_id)
-            )
-        ''')
-        print("Created game_scores table.")
-    else:
-        print("Game_scores table already exists.")
+    """
+    Brings the schema up to date by applying pending migrations (see migrations.py).
+    Costs one query when nothing is pending.
+    """
+    with pooled_connection() as conn:
+        applied = migrations.migrate(conn, get_backend())
+    for version, description in applied:
+        print(f"Applied migration {version}: {description}.")
+    if applied:
+        report = get_index_report()
+        if report["missing"]:
+            print(f"Missing indexes: {', '.join(report['missing'])}")
+        if report["unused"]:
+            print(f"Indexes not used by any hot query: {', '.join(report['unused'])}")
+
+def ensure_database():
+    """Runs initialize_database() once per process (and again after use_backend())."""
+    global _database_ready
+    if not _database_ready:
+        with _schema_lock:
+            if not _database_ready:
+                initialize_database()
+                _database_ready = True
+
+# The hot lookups, defined once: the query functions below execute these constants and
+# the index report plans the same text, so the two can't drift apart.
+TIMESLOT_ROSTER_SQL = "SELECT * FROM registrations WHERE activity = ? AND timeslot = ? ORDER BY registration_time"
+TIMESLOT_COUNT_SQL = "SELECT COUNT(*) FROM registrations WHERE activity = ? AND timeslot = ?"
+SLOT_RECOUNT_SQL = (
+    "SELECT activity, timeslot, COUNT(*), SUM(CASE WHEN checked_in = 1 THEN 1 ELSE 0 END) "
+    "FROM registrations GROUP BY activity, timeslot"
+)
+USER_REGISTRATIONS_SQL = "SELECT * FROM registrations WHERE user_id = ? ORDER BY registration_time DESC"
+CHECKED_IN_COUNT_SQL = "SELECT COUNT(*) FROM registrations WHERE checked_in = 1"
+ACTIVITY_CHECKED_IN_COUNT_SQL = "SELECT COUNT(*) FROM registrations WHERE checked_in = 1 AND activity = ?"
+TEAM_SCORES_SQL = """
+    SELECT cg.name as game_name, gs.score, gs.last_updated_time
+    FROM game_scores gs
+    JOIN competitive_games cg ON gs.game_id = cg.id
+    WHERE gs.team_id = ?
+    ORDER BY cg.name
+"""
+TEAM_TOTALS_SQL = """
+    SELECT t.name as team_name, SUM(gs.score) as total_score
+    FROM teams t
+    LEFT JOIN game_scores gs ON t.id = gs.team_id
+    GROUP BY t.id, t.name
+    ORDER BY total_score DESC, t.name
+"""
+TEAM_STANDINGS_SQL = """
+    SELECT t.name AS team_name, s.total_score, s.standing_rank, s.last_changed_time
+    FROM team_standings s
+    JOIN teams t ON t.id = s.team_id
+    ORDER BY s.standing_rank, t.name
+"""
+
+# The lookups data_manager runs on every page load, with sample parameters. The
+# index report checks that each index in backend.INDEXES serves at least one of them.
+INDEXED_QUERIES = [
+    (TIMESLOT_ROSTER_SQL, ("", "")),
+    (TIMESLOT_COUNT_SQL, ("", "")),
+    (SLOT_RECOUNT_SQL, ()),
+    (USER_REGISTRATIONS_SQL, ("",)),
+    (CHECKED_IN_COUNT_SQL, ()),
+    (ACTIVITY_CHECKED_IN_COUNT_SQL, ("",)),
+    (TEAM_SCORES_SQL, (0,)),
+    (TEAM_TOTALS_SQL, ()),
+    (TEAM_STANDINGS_SQL, ()),
+]
 
-    conn.commit()
-    conn.close()
+@_instrumented
+def create_missing_indexes():
+    with pooled_connection() as conn:
+        try:
+            migrations.create_indexes(get_backend(), conn.cursor())
+            conn.commit()
+        except DB_ERRORS as e:
+            print(f"Database error in create_missing_indexes: {e}")
+            conn.rollback()
 
+@_instrumented
+def get_index_report():
+    """
+    {"missing": [...], "unused": [...]} for the indexes in backend.INDEXES. Missing ones
+    can be recreated with create_missing_indexes(); "unused" means no usage recorded since the server
+    started (Azure SQL) or not chosen by the planner for any INDEXED_QUERIES entry (SQLite).
+    """
+    backend = get_backend()
+    with pooled_connection() as conn:
+        try:
+            cursor = conn.cursor()
+            missing = [index for index in backend.INDEXES if not backend.index_exists(cursor, index)]
+            present = [index for index in backend.INDEXES if index not in missing]
+            unused = backend.unused_indexes(cursor, present, INDEXED_QUERIES) if present else []
+            return {"missing": missing, "unused": unused}
+        except DB_ERRORS as e:
+            print(f"Database error in get_index_report: {e}")
+            return {"missing": [], "unused": []}
+
+@_instrumented
 def create_participant(user_id, name):
-    conn = get_db_connection()
-    try:
-        cursor = conn.cursor()
-        cursor.execute("SELECT id FROM participants WHERE id = ?", (user_id,))
-        if cursor.fetchone():
-            # print(f"Participant {user_id} already exists.") # Less verbose
+    with pooled_connection() as conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT id FROM participants WHERE id = ?", (user_id,))
+            if cursor.fetchone():
+                # print(f"Participant {user_id} already exists.") # Less verbose
+                return True
+            created_time = datetime.now() # Store as datetime object, will be handled by the driver
+            cursor.execute( "INSERT INTO participants (id, name, created_time) VALUES (?, ?, ?)", (user_id, name, created_time) )
+            conn.commit()
             return True
-        created_time = datetime.now() # Store as datetime object, will be handled by pyodbc
-        cursor.execute( "INSERT INTO participants (id, name, created_time) VALUES (?, ?, ?)", (user_id, name, created_time) )
-        conn.commit()
-        return True
-    except pyodbc.Error as e: # Changed to pyodbc.Error
-        print(f"Database error in create_participant: {e}")
-        # Consider specific error codes for "already exists" if needed, e.g., 2627 for unique constraint violation
-        conn.rollback() # Rollback on error
-        return False
-    finally:
-        if conn: conn.close()
+        except DB_ERRORS as e:
+            print(f"Database error in create_participant: {e}")
+            # Consider specific error codes for "already exists" if needed, e.g., 2627 for unique constraint violation
+            conn.rollback() # Rollback on error
+            return False
 
+@_instrumented
 def find_participant_by_id(user_id):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM participants WHERE id = ?", (user_id,))
-    row = cursor.fetchone() # pyodbc.Row object
-    conn.close()
-    # Convert pyodbc.Row to dict
-    return {desc[0]: value for desc, value in zip(cursor.description, row)} if row else None
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM participants WHERE id = ?", (user_id,))
+        return fetch_one(cursor, Participant)
 
 
+@_instrumented
 def get_user_registrations(user_id):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM registrations WHERE user_id = ? ORDER BY registration_time DESC", (user_id,))
-    rows = cursor.fetchall()
-    conn.close()
-    # Convert list of pyodbc.Row to list of dicts
-    return [{desc[0]: value for desc, value in zip(cursor.description, row)} for row in rows]
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(USER_REGISTRATIONS_SQL, (user_id,))
+        return fetch_all(cursor, Registration)
 
 
+REGISTER_ATTEMPTS = 5 # Retries for deadlocks / a busy database
+
+@_instrumented
 def add_registration(user_id, name, activity, timeslot):
-    conn = get_db_connection()
-    try:
-        cursor = conn.cursor()
-        
-        # Step 1: Check for existing registrations for this user_id
-        cursor.execute("SELECT 1 FROM registrations WHERE user_id = ?", (user_id,))
-        if cursor.fetchone():
-            conn.rollback()
-            conn.close()
-            return None, None, "LIMIT_REACHED"
+    """
+    Atomically signs a participant up for a slot: creates the participant if needed,
+    enforces the one-booking limit and the activity's slot capacity, and inserts the
+    registration, all in one statement batch and one transaction. The passphrase comes
+    from the pre-reserved pool (or is derived from the new id), so no uniqueness
+    lookups happen here.
 
-        # Step 2: Proceed with generating passphrase and inserting
-        passphrase = generate_registration_passphrase(conn)
-        reg_time = datetime.now() # Store as datetime object
+    Returns (registration_id, passphrase, status) where status is one of
+    SUCCESS, LIMIT_REACHED, SLOT_FULL, ALREADY_BOOKED_TIMESLOT or DB_ERROR.
+    """
+    result = _add_registration(user_id, name, activity, timeslot)
+    _instrumentation.count("signup_status", result[2]) # Exported as beach_signups_total{status}
+    return result
 
-        cursor.execute(
-            "INSERT INTO registrations (user_id, participant_name, activity, timeslot, registration_passphrase, registration_time) VALUES (?, ?, ?, ?, ?, ?)",
-            (user_id, name, activity, timeslot, passphrase, reg_time)
-        )
-        # Get the last inserted ID using SCOPE_IDENTITY() for SQL Server
-        cursor.execute("SELECT SCOPE_IDENTITY()")
-        registration_id = cursor.fetchone()[0]
-        conn.commit()
-        conn.close()
-        return registration_id, passphrase, "SUCCESS"
+def _add_registration(user_id, name, activity, timeslot):
+    activity_details = get_activity_details(activity)
+    if activity_details is None or timeslot not in get_timeslots(activity_details["duration"]):
+        return None, None, "DB_ERROR" # Unknown slot: refuse before it gets a slot_counters row
+    backend = get_backend()
+    codec = get_passphrase_codec()
+    allocator = None
+    if codec is None:
+        allocator = get_passphrase_allocator()
+        try:
+            passphrase = allocator.take()
+        except (*DB_ERRORS, RuntimeError) as e:
+            print(f"Could not allocate a passphrase for user {user_id}: {e}")
+            return None, None, "DB_ERROR"
+    else:
+        passphrase = None # Derived from the new id by backend.register, in the same batch
+
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        for attempt in range(REGISTER_ATTEMPTS):
+            try:
+                status, registration_id, issued = backend.register(
+                    cursor, user_id, name, activity, timeslot,
+                    activity_details["slots"], passphrase, datetime.now(), codec
+                )
+                if status != "SUCCESS":
+                    conn.rollback()
+                    if status == "DB_ERROR":
+                        print(f"Passphrase space exhausted in add_registration for user {user_id}")
+                    if allocator:
+                        allocator.give_back(passphrase) # Still reserved for us, use it next time
+                    return None, None, status
+                conn.commit()
+                invalidate_availability()
+                return registration_id, issued, status
 
-    except pyodbc.IntegrityError as e: # Specific error for integrity issues
-        if conn: conn.rollback()
-        if conn: conn.close()
-        if e.args[0] in ('23000', '2627', '2601'): # Check for unique constraint violation
-             return None, None, "ALREADY_BOOKED_TIMESLOT" # Or a more specific "LIMIT_REACHED" if only user_id is unique
-        return None, None, "DB_ERROR" # Generic database error
-    except pyodbc.Error as e: # General pyodbc error
-        # print(f"Database error in add_registration for user {user_id}: {e}")
-        if conn: conn.rollback()
-        if conn: conn.close()
-        return None, None, "DB_ERROR"
+            except INTEGRITY_ERRORS as e: # Specific error for integrity issues
+                conn.rollback()
+                if backend.is_timeslot_violation(e): # The user already holds this slot
+                    if allocator:
+                        allocator.give_back(passphrase) # Rolled back, so still reserved and unused
+                    return None, None, "ALREADY_BOOKED_TIMESLOT"
+                # Anything else, e.g. a derived phrase matching one issued earlier in reserved
+                # mode; a reserved phrase that collided is already taken, so it isn't given back
+                print(f"Integrity error in add_registration for user {user_id}: {e}")
+                if allocator and not backend.is_unique_violation(e):
+                    allocator.give_back(passphrase)
+                return None, None, "DB_ERROR" # Generic database error
+            except DB_ERRORS as e: # General database error
+                conn.rollback()
+                if backend.is_retryable(e) and attempt + 1 < REGISTER_ATTEMPTS:
+                    continue
+                print(f"Database error in add_registration for user {user_id}: {e}")
+                break
+    if allocator:
+        allocator.give_back(passphrase)
+    return None, None, "DB_ERROR"
 
 
+@_instrumented
 def get_signup_count(activity, timeslot):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT COUNT(*) FROM registrations WHERE activity = ? AND timeslot = ?", (activity, timeslot))
-    count = cursor.fetchone()[0]
-    conn.close()
-    return count
+    # Served from the shared availability snapshot for configured slots
+    for slot in get_availability_snapshot().get(activity, []):
+        if slot["timeslot"] == timeslot:
+            return slot["booked"]
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(TIMESLOT_COUNT_SQL, (activity, timeslot))
+        return cursor.fetchone()[0]
 
-def cancel_registration(registration_id):
-    conn = get_db_connection()
-    try:
+LOW_AVAILABILITY_RATIO = 0.1 # A slot is "low" once this share of its capacity or less is left
+
+@_instrumented
+def get_availability_snapshot():
+    """
+    Availability of every activity and timeslot from one grouped query.
+    Returns {activity_name: [slot, ...]} with slots in timeslot order; each slot is a dict
+    with timeslot, capacity, booked, remaining, is_full and is_low.
+
+    The result is shared by all sessions for up to availability_ttl seconds (concurrent
+    misses trigger a single query) and is invalidated by bookings and cancellations.
+    Treat it as read-only.
+    """
+    return _availability_cache.get("snapshot", _load_availability_snapshot)
+
+def invalidate_availability():
+    # Bookings change both the availability counts and the admin statistics
+    _availability_cache.invalidate()
+    _stats_cache.invalidate()
+
+def _load_slot_rollup():
+    """(activity, timeslot, booked, checked_in) for every slot, read from the maintained slot counters."""
+    with pooled_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute("DELETE FROM registrations WHERE id = ?", (registration_id,))
-        conn.commit()
-        return cursor.rowcount > 0 # rowcount indicates number of rows affected
-    except pyodbc.Error as e: # Changed to pyodbc.Error
-        print(f"Database error in cancel_registration: {e}")
-        conn.rollback()
-        return False
-    finally:
-        if conn: conn.close()
+        cursor.execute("SELECT activity, timeslot, booked, checked_in FROM slot_counters")
+        return [tuple(row) for row in cursor.fetchall()]
 
+@_instrumented
+def reconcile_slot_counters(repair=True):
+    """
+    Compares slot_counters with the registrations table and, if `repair`, fixes any drift
+    (e.g. rows changed outside data_manager). Also seeds a counter row for every configured
+    slot. Runs under a lock on registrations so no booking changes while it counts.
+    Returns a list of discrepancies as dicts with activity, timeslot, counted and
+    stored (booked, checked_in) tuples; stored is None for a missing counter row.
+    Returns None if the check itself failed (e.g. a database error), so callers
+    can tell "no drift" ([]) from "couldn't tell".
+    """
+    backend = get_backend()
+    capacities = {}
+    for activity in ACTIVITIES:
+        for timeslot in get_timeslots(activity["duration"]):
+            capacities[(activity["name"], timeslot)] = activity["slots"]
+
+    with pooled_connection() as conn:
+        try:
+            cursor = conn.cursor()
+            backend.lock_registrations(cursor)
+            cursor.execute(SLOT_RECOUNT_SQL)
+            counted = {(activity, timeslot): (booked, checked_in or 0) for activity, timeslot, booked, checked_in in cursor.fetchall()}
+            cursor.execute("SELECT activity, timeslot, booked, checked_in FROM slot_counters")
+            stored = {(activity, timeslot): (booked, checked_in) for activity, timeslot, booked, checked_in in cursor.fetchall()}
+
+            discrepancies = []
+            for key in sorted(set(counted) | set(stored) | set(capacities)):
+                actual = counted.get(key, (0, 0))
+                if stored.get(key) == actual:
+                    continue
+                activity, timeslot = key
+                if key in stored or actual != (0, 0):
+                    discrepancies.append({"activity": activity, "timeslot": timeslot, "counted": actual, "stored": stored.get(key)})
+                if not repair:
+                    continue
+                if key in stored:
+                    cursor.execute(
+                        "UPDATE slot_counters SET booked = ?, checked_in = ? WHERE activity = ? AND timeslot = ?",
+                        (actual[0], actual[1], activity, timeslot)
+                    )
+                else:
+                    capacity = capacities.get(key, actual[0])
+                    cursor.execute(
+                        "INSERT INTO slot_counters (activity, timeslot, capacity, booked, checked_in) VALUES (?, ?, ?, ?, ?)",
+                        (activity, timeslot, capacity, actual[0], actual[1])
+                    )
+            conn.commit()
+        except DB_ERRORS as e:
+            print(f"Database error in reconcile_slot_counters: {e}")
+            conn.rollback()
+            return None
+    if repair and discrepancies:
+        invalidate_availability()
+    return discrepancies
+
+@_instrumented
+def _load_availability_snapshot():
+    booked_counts = {(activity, timeslot): booked for activity, timeslot, booked, _ in _load_slot_rollup()}
+
+    snapshot = {}
+    for activity in ACTIVITIES:
+        capacity = activity["slots"]
+        slots = []
+        for timeslot in get_timeslots(activity["duration"]):
+            booked = booked_counts.get((activity["name"], timeslot), 0)
+            remaining = max(capacity - booked, 0)
+            slots.append({
+                "timeslot": timeslot,
+                "capacity": capacity,
+                "booked": booked,
+                "remaining": remaining,
+                "is_full": remaining <= 0,
+                "is_low": 0 < remaining <= capacity * LOW_AVAILABILITY_RATIO,
+            })
+        snapshot[activity["name"]] = slots
+    return snapshot
+
+@_instrumented
+def cancel_registration(registration_id):
+    with pooled_connection() as conn:
+        try:
+            cursor = conn.cursor()
+            cancelled = get_backend().cancel_registration(cursor, registration_id) # Also frees the slot counter
+            conn.commit()
+            invalidate_availability()
+            return cancelled
+        except DB_ERRORS as e:
+            print(f"Database error in cancel_registration: {e}")
+            conn.rollback()
+            return False
+
+@_instrumented
 def get_registration_by_passphrase(passphrase):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM registrations WHERE registration_passphrase = ?", (passphrase,))
-    row = cursor.fetchone()
-    conn.close()
-    return {desc[0]: value for desc, value in zip(cursor.description, row)} if row else None
+    codec = get_passphrase_codec()
+    registration_id = codec.decode(passphrase) if codec else None
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        if registration_id is not None:
+            # Derived phrase: primary key lookup, then confirm the stored phrase matches
+            cursor.execute("SELECT * FROM registrations WHERE id = ?", (registration_id,))
+            registration = fetch_one(cursor, Registration)
+            if registration and registration.registration_passphrase == passphrase:
+                return registration
+        # Reserved-mode (or older) phrases are found through the unique passphrase index
+        cursor.execute("SELECT * FROM registrations WHERE registration_passphrase = ?", (passphrase,))
+        return fetch_one(cursor, Registration)
 
 
+@_instrumented
 def check_in_registration(registration_id):
-    conn = get_db_connection()
-    try:
-        cursor = conn.cursor()
-        cursor.execute("SELECT checked_in FROM registrations WHERE id = ?", (registration_id,))
-        result_row = cursor.fetchone()
-        if result_row is None:
-            conn.close()
-            return False
-        # pyodbc.Row can be accessed by column name
-        if result_row.checked_in == 1: # Access by column name
-            conn.close()
+    with pooled_connection() as conn:
+        try:
+            cursor = conn.cursor()
+            # False if the registration doesn't exist or is already checked in
+            _, changed = get_backend().set_checked_in(cursor, registration_id, True)
+            conn.commit()
+            if changed:
+                _stats_cache.invalidate()
+            return changed
+        except DB_ERRORS as e:
+            print(f"Database error in check_in_registration: {e}")
+            conn.rollback()
             return False
-        cursor.execute("UPDATE registrations SET checked_in = 1 WHERE id = ?", (registration_id,))
-        conn.commit()
-        success = cursor.rowcount > 0
-        conn.close()
-        return success
-    except pyodbc.Error as e: # Changed to pyodbc.Error
-        print(f"Database error in check_in_registration: {e}")
-        if conn: conn.rollback()
-        if conn: conn.close()
-        return False
 
+@_instrumented
 def uncheck_in_registration(registration_id):
-    conn = get_db_connection()
-    try:
-        cursor = conn.cursor()
-        cursor.execute("UPDATE registrations SET checked_in = 0 WHERE id = ?", (registration_id,))
-        conn.commit()
-        success = cursor.rowcount > 0
-        # print(f"Uncheck registration ID {registration_id} - success: {success}, rows affected: {cursor.rowcount}")
-        conn.close()
-        return success
-    except pyodbc.Error as e: # Changed to pyodbc.Error
-        print(f"Database error in uncheck_in_registration for ID {registration_id}: {e}")
-        if conn: conn.rollback()
-        if conn: conn.close()
-        return False
+    with pooled_connection() as conn:
+        try:
+            cursor = conn.cursor()
+            exists, changed = get_backend().set_checked_in(cursor, registration_id, False)
+            conn.commit()
+            if changed:
+                _stats_cache.invalidate()
+            return exists
+        except DB_ERRORS as e:
+            print(f"Database error in uncheck_in_registration for ID {registration_id}: {e}")
+            conn.rollback()
+            return False
 
 
+@_instrumented
 def get_registrations_for_timeslot(activity, timeslot):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM registrations WHERE activity = ? AND timeslot = ? ORDER BY registration_time", (activity, timeslot))
-    rows = cursor.fetchall()
-    conn.close()
-    return [{desc[0]: value for desc, value in zip(cursor.description, row)} for row in rows]
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(TIMESLOT_ROSTER_SQL, (activity, timeslot))
+        return fetch_all(cursor, Registration)
 
 
+@_instrumented
+def get_registrations_frame(activity=None, timeslot=None):
+    """
+    Registrations as a DataFrame (one column per registrations column), built straight
+    from fetchmany batches. Filtered to an activity and/or timeslot when given (the
+    roster view); with no filters it is the full registrations export.
+    """
+    conditions, params = [], []
+    if activity is not None:
+        conditions.append("activity = ?")
+        params.append(activity)
+    if timeslot is not None:
+        conditions.append("timeslot = ?")
+        params.append(timeslot)
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT * FROM registrations{where} ORDER BY activity, timeslot, registration_time", params)
+        return pd.DataFrame(fetch_columns(cursor))
+
+@_instrumented
 def get_registrations_for_participant(participant_id):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM registrations WHERE user_id = ?", (participant_id,))
-    rows = cursor.fetchall()
-    conn.close()
-    return [{desc[0]: value for desc, value in zip(cursor.description, row)} for row in rows]
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM registrations WHERE user_id = ?", (participant_id,))
+        return fetch_all(cursor, Registration)
 
 
+@_instrumented
 def get_total_registration_count():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT COUNT(*) FROM registrations")
-    count = cursor.fetchone()[0]
-    conn.close()
-    return count
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM registrations")
+        return cursor.fetchone()[0]
 
+@_instrumented
 def get_checked_in_count():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT COUNT(*) FROM registrations WHERE checked_in = 1")
-    count = cursor.fetchone()[0]
-    conn.close()
-    return count
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(CHECKED_IN_COUNT_SQL)
+        return cursor.fetchone()[0]
 
+@_instrumented
 def get_total_registration_count_for_activity(activity):
-    conn = get_db_connection()
-    try:
-        cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM registrations WHERE activity = ?", (activity,))
-        count = cursor.fetchone()[0]
-        return count
-    except pyodbc.Error as e: # Changed to pyodbc.Error
-        print(f"Database error in get_total_registration_count_for_activity for {activity}: {e}")
-        return 0
-    finally:
-        if conn: conn.close()
+    with pooled_connection() as conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT COUNT(*) FROM registrations WHERE activity = ?", (activity,))
+            return cursor.fetchone()[0]
+        except DB_ERRORS as e:
+            print(f"Database error in get_total_registration_count_for_activity for {activity}: {e}")
+            return 0
 
 
+@_instrumented
 def get_checked_in_count_for_activity(activity):
-    conn = get_db_connection()
-    try:
-        cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM registrations WHERE checked_in = 1 AND activity = ?", (activity,))
-        count = cursor.fetchone()[0]
-        return count
-    except pyodbc.Error as e: # Changed to pyodbc.Error
-        print(f"Database error in get_checked_in_count_for_activity for {activity}: {e}")
-        return 0
-    finally:
-        if conn: conn.close()
+    with pooled_connection() as conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute(ACTIVITY_CHECKED_IN_COUNT_SQL, (activity,))
+            return cursor.fetchone()[0]
+        except DB_ERRORS as e:
+            print(f"Database error in get_checked_in_count_for_activity for {activity}: {e}")
+            return 0
+
+def _check_in_rate(checked_in, total):
+    return (checked_in / total) * 100 if total > 0 else 0
+
+@_instrumented
+def get_registration_stats():
+    """
+    Registration and check-in totals overall, per activity and per timeslot, from one
+    grouped query (cached for stats_ttl seconds, invalidated by bookings and check-ins):
+
+        {"total", "checked_in", "check_in_rate",
+         "activities": {activity: {"total", "checked_in", "check_in_rate",
+                                   "timeslots": {timeslot: {"total", "checked_in", "check_in_rate"}}}}}
+
+    Rates are percentages. Every configured activity and timeslot is present, with zeros
+    if nobody has booked it yet. Treat the result as read-only.
+    """
+    return _stats_cache.get("stats", _load_registration_stats)
+
+@_instrumented
+def _load_registration_stats():
+    activities = {}
+    for activity in ACTIVITIES:
+        activities[activity["name"]] = {
+            "total": 0, "checked_in": 0,
+            "timeslots": {timeslot: {"total": 0, "checked_in": 0} for timeslot in get_timeslots(activity["duration"])},
+        }
+    for activity, timeslot, booked, checked_in in _load_slot_rollup():
+        activity_stats = activities.setdefault(activity, {"total": 0, "checked_in": 0, "timeslots": {}})
+        activity_stats["total"] += booked
+        activity_stats["checked_in"] += checked_in
+        activity_stats["timeslots"][timeslot] = {"total": booked, "checked_in": checked_in}
+
+    for activity_stats in activities.values():
+        activity_stats["check_in_rate"] = _check_in_rate(activity_stats["checked_in"], activity_stats["total"])
+        for slot_stats in activity_stats["timeslots"].values():
+            slot_stats["check_in_rate"] = _check_in_rate(slot_stats["checked_in"], slot_stats["total"])
+    total = sum(activity_stats["total"] for activity_stats in activities.values())
+    checked_in = sum(activity_stats["checked_in"] for activity_stats in activities.values())
+    return {
+        "total": total,
+        "checked_in": checked_in,
+        "check_in_rate": _check_in_rate(checked_in, total),
+        "activities": activities,
+    }
 
 def get_activities():
     return [activity["name"] for activity in ACTIVITIES]
@@ -423,200 +952,311 @@ def get_timeslots(activity_duration_minutes):
 
 # --- Competitive Games Functions ---
 
+@_instrumented
 def add_competitive_game(name):
-    conn = get_db_connection()
-    try:
-        cursor = conn.cursor()
-        cursor.execute("INSERT INTO competitive_games (name) VALUES (?)", (name,))
-        conn.commit()
-        return True
-    except pyodbc.IntegrityError: # Handles unique constraint violation for name
-        conn.rollback()
-        return False # Game name likely already exists
-    except pyodbc.Error as e:
-        print(f"Database error in add_competitive_game: {e}")
-        conn.rollback()
-        return False
-    finally:
-        if conn: conn.close()
+    with pooled_connection() as conn:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("INSERT INTO competitive_games (name) VALUES (?)", (name,))
+            _bump_scoreboard_version(cursor)
+            conn.commit()
+            _notify_scoreboard()
+            return True
+        except INTEGRITY_ERRORS: # Handles unique constraint violation for name
+            conn.rollback()
+            return False # Game name likely already exists
+        except DB_ERRORS as e:
+            print(f"Database error in add_competitive_game: {e}")
+            conn.rollback()
+            return False
 
+@_instrumented
 def get_competitive_games():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, name FROM competitive_games ORDER BY name")
-    rows = cursor.fetchall()
-    conn.close()
-    return [{desc[0]: value for desc, value in zip(cursor.description, row)} for row in rows]
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id, name FROM competitive_games ORDER BY name")
+        return fetch_all(cursor, Game)
 
+@_instrumented
 def delete_competitive_game(game_id):
-    conn = get_db_connection()
-    try:
-        cursor = conn.cursor()
-        # Scores related to this game will be deleted due to ON DELETE CASCADE
-        cursor.execute("DELETE FROM competitive_games WHERE id = ?", (game_id,))
-        conn.commit()
-        return cursor.rowcount > 0
-    except pyodbc.Error as e:
-        print(f"Database error in delete_competitive_game: {e}")
-        conn.rollback()
-        return False
-    finally:
-        if conn: conn.close()
+    with pooled_connection() as conn:
+        try:
+            cursor = conn.cursor()
+            get_backend().lock_standings(cursor)
+            cursor.execute("SELECT team_id FROM game_scores WHERE game_id = ?", (game_id,))
+            affected_teams = [row[0] for row in cursor.fetchall()]
+            # Scores related to this game will be deleted due to ON DELETE CASCADE
+            cursor.execute("DELETE FROM competitive_games WHERE id = ?", (game_id,))
+            deleted = cursor.rowcount > 0
+            standings.refresh_totals(cursor, affected_teams, datetime.now())
+            _bump_scoreboard_version(cursor)
+            conn.commit()
+            _notify_scoreboard()
+            return deleted
+        except DB_ERRORS as e:
+            print(f"Database error in delete_competitive_game: {e}")
+            conn.rollback()
+            return False
 
 # --- Teams Functions ---
 
+@_instrumented
 def add_team(name):
-    conn = get_db_connection()
-    try:
-        cursor = conn.cursor()
-        cursor.execute("INSERT INTO teams (name) VALUES (?)", (name,))
-        conn.commit()
-        return True
-    except pyodbc.IntegrityError: # Handles unique constraint violation for name
-        conn.rollback()
-        return False # Team name likely already exists
-    except pyodbc.Error as e:
-        print(f"Database error in add_team: {e}")
-        conn.rollback()
-        return False
-    finally:
-        if conn: conn.close()
+    with pooled_connection() as conn:
+        try:
+            cursor = conn.cursor()
+            get_backend().lock_standings(cursor)
+            cursor.execute("INSERT INTO teams (name) VALUES (?)", (name,))
+            standings.add_teams(cursor, datetime.now()) # New team enters the standings on 0 points
+            _bump_scoreboard_version(cursor)
+            conn.commit()
+            _notify_scoreboard()
+            return True
+        except INTEGRITY_ERRORS: # Handles unique constraint violation for name
+            conn.rollback()
+            return False # Team name likely already exists
+        except DB_ERRORS as e:
+            print(f"Database error in add_team: {e}")
+            conn.rollback()
+            return False
 
+@_instrumented
 def get_teams():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, name FROM teams ORDER BY name")
-    rows = cursor.fetchall()
-    conn.close()
-    return [{desc[0]: value for desc, value in zip(cursor.description, row)} for row in rows]
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id, name FROM teams ORDER BY name")
+        return fetch_all(cursor, Team)
 
+@_instrumented
 def delete_team(team_id):
-    conn = get_db_connection()
-    try:
-        cursor = conn.cursor()
-        # Scores related to this team will be deleted due to ON DELETE CASCADE
-        cursor.execute("DELETE FROM teams WHERE id = ?", (team_id,))
-        conn.commit()
-        return cursor.rowcount > 0
-    except pyodbc.Error as e:
-        print(f"Database error in delete_team: {e}")
-        conn.rollback()
-        return False
-    finally:
-        if conn: conn.close()
+    with pooled_connection() as conn:
+        try:
+            cursor = conn.cursor()
+            get_backend().lock_standings(cursor)
+            # Scores and the standings row of this team are deleted due to ON DELETE CASCADE
+            cursor.execute("DELETE FROM teams WHERE id = ?", (team_id,))
+            deleted = cursor.rowcount > 0
+            standings.rerank(cursor)
+            _bump_scoreboard_version(cursor)
+            conn.commit()
+            _notify_scoreboard()
+            return deleted
+        except DB_ERRORS as e:
+            print(f"Database error in delete_team: {e}")
+            conn.rollback()
+            return False
 
 # --- Game Scores Functions ---
 
+@_instrumented
 def update_score(game_id, team_id, score):
-    conn = get_db_connection()
-    try:
-        cursor = conn.cursor()
-        current_time = datetime.now()
-        # Upsert logic: Insert if not exists, update if exists
-        # Check if score entry exists
-        cursor.execute("SELECT id FROM game_scores WHERE game_id = ? AND team_id = ?", (game_id, team_id))
-        existing_score = cursor.fetchone()
-
-        if existing_score:
-            cursor.execute(
-                "UPDATE game_scores SET score = ?, last_updated_time = ? WHERE id = ?",
-                (score, current_time, existing_score[0])
-            )
-        else:
-            cursor.execute(
-                "INSERT INTO game_scores (game_id, team_id, score, last_updated_time) VALUES (?, ?, ?, ?)",
-                (game_id, team_id, score, current_time)
-            )
-        conn.commit()
+    return update_scores_bulk([(game_id, team_id, score)])
+
+@_instrumented
+def update_scores_bulk(changes):
+    """
+    Sets many scores in one transaction. `changes` is a list of (game_id, team_id, score);
+    if a game/team pair appears more than once, the last score wins. All or nothing:
+    returns True if every change was saved.
+    """
+    latest = {}
+    for game_id, team_id, score in changes:
+        latest[(game_id, team_id)] = score
+    if not latest:
         return True
-    except pyodbc.Error as e:
-        print(f"Database error in update_score: {e}")
-        conn.rollback()
-        return False
-    finally:
-        if conn: conn.close()
+    with pooled_connection() as conn:
+        try:
+            cursor = conn.cursor()
+            backend = get_backend()
+            now = datetime.now()
+            backend.lock_standings(cursor)
+            backend.upsert_scores(cursor, [(game_id, team_id, score) for (game_id, team_id), score in latest.items()], now)
+            standings.refresh_totals(cursor, [team_id for _, team_id in latest], now)
+            _bump_scoreboard_version(cursor)
+            conn.commit()
+            _notify_scoreboard()
+            return True
+        except DB_ERRORS as e:
+            print(f"Database error in update_scores_bulk: {e}")
+            conn.rollback()
+            return False
+
+@_instrumented
+def add_points(game_id, team_id, delta):
+    """
+    Atomically adds `delta` (negative to take points away) to a team's score for a game,
+    without reading it first, so concurrent judge stations never overwrite each other.
+    Returns the new score, or None on a database error.
+    """
+    with pooled_connection() as conn:
+        try:
+            cursor = conn.cursor()
+            backend = get_backend()
+            now = datetime.now()
+            backend.lock_standings(cursor)
+            score = backend.add_points(cursor, game_id, team_id, delta, now)
+            standings.add_to_total(cursor, team_id, delta, now)
+            _bump_scoreboard_version(cursor)
+            conn.commit()
+            _notify_scoreboard()
+            return score
+        except DB_ERRORS as e:
+            print(f"Database error in add_points: {e}")
+            conn.rollback()
+            return None
 
+@_instrumented
 def get_all_scores():
     """
     Fetches all scores and structures them for easy display, e.g., a pivot table like structure.
     Returns a dictionary where keys are team names and values are dictionaries of game_name: score.
     Also returns lists of all game names and team names for header/row generation.
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Get all games and teams first to ensure all are represented
-    cursor.execute("SELECT id, name FROM competitive_games ORDER BY name")
-    games_list = [{desc[0]: value for desc, value in zip(cursor.description, row)} for row in cursor.fetchall()]
-    
-    cursor.execute("SELECT id, name FROM teams ORDER BY name")
-    teams_list = [{desc[0]: value for desc, value in zip(cursor.description, row)} for row in cursor.fetchall()]
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
 
-    # Fetch all scores with game and team names
-    sql = """
-    SELECT t.name as team_name, cg.name as game_name, gs.score
-    FROM game_scores gs
-    JOIN teams t ON gs.team_id = t.id
-    JOIN competitive_games cg ON gs.game_id = cg.id
-    """
-    cursor.execute(sql)
-    scores_raw = cursor.fetchall()
-    conn.close()
+        # Get all games and teams first to ensure all are represented
+        cursor.execute("SELECT id, name FROM competitive_games ORDER BY name")
+        games_list = fetch_all(cursor, Game)
+
+        cursor.execute("SELECT id, name FROM teams ORDER BY name")
+        teams_list = fetch_all(cursor, Team)
+
+        # Fetch all scores with game and team names
+        sql = """
+        SELECT t.name as team_name, cg.name as game_name, gs.score
+        FROM game_scores gs
+        JOIN teams t ON gs.team_id = t.id
+        JOIN competitive_games cg ON gs.game_id = cg.id
+        """
+        cursor.execute(sql)
+        scores_raw = cursor.fetchall()
 
     # Initialize score_data with all teams and games, defaulting scores to 0 or None
-    score_data = {team['name']: {game['name']: 0 for game in games_list} for team in teams_list}
+    score_data = {team.name: {game.name: 0 for game in games_list} for team in teams_list}
 
-    for score_row in scores_raw:
-        score_data[score_row.team_name][score_row.game_name] = score_row.score
+    for team_name, game_name, score in scores_raw:
+        score_data[team_name][game_name] = score
     
-    game_names = [game['name'] for game in games_list]
-    team_names = [team['name'] for team in teams_list]
+    game_names = [game.name for game in games_list]
+    team_names = [team.name for team in teams_list]
 
     return score_data, game_names, team_names
 
 
-def get_scores_for_game(game_id):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    sql = """
-    SELECT t.name as team_name, gs.score, gs.last_updated_time
-    FROM game_scores gs
-    JOIN teams t ON gs.team_id = t.id
-    WHERE gs.game_id = ?
-    ORDER BY t.name
+@_instrumented
+def get_scores_frame():
+    """
+    Every recorded score as a long DataFrame with team_name, game_name, score and
+    last_updated_time columns, built straight from fetchmany batches. Team/game pairs
+    without a score have no row.
+    """
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT t.name AS team_name, cg.name AS game_name, gs.score, gs.last_updated_time
+            FROM game_scores gs
+            JOIN teams t ON gs.team_id = t.id
+            JOIN competitive_games cg ON gs.game_id = cg.id
+            ORDER BY t.name, cg.name
+            """
+        )
+        return pd.DataFrame(fetch_columns(cursor))
+
+@_instrumented
+def get_score_matrix():
+    """
+    Scores as a team x game DataFrame (index 'Team', one int column per game, 0 where
+    nothing is recorded), pivoted from get_scores_frame(). Teams and games are sorted by name.
     """
-    cursor.execute(sql, game_id)
-    rows = cursor.fetchall()
-    conn.close()
-    return [{desc[0]: value for desc, value in zip(cursor.description, row)} for row in rows]
+    scores, teams, games = fetch_together(get_scores_frame, get_teams, get_competitive_games)
+    return scoreboard.score_matrix(scores, [team.name for team in teams], [game.name for game in games])
+
+@_instrumented
+def get_scores_for_game(game_id):
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        sql = """
+        SELECT t.name as team_name, gs.score, gs.last_updated_time
+        FROM game_scores gs
+        JOIN teams t ON gs.team_id = t.id
+        WHERE gs.game_id = ?
+        ORDER BY t.name
+        """
+        cursor.execute(sql, (game_id,))
+        return fetch_all(cursor, ScoreEntry) # game_name is None: every entry is for game_id
 
+@_instrumented
 def get_scores_for_team(team_id):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    sql = """
-    SELECT cg.name as game_name, gs.score, gs.last_updated_time
-    FROM game_scores gs
-    JOIN competitive_games cg ON gs.game_id = cg.id
-    WHERE gs.team_id = ?
-    ORDER BY cg.name
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(TEAM_SCORES_SQL, (team_id,))
+        return fetch_all(cursor, ScoreEntry) # team_name is None: every entry is for team_id
+
+@_instrumented
+def get_team_standings():
+    """
+    Teams in standing order from the maintained team_standings table: TeamStanding rows with team_name,
+    total_score, standing_rank (dense: tied teams share a rank) and last_changed_time.
     """
-    cursor.execute(sql, team_id)
-    rows = cursor.fetchall()
-    conn.close()
-    return [{desc[0]: value for desc, value in zip(cursor.description, row)} for row in rows]
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(TEAM_STANDINGS_SQL)
+        return fetch_all(cursor, TeamStanding)
+
+# --- Live Scoreboard ---
+
+def _bump_scoreboard_version(cursor):
+    # Part of every scoreboard change, in the same transaction
+    cursor.execute("UPDATE scoreboard_version SET version = version + 1 WHERE id = 1")
+
+def _notify_scoreboard():
+    broadcaster = _scoreboard_broadcaster
+    if broadcaster is not None:
+        broadcaster.poke() # Rebuild now rather than at the next poll
 
+@_instrumented
+def get_scoreboard_version():
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT version FROM scoreboard_version WHERE id = 1")
+        row = cursor.fetchone()
+        return row[0] if row else 0
+
+@_instrumented
+def _load_scoreboard_snapshot(version):
+    return freeze_scoreboard(version, get_team_standings(), get_score_matrix())
+
+def get_scoreboard_broadcaster():
+    global _scoreboard_broadcaster
+    if _scoreboard_broadcaster is None:
+        with _scoreboard_lock:
+            if _scoreboard_broadcaster is None:
+                settings = {**SCOREBOARD_DEFAULTS, **_read_secrets_section("scoreboard")}
+                _scoreboard_broadcaster = ScoreboardBroadcaster(
+                    get_scoreboard_version, _load_scoreboard_snapshot, float(settings["poll_interval"])
+                )
+    return _scoreboard_broadcaster
+
+def get_scoreboard_snapshot():
+    """
+    The shared, read-only ScoreboardSnapshot (version, standings, score_data, game_names,
+    team_names), kept current by one background thread per process.
+    """
+    return get_scoreboard_broadcaster().current()
+
+def get_published_scoreboard_version():
+    """Version of the snapshot sessions are served right now, read from memory (None before the first build)."""
+    return get_scoreboard_broadcaster().version
+
+def get_scoreboard_page_refresh():
+    return float({**SCOREBOARD_DEFAULTS, **_read_secrets_section("scoreboard")}["page_refresh"])
+
+@_instrumented
 def get_team_total_scores():
     """Calculates total scores for each team."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    sql = """
-    SELECT t.name as team_name, SUM(gs.score) as total_score
-    FROM teams t
-    LEFT JOIN game_scores gs ON t.id = gs.team_id
-    GROUP BY t.id, t.name
-    ORDER BY total_score DESC, t.name
-    """
-    cursor.execute(sql)
-    rows = cursor.fetchall()
-    conn.close()
-    return [{desc[0]: value for desc, value in zip(cursor.description, row)} for row in rows]
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(TEAM_TOTALS_SQL)
+        return fetch_all(cursor, TeamTotal)
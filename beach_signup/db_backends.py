@@ -0,0 +1,737 @@
+"""
+Storage backends for data_manager.
+
+data_manager keeps the portable SQL (both drivers use `?` placeholders); a
+backend supplies connections, the schema DDL and the few statements whose
+syntax differs between Azure SQL and SQLite.
+"""
+import os
+import sqlite3
+from datetime import datetime
+
+try:
+    import pyodbc
+except ImportError: # Only needed for the Azure SQL backend (requires the ODBC driver)
+    pyodbc = None
+
+# register() parameters for the Azure SQL batch when it isn't deriving the passphrase
+NO_DERIVATION = {"ipad": b"", "opad": b"", "words": "", "word_width": 0, "base": 0, "wrap": 0}
+
+# Exception tuples usable in `except` clauses whichever backend is active
+DB_ERRORS = (sqlite3.Error,) + ((pyodbc.Error,) if pyodbc else ())
+INTEGRITY_ERRORS = (sqlite3.IntegrityError,) + ((pyodbc.IntegrityError,) if pyodbc else ())
+
+DEFAULT_SQLITE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "beach_day.db")
+
+# Store datetimes as ISO text and read TIMESTAMP columns back as datetime objects
+# (replaces sqlite3's default adapters, which are deprecated since Python 3.12).
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" "))
+sqlite3.register_converter("TIMESTAMP", lambda value: datetime.fromisoformat(value.decode()))
+
+
+class AzureSQLBackend:
+    name = "azure_sql"
+
+    SCHEMA = {
+        "participants": '''
+            CREATE TABLE participants (
+                id NVARCHAR(255) PRIMARY KEY,
+                name NVARCHAR(255) NOT NULL,
+                created_time DATETIME2 NOT NULL
+            )
+        ''',
+        "registrations": '''
+            CREATE TABLE registrations (
+                id INT PRIMARY KEY IDENTITY(1,1),
+                user_id NVARCHAR(255) NOT NULL,
+                participant_name NVARCHAR(255) NOT NULL,
+                activity NVARCHAR(100) NOT NULL,
+                timeslot NVARCHAR(50) NOT NULL,
+                registration_passphrase NVARCHAR(255) NOT NULL UNIQUE,
+                registration_time DATETIME2 NOT NULL,
+                checked_in INT DEFAULT 0,
+                FOREIGN KEY (user_id) REFERENCES participants (id),
+                CONSTRAINT UQ_user_activity_timeslot UNIQUE (user_id, activity, timeslot)
+            )
+        ''',
+        "competitive_games": '''
+            CREATE TABLE competitive_games (
+                id INT PRIMARY KEY IDENTITY(1,1),
+                name NVARCHAR(255) NOT NULL UNIQUE
+            )
+        ''',
+        "teams": '''
+            CREATE TABLE teams (
+                id INT PRIMARY KEY IDENTITY(1,1),
+                name NVARCHAR(255) NOT NULL UNIQUE
+            )
+        ''',
+        "game_scores": '''
+            CREATE TABLE game_scores (
+                id INT PRIMARY KEY IDENTITY(1,1),
+                game_id INT NOT NULL,
+                team_id INT NOT NULL,
+                score INT DEFAULT 0,
+                last_updated_time DATETIME2 NOT NULL,
+                FOREIGN KEY (game_id) REFERENCES competitive_games (id) ON DELETE CASCADE,
+                FOREIGN KEY (team_id) REFERENCES teams (id) ON DELETE CASCADE,
+                CONSTRAINT UQ_game_team UNIQUE (game_id, team_id)
+            )
+        ''',
+        "passphrase_reservations": '''
+            CREATE TABLE passphrase_reservations (
+                passphrase NVARCHAR(255) PRIMARY KEY,
+                reserved_time DATETIME2 NOT NULL
+            )
+        ''',
+        "slot_counters": '''
+            CREATE TABLE slot_counters (
+                activity NVARCHAR(100) NOT NULL,
+                timeslot NVARCHAR(50) NOT NULL,
+                capacity INT NOT NULL,
+                booked INT NOT NULL DEFAULT 0,
+                checked_in INT NOT NULL DEFAULT 0,
+                CONSTRAINT PK_slot_counters PRIMARY KEY (activity, timeslot)
+            )
+        ''',
+        "team_standings": '''
+            CREATE TABLE team_standings (
+                team_id INT PRIMARY KEY,
+                total_score INT NOT NULL DEFAULT 0,
+                standing_rank INT NOT NULL,
+                last_changed_time DATETIME2 NOT NULL,
+                FOREIGN KEY (team_id) REFERENCES teams (id) ON DELETE CASCADE
+            )
+        ''',
+        "scoreboard_version": '''
+            CREATE TABLE scoreboard_version (
+                id INT PRIMARY KEY CHECK (id = 1),
+                version BIGINT NOT NULL
+            )
+        ''',
+        "schema_version": '''
+            CREATE TABLE schema_version (
+                id INT PRIMARY KEY CHECK (id = 1),
+                version INT NOT NULL,
+                updated_time DATETIME2 NOT NULL
+            )
+        ''',
+    }
+
+    # Secondary indexes for the hot lookups in data_manager (primary keys and UNIQUE
+    # constraints already cover id, passphrase and (game_id, team_id) lookups).
+    INDEXES = {
+        # Rosters, availability counts and the per-slot GROUP BY
+        "IX_registrations_slot": '''
+            CREATE INDEX IX_registrations_slot
+            ON registrations (activity, timeslot, registration_time) INCLUDE (checked_in)
+        ''',
+        # A participant's bookings, newest first
+        "IX_registrations_user_time": '''
+            CREATE INDEX IX_registrations_user_time ON registrations (user_id, registration_time)
+        ''',
+        # Check-in totals, overall and per activity
+        "IX_registrations_checked_in": '''
+            CREATE INDEX IX_registrations_checked_in ON registrations (checked_in, activity)
+        ''',
+        # Per-team score lists and totals (joins on game_scores.team_id)
+        "IX_game_scores_team": '''
+            CREATE INDEX IX_game_scores_team ON game_scores (team_id, game_id) INCLUDE (score)
+        ''',
+        # The scoreboard, in standing order
+        "IX_team_standings_rank": '''
+            CREATE INDEX IX_team_standings_rank ON team_standings (standing_rank, team_id) INCLUDE (total_score, last_changed_time)
+        ''',
+    }
+
+    def __init__(self, server, database, username, password, driver="{ODBC Driver 17 for SQL Server}"):
+        if pyodbc is None:
+            raise RuntimeError("pyodbc (and an ODBC driver) is required for the Azure SQL backend")
+        self.conn_str = (
+            f"DRIVER={driver};"
+            f"SERVER={server};"
+            f"DATABASE={database};"
+            f"UID={username};"
+            f"PWD={password};"
+            "Encrypt=yes;"
+            "TrustServerCertificate=no;"
+            "Connection Timeout=30;"
+        )
+
+    def connect(self):
+        return pyodbc.connect(self.conn_str)
+
+    def table_exists(self, cursor, table):
+        cursor.execute("SELECT TABLE_NAME FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_NAME = ?", (table,))
+        return cursor.fetchone() is not None
+
+    def index_exists(self, cursor, index):
+        cursor.execute("SELECT 1 FROM sys.indexes WHERE name = ?", (index,))
+        return cursor.fetchone() is not None
+
+    def unused_indexes(self, cursor, indexes, queries):
+        """
+        Indexes with no seeks, scans or lookups since the server last started, from
+        sys.dm_db_index_usage_stats (needs VIEW DATABASE STATE). `queries` is unused here.
+        """
+        placeholders = ", ".join("?" for _ in indexes)
+        cursor.execute(
+            f'''
+            SELECT i.name
+            FROM sys.indexes i
+            LEFT JOIN sys.dm_db_index_usage_stats s
+                ON s.database_id = DB_ID() AND s.object_id = i.object_id AND s.index_id = i.index_id
+            WHERE i.name IN ({placeholders})
+            GROUP BY i.name
+            HAVING SUM(COALESCE(s.user_seeks, 0) + COALESCE(s.user_scans, 0) + COALESCE(s.user_lookups, 0)) = 0
+            ''',
+            tuple(indexes)
+        )
+        return sorted(row[0] for row in cursor.fetchall())
+
+    def is_unique_violation(self, error):
+        # 2627 = UNIQUE/PRIMARY KEY constraint, 2601 = unique index; the native code is in the message text
+        message = " ".join(str(arg) for arg in error.args)
+        return "(2627)" in message or "(2601)" in message
+
+    def is_timeslot_violation(self, error):
+        # The user already holds this activity/timeslot (rather than e.g. a passphrase collision)
+        return self.is_unique_violation(error) and "UQ_user_activity_timeslot" in " ".join(str(arg) for arg in error.args)
+
+    def is_retryable(self, error):
+        # SQLSTATE 40001 = chosen as deadlock victim (1205)
+        return bool(error.args) and error.args[0] == "40001"
+
+    def begin_write(self, cursor):
+        pass # Implicit transaction; the statements below take the locks they need
+
+    def lock_registrations(self, cursor):
+        # Exclusive table lock held until commit: no bookings change while counters are reconciled.
+        # register, cancel and check-in all touch registrations before slot_counters, so taking
+        # this first keeps the same order. A shared lock would not: it is compatible with the
+        # booking batch's UPDLOCK range lock, so the batch could update a counter row and then
+        # wait on us for its INSERT while we wait on it for that counter row (a deadlock).
+        cursor.execute("SELECT COUNT(*) FROM registrations WITH (TABLOCKX, HOLDLOCK)")
+        cursor.fetchall()
+
+    def lock_standings(self, cursor):
+        # Score writers take this first, before game_scores, and hold it until commit. It has
+        # to cover the whole table: ranks are dense, so a total that leaves or joins the set of
+        # distinct totals moves every team below it, not just the teams near the changed score.
+        # Key-range locks on that band would let two writers rank from each other's stale totals
+        # (or deadlock reading each other's rows). Points are still added by one atomic MERGE;
+        # concurrent judges just commit in turn, a few short statements each.
+        cursor.execute("SELECT COUNT(*) FROM team_standings WITH (TABLOCKX, HOLDLOCK)")
+        cursor.fetchall()
+
+    def migration_lock(self, cursor):
+        # Application lock owned by the transaction, so it is released on commit/rollback
+        cursor.execute(
+            '''
+            SET NOCOUNT ON;
+            DECLARE @result INT;
+            EXEC @result = sp_getapplock @Resource = 'beach_signup_schema', @LockMode = 'Exclusive',
+                                         @LockOwner = 'Transaction', @LockTimeout = 60000;
+            SELECT @result;
+            '''
+        )
+        if cursor.fetchone()[0] < 0:
+            raise RuntimeError("Timed out waiting for another replica to finish migrating the schema")
+
+    # One batch, one round trip: participant upsert, one-booking limit, capacity check
+    # and insert. UPDLOCK+HOLDLOCK keeps the user's range locked until commit, and the
+    # conditional UPDATE on the slot's counter row both enforces the capacity and
+    # serializes concurrent bookings of the same slot, so nothing is overbooked.
+    # With @derive = 1 the batch also computes PassphraseCodec.encode(@id) (HMAC-SHA256
+    # Feistel rounds, from the codec's sql_params()) and writes it before returning, so
+    # the interim value is never committed and derived mode stays one round trip.
+    REGISTER_BATCH = '''
+        SET NOCOUNT ON;
+        SET XACT_ABORT ON;
+        DECLARE @user_id NVARCHAR(255) = ?, @name NVARCHAR(255) = ?, @activity NVARCHAR(100) = ?,
+                @timeslot NVARCHAR(50) = ?, @capacity INT = ?, @passphrase NVARCHAR(255) = ?, @now DATETIME2 = ?;
+        DECLARE @derive BIT = ?, @ipad VARBINARY(64) = ?, @opad VARBINARY(64) = ?, @words NVARCHAR(MAX) = ?,
+                @word_width BIGINT = ?, @base BIGINT = ?, @wrap BIGINT = ?;
+        DECLARE @status NVARCHAR(32) = 'SUCCESS', @id INT = NULL;
+
+        IF @derive = 1
+            SET @passphrase = CONCAT(N'pending-', @user_id); -- Unique (one booking per user), replaced below
+
+        IF NOT EXISTS (SELECT 1 FROM participants WITH (UPDLOCK, HOLDLOCK) WHERE id = @user_id)
+            INSERT INTO participants (id, name, created_time) VALUES (@user_id, @name, @now);
+
+        IF EXISTS (SELECT 1 FROM registrations WITH (UPDLOCK, HOLDLOCK) WHERE user_id = @user_id)
+            SET @status = 'LIMIT_REACHED';
+        ELSE
+        BEGIN
+            IF NOT EXISTS (SELECT 1 FROM slot_counters WITH (UPDLOCK, HOLDLOCK)
+                           WHERE activity = @activity AND timeslot = @timeslot)
+                INSERT INTO slot_counters (activity, timeslot, capacity, booked, checked_in)
+                VALUES (@activity, @timeslot, @capacity, 0, 0);
+
+            UPDATE slot_counters SET booked = booked + 1, capacity = @capacity
+            WHERE activity = @activity AND timeslot = @timeslot AND booked < @capacity;
+
+            IF @@ROWCOUNT = 0
+                SET @status = 'SLOT_FULL';
+            ELSE
+            BEGIN
+                INSERT INTO registrations (user_id, participant_name, activity, timeslot, registration_passphrase, registration_time)
+                VALUES (@user_id, @name, @activity, @timeslot, @passphrase, @now);
+                SET @id = SCOPE_IDENTITY();
+            END
+        END
+
+        IF @status = 'SUCCESS' AND @derive = 1
+        BEGIN
+            DECLARE @half BIGINT = @base * @base, @round INT = 0, @digest BIGINT, @f BIGINT, @next BIGINT, @value BIGINT;
+            DECLARE @left BIGINT = @id / @half, @right BIGINT = @id % @half;
+            IF @id >= @half * @half
+                SET @status = 'DB_ERROR'; -- Word list too small for this many ids; caller rolls back
+            WHILE @status = 'SUCCESS' AND @round < 8
+            BEGIN
+                -- First 8 bytes of HMAC-SHA256(key, "<round>:<right>") as an unsigned number, mod @half
+                SET @digest = CAST(SUBSTRING(HASHBYTES('SHA2_256', @opad + HASHBYTES('SHA2_256',
+                    @ipad + CAST(CONCAT(@round, ':', @right) AS VARBINARY(64)))), 1, 8) AS BIGINT);
+                SET @f = ((@digest % @half) + @half) % @half;
+                IF @digest < 0
+                    SET @f = (@f + @wrap) % @half;
+                SET @next = (@left + @f) % @half;
+                SET @left = @right;
+                SET @right = @next;
+                SET @round += 1;
+            END
+            IF @status = 'SUCCESS'
+            BEGIN
+                SET @value = @left * @half + @right;
+                SET @passphrase = CONCAT_WS(N'-',
+                    RTRIM(SUBSTRING(@words, (@value / (@half * @base)) % @base * @word_width + 1, @word_width)),
+                    RTRIM(SUBSTRING(@words, (@value / @half) % @base * @word_width + 1, @word_width)),
+                    RTRIM(SUBSTRING(@words, (@value / @base) % @base * @word_width + 1, @word_width)),
+                    RTRIM(SUBSTRING(@words, @value % @base * @word_width + 1, @word_width)));
+                UPDATE registrations SET registration_passphrase = @passphrase WHERE id = @id;
+            END
+        END
+
+        SELECT @status AS status, @id AS registration_id, @passphrase AS passphrase;
+    '''
+
+    def register(self, cursor, user_id, name, activity, timeslot, capacity, passphrase, now, codec=None):
+        """
+        Runs the registration batch; returns (status, registration_id, passphrase), the
+        last two None unless status is SUCCESS. With a PassphraseCodec the batch derives
+        the passphrase from the new id (`passphrase` is ignored). Caller commits.
+        """
+        derive = codec.sql_params() if codec is not None else NO_DERIVATION
+        cursor.execute(self.REGISTER_BATCH, (
+            user_id, name, activity, timeslot, capacity, passphrase or "", now,
+            1 if codec is not None else 0, derive["ipad"], derive["opad"], derive["words"],
+            derive["word_width"], derive["base"], derive["wrap"],
+        ))
+        status, registration_id, passphrase = cursor.fetchone()
+        if status != "SUCCESS":
+            return status, None, None
+        return status, int(registration_id), passphrase
+
+    def reserve_passphrases(self, cursor, candidates, now):
+        """
+        Claims whichever candidates are not yet reserved or in use, in one round trip.
+        Returns the claimed passphrases. Caller commits.
+        """
+        values = ", ".join("(?)" for _ in candidates)
+        cursor.execute(
+            f'''
+            SET NOCOUNT ON;
+            DECLARE @candidates TABLE (passphrase NVARCHAR(255) PRIMARY KEY);
+            INSERT INTO @candidates (passphrase) VALUES {values};
+            INSERT INTO passphrase_reservations (passphrase, reserved_time)
+            OUTPUT INSERTED.passphrase
+            SELECT c.passphrase, ? FROM @candidates c
+            WHERE NOT EXISTS (SELECT 1 FROM passphrase_reservations r WITH (UPDLOCK, HOLDLOCK) WHERE r.passphrase = c.passphrase)
+              AND NOT EXISTS (SELECT 1 FROM registrations g WHERE g.registration_passphrase = c.passphrase);
+            ''',
+            (*candidates, now)
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+    SCORE_BATCH_ROWS = 500 # 3 parameters per row, under SQL Server's 2100-parameter limit
+
+    def upsert_scores(self, cursor, changes, now):
+        """
+        Sets score for each (game_id, team_id, score) with one MERGE per batch of rows,
+        sent as a single round trip. Keys must be distinct. Caller commits.
+        """
+        for start in range(0, len(changes), self.SCORE_BATCH_ROWS):
+            batch = changes[start:start + self.SCORE_BATCH_ROWS]
+            values = ", ".join("(?, ?, ?)" for _ in batch)
+            cursor.execute(
+                f'''
+                SET NOCOUNT ON;
+                DECLARE @changes TABLE (game_id INT NOT NULL, team_id INT NOT NULL, score INT, PRIMARY KEY (game_id, team_id));
+                INSERT INTO @changes (game_id, team_id, score) VALUES {values};
+                MERGE game_scores WITH (HOLDLOCK) AS target
+                USING @changes AS source
+                ON target.game_id = source.game_id AND target.team_id = source.team_id
+                WHEN MATCHED THEN
+                    UPDATE SET score = source.score, last_updated_time = ?
+                WHEN NOT MATCHED THEN
+                    INSERT (game_id, team_id, score, last_updated_time)
+                    VALUES (source.game_id, source.team_id, source.score, ?);
+                ''',
+                (*[value for change in batch for value in change], now, now)
+            )
+
+    def add_points(self, cursor, game_id, team_id, delta, now):
+        """Adds `delta` to a team's score in one atomic MERGE (creating the row if needed). Returns the new score."""
+        cursor.execute(
+            '''
+            SET NOCOUNT ON;
+            DECLARE @game_id INT = ?, @team_id INT = ?, @delta INT = ?, @now DATETIME2 = ?;
+            MERGE game_scores WITH (HOLDLOCK) AS target
+            USING (SELECT @game_id AS game_id, @team_id AS team_id) AS source
+            ON target.game_id = source.game_id AND target.team_id = source.team_id
+            WHEN MATCHED THEN
+                UPDATE SET score = COALESCE(target.score, 0) + @delta, last_updated_time = @now
+            WHEN NOT MATCHED THEN
+                INSERT (game_id, team_id, score, last_updated_time) VALUES (@game_id, @team_id, @delta, @now)
+            OUTPUT INSERTED.score;
+            ''',
+            (game_id, team_id, delta, now)
+        )
+        return cursor.fetchone()[0]
+
+    def cancel_registration(self, cursor, registration_id):
+        """Deletes the registration and releases its slot counter. Returns True if it existed."""
+        cursor.execute(
+            '''
+            SET NOCOUNT ON;
+            SET XACT_ABORT ON;
+            DECLARE @deleted TABLE (activity NVARCHAR(100), timeslot NVARCHAR(50), checked_in INT);
+            DELETE FROM registrations
+            OUTPUT DELETED.activity, DELETED.timeslot, DELETED.checked_in INTO @deleted
+            WHERE id = ?;
+            UPDATE c SET booked = c.booked - 1,
+                         checked_in = c.checked_in - CASE WHEN d.checked_in = 1 THEN 1 ELSE 0 END
+            FROM slot_counters c JOIN @deleted d ON c.activity = d.activity AND c.timeslot = d.timeslot;
+            SELECT COUNT(*) FROM @deleted;
+            ''',
+            (registration_id,)
+        )
+        return cursor.fetchone()[0] > 0
+
+    def set_checked_in(self, cursor, registration_id, checked_in):
+        """
+        Sets the check-in flag and adjusts the slot's checked_in counter if it changed.
+        Returns (exists, changed).
+        """
+        cursor.execute(
+            '''
+            SET NOCOUNT ON;
+            SET XACT_ABORT ON;
+            DECLARE @id INT = ?, @value INT = ?;
+            DECLARE @changed TABLE (activity NVARCHAR(100), timeslot NVARCHAR(50));
+            UPDATE registrations SET checked_in = @value
+            OUTPUT INSERTED.activity, INSERTED.timeslot INTO @changed
+            WHERE id = @id AND COALESCE(checked_in, 0) <> @value;
+            UPDATE c SET checked_in = c.checked_in + CASE WHEN @value = 1 THEN 1 ELSE -1 END
+            FROM slot_counters c JOIN @changed d ON c.activity = d.activity AND c.timeslot = d.timeslot;
+            SELECT (SELECT COUNT(*) FROM registrations WHERE id = @id), (SELECT COUNT(*) FROM @changed);
+            ''',
+            (registration_id, 1 if checked_in else 0)
+        )
+        exists, changed = cursor.fetchone()
+        return exists > 0, changed > 0
+
+
+class SQLiteBackend:
+    """Local single-file backend (WAL mode), for development, benchmarks and load tests."""
+    name = "sqlite"
+
+    SCHEMA = {
+        "participants": '''
+            CREATE TABLE participants (
+                id TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                created_time TIMESTAMP NOT NULL
+            )
+        ''',
+        "registrations": '''
+            CREATE TABLE registrations (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT NOT NULL,
+                participant_name TEXT NOT NULL,
+                activity TEXT NOT NULL,
+                timeslot TEXT NOT NULL,
+                registration_passphrase TEXT NOT NULL UNIQUE,
+                registration_time TIMESTAMP NOT NULL,
+                checked_in INTEGER DEFAULT 0,
+                FOREIGN KEY (user_id) REFERENCES participants (id),
+                CONSTRAINT UQ_user_activity_timeslot UNIQUE (user_id, activity, timeslot)
+            )
+        ''',
+        "competitive_games": '''
+            CREATE TABLE competitive_games (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL UNIQUE
+            )
+        ''',
+        "teams": '''
+            CREATE TABLE teams (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL UNIQUE
+            )
+        ''',
+        "game_scores": '''
+            CREATE TABLE game_scores (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                game_id INTEGER NOT NULL,
+                team_id INTEGER NOT NULL,
+                score INTEGER DEFAULT 0,
+                last_updated_time TIMESTAMP NOT NULL,
+                FOREIGN KEY (game_id) REFERENCES competitive_games (id) ON DELETE CASCADE,
+                FOREIGN KEY (team_id) REFERENCES teams (id) ON DELETE CASCADE,
+                CONSTRAINT UQ_game_team UNIQUE (game_id, team_id)
+            )
+        ''',
+        "passphrase_reservations": '''
+            CREATE TABLE passphrase_reservations (
+                passphrase TEXT PRIMARY KEY,
+                reserved_time TIMESTAMP NOT NULL
+            )
+        ''',
+        "slot_counters": '''
+            CREATE TABLE slot_counters (
+                activity TEXT NOT NULL,
+                timeslot TEXT NOT NULL,
+                capacity INTEGER NOT NULL,
+                booked INTEGER NOT NULL DEFAULT 0,
+                checked_in INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (activity, timeslot)
+            )
+        ''',
+        "team_standings": '''
+            CREATE TABLE team_standings (
+                team_id INTEGER PRIMARY KEY,
+                total_score INTEGER NOT NULL DEFAULT 0,
+                standing_rank INTEGER NOT NULL,
+                last_changed_time TIMESTAMP NOT NULL,
+                FOREIGN KEY (team_id) REFERENCES teams (id) ON DELETE CASCADE
+            )
+        ''',
+        "scoreboard_version": '''
+            CREATE TABLE scoreboard_version (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                version INTEGER NOT NULL
+            )
+        ''',
+        "schema_version": '''
+            CREATE TABLE schema_version (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                version INTEGER NOT NULL,
+                updated_time TIMESTAMP NOT NULL
+            )
+        ''',
+    }
+
+    # Same indexes as Azure SQL; SQLite has no INCLUDE, so covered columns go at the end of the key
+    INDEXES = {
+        "IX_registrations_slot": '''
+            CREATE INDEX IX_registrations_slot
+            ON registrations (activity, timeslot, registration_time, checked_in)
+        ''',
+        "IX_registrations_user_time": '''
+            CREATE INDEX IX_registrations_user_time ON registrations (user_id, registration_time)
+        ''',
+        "IX_registrations_checked_in": '''
+            CREATE INDEX IX_registrations_checked_in ON registrations (checked_in, activity)
+        ''',
+        "IX_game_scores_team": '''
+            CREATE INDEX IX_game_scores_team ON game_scores (team_id, game_id, score)
+        ''',
+        "IX_team_standings_rank": '''
+            CREATE INDEX IX_team_standings_rank ON team_standings (standing_rank, team_id, total_score, last_changed_time)
+        ''',
+    }
+
+    def __init__(self, path=DEFAULT_SQLITE_PATH, busy_timeout=30.0):
+        self.path = path
+        self.busy_timeout = busy_timeout
+
+    def connect(self):
+        # check_same_thread=False: pooled connections move between Streamlit session threads
+        # (the pool guarantees only one thread uses a connection at a time).
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.busy_timeout,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            check_same_thread=False,
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON") # Needed for ON DELETE CASCADE
+        return conn
+
+    def table_exists(self, cursor, table):
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))
+        return cursor.fetchone() is not None
+
+    def index_exists(self, cursor, index):
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND name = ?", (index,))
+        return cursor.fetchone() is not None
+
+    def unused_indexes(self, cursor, indexes, queries):
+        """
+        SQLite keeps no usage statistics, so this asks the planner instead: indexes that
+        EXPLAIN QUERY PLAN doesn't pick for any of `queries` ((sql, params) pairs).
+        """
+        used = set()
+        for sql, params in queries:
+            cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+            details = [row[-1] for row in cursor.fetchall()]
+            used.update(index for index in indexes if any(f"INDEX {index}" in detail for detail in details))
+        return sorted(set(indexes) - used)
+
+    def is_unique_violation(self, error):
+        message = str(error)
+        return "UNIQUE constraint failed" in message or "PRIMARY KEY constraint failed" in message
+
+    def is_timeslot_violation(self, error):
+        # SQLite names the columns rather than the constraint
+        return "UNIQUE constraint failed: registrations.user_id, registrations.activity, registrations.timeslot" in str(error)
+
+    def is_retryable(self, error):
+        return isinstance(error, sqlite3.OperationalError) and "database is locked" in str(error)
+
+    def begin_write(self, cursor):
+        # Take the database write lock up front so reads and writes in the transaction are serialized
+        if not cursor.connection.in_transaction:
+            cursor.execute("BEGIN IMMEDIATE")
+
+    def lock_registrations(self, cursor):
+        self.begin_write(cursor)
+
+    def migration_lock(self, cursor):
+        self.begin_write(cursor)
+
+    def lock_standings(self, cursor):
+        self.begin_write(cursor)
+
+    def register(self, cursor, user_id, name, activity, timeslot, capacity, passphrase, now, codec=None):
+        """Same checks as the Azure SQL batch, run under the database write lock."""
+        self.begin_write(cursor)
+        cursor.execute(
+            "INSERT OR IGNORE INTO participants (id, name, created_time) VALUES (?, ?, ?)",
+            (user_id, name, now)
+        )
+        cursor.execute("SELECT 1 FROM registrations WHERE user_id = ?", (user_id,))
+        if cursor.fetchone():
+            return "LIMIT_REACHED", None, None
+        cursor.execute(
+            "INSERT OR IGNORE INTO slot_counters (activity, timeslot, capacity, booked, checked_in) VALUES (?, ?, ?, 0, 0)",
+            (activity, timeslot, capacity)
+        )
+        cursor.execute(
+            "UPDATE slot_counters SET booked = booked + 1, capacity = ? "
+            "WHERE activity = ? AND timeslot = ? AND booked < ?",
+            (capacity, activity, timeslot, capacity)
+        )
+        if cursor.rowcount == 0:
+            return "SLOT_FULL", None, None
+        if codec is not None:
+            passphrase = f"pending-{user_id}" # Replaced below, before anyone else can read the row
+        cursor.execute(
+            "INSERT INTO registrations (user_id, participant_name, activity, timeslot, registration_passphrase, registration_time) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (user_id, name, activity, timeslot, passphrase, now)
+        )
+        registration_id = cursor.lastrowid
+        if codec is not None:
+            if registration_id >= codec.capacity:
+                return "DB_ERROR", None, None # Word list too small for this many ids; caller rolls back
+            passphrase = codec.encode(registration_id)
+            cursor.execute("UPDATE registrations SET registration_passphrase = ? WHERE id = ?", (passphrase, registration_id))
+        return "SUCCESS", registration_id, passphrase
+
+    def cancel_registration(self, cursor, registration_id):
+        self.begin_write(cursor)
+        cursor.execute("SELECT activity, timeslot, checked_in FROM registrations WHERE id = ?", (registration_id,))
+        row = cursor.fetchone()
+        if row is None:
+            return False
+        activity, timeslot, checked_in = row
+        cursor.execute("DELETE FROM registrations WHERE id = ?", (registration_id,))
+        cursor.execute(
+            "UPDATE slot_counters SET booked = booked - 1, checked_in = checked_in - ? WHERE activity = ? AND timeslot = ?",
+            (1 if checked_in == 1 else 0, activity, timeslot)
+        )
+        return True
+
+    def set_checked_in(self, cursor, registration_id, checked_in):
+        value = 1 if checked_in else 0
+        self.begin_write(cursor)
+        cursor.execute("SELECT activity, timeslot, checked_in FROM registrations WHERE id = ?", (registration_id,))
+        row = cursor.fetchone()
+        if row is None:
+            return False, False
+        activity, timeslot, current = row
+        if (current or 0) == value:
+            return True, False
+        cursor.execute("UPDATE registrations SET checked_in = ? WHERE id = ?", (value, registration_id))
+        cursor.execute(
+            "UPDATE slot_counters SET checked_in = checked_in + ? WHERE activity = ? AND timeslot = ?",
+            (1 if value else -1, activity, timeslot)
+        )
+        return True, True
+
+    def upsert_scores(self, cursor, changes, now):
+        # ON CONFLICT upsert against UQ_game_team (SQLite 3.24+), one prepared statement for all rows
+        self.begin_write(cursor)
+        cursor.executemany(
+            "INSERT INTO game_scores (game_id, team_id, score, last_updated_time) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (game_id, team_id) DO UPDATE SET score = excluded.score, last_updated_time = excluded.last_updated_time",
+            [(game_id, team_id, score, now) for game_id, team_id, score in changes]
+        )
+
+    def add_points(self, cursor, game_id, team_id, delta, now):
+        self.begin_write(cursor)
+        cursor.execute(
+            "INSERT INTO game_scores (game_id, team_id, score, last_updated_time) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (game_id, team_id) DO UPDATE SET score = COALESCE(score, 0) + excluded.score, "
+            "last_updated_time = excluded.last_updated_time",
+            (game_id, team_id, delta, now)
+        )
+        cursor.execute("SELECT score FROM game_scores WHERE game_id = ? AND team_id = ?", (game_id, team_id))
+        return cursor.fetchone()[0]
+
+    def reserve_passphrases(self, cursor, candidates, now):
+        self.begin_write(cursor)
+        reserved = []
+        for passphrase in candidates:
+            cursor.execute(
+                "INSERT OR IGNORE INTO passphrase_reservations (passphrase, reserved_time) "
+                "SELECT ?, ? WHERE NOT EXISTS (SELECT 1 FROM registrations WHERE registration_passphrase = ?)",
+                (passphrase, now, passphrase)
+            )
+            if cursor.rowcount == 1:
+                reserved.append(passphrase)
+        return reserved
+
+
+def backend_from_settings(database_settings, azure_sql_settings, sqlite_settings):
+    """
+    Builds the configured backend. `database_settings["backend"]` (or the
+    BEACH_DB_BACKEND environment variable) selects "azure_sql" (default) or "sqlite".
+    """
+    backend_name = os.environ.get("BEACH_DB_BACKEND") or database_settings.get("backend", "azure_sql")
+    if backend_name == "sqlite":
+        path = os.environ.get("BEACH_SQLITE_PATH") or sqlite_settings.get("path", DEFAULT_SQLITE_PATH)
+        return SQLiteBackend(path, busy_timeout=float(sqlite_settings.get("busy_timeout", 30.0)))
+    if backend_name == "azure_sql":
+        return AzureSQLBackend(
+            azure_sql_settings["server"],
+            azure_sql_settings["database"],
+            azure_sql_settings["username"],
+            azure_sql_settings["password"],
+            azure_sql_settings.get("driver", "{ODBC Driver 17 for SQL Server}"), # Default driver
+        )
+    raise ValueError(f"Unknown database backend: {backend_name!r}")
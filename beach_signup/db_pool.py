@@ -0,0 +1,239 @@
+import threading
+import time
+from collections import deque
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection could be checked out before the timeout expired."""
+
+
+class PooledConnection:
+    """
+    Thin wrapper around a DB-API connection borrowed from a ConnectionPool.
+    Everything is delegated to the real connection except close(), which hands
+    the connection back to the pool instead of tearing it down.
+    """
+
+    def __init__(self, pool, raw, created_at):
+        self._pool = pool
+        self._raw = raw
+        self._created_at = created_at
+        self._released = False
+
+    def cursor(self):
+        cursor = self._raw.cursor()
+        wrap = self._pool.wrap_cursor
+        return wrap(cursor) if wrap is not None else cursor
+
+    def commit(self):
+        self._raw.commit()
+
+    def rollback(self):
+        self._raw.rollback()
+
+    def close(self):
+        # Safe to call more than once; only the first call returns the connection.
+        if not self._released:
+            self._released = True
+            self._pool._release(self._raw, self._created_at)
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+
+class ConnectionPool:
+    """
+    Process-wide, thread-safe pool of DB-API connections.
+
+    - min_size connections are opened by warm() and kept around.
+    - At most max_size connections are open at once; further checkouts wait up
+      to `timeout` seconds and then raise PoolTimeout.
+    - Connections older than `recycle` seconds are closed instead of reused.
+    - With pre_ping, a connection that sat idle longer than `ping_after`
+      seconds is tested with `ping_sql` before being handed out, and replaced
+      if the test fails.
+    """
+
+    def __init__(self, connect, min_size=1, max_size=10, timeout=10.0, recycle=1800.0,
+                 pre_ping=True, ping_after=30.0, ping_sql="SELECT 1", wrap_cursor=None):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(f"Invalid pool size: min_size={min_size}, max_size={max_size}")
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+        self.ping_after = ping_after
+        self.ping_sql = ping_sql
+        self.wrap_cursor = wrap_cursor # Optional hook applied to every cursor handed out (e.g. instrumentation)
+
+        self._cond = threading.Condition()
+        self._idle = deque()  # (raw connection, created_at, last_used); right end is most recently used
+        self._size = 0        # open connections, idle + in use
+        self._in_use = 0
+        self._waiting = 0
+        self._closed = False
+
+        self._checkouts = 0
+        self._created = 0
+        self._discarded = 0
+        self._ping_failures = 0
+        self._timeouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def warm(self):
+        """Opens connections until min_size are available."""
+        while True:
+            with self._cond:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                raw = self._open()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                now = time.monotonic()
+                self._idle.append((raw, now, now))
+                self._cond.notify()
+
+    def connection(self, timeout=None):
+        """Checks out a connection. Call close() on the result to give it back."""
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        entry = None
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolTimeout("Connection pool is closed")
+                if self._idle:
+                    entry = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeout(
+                        f"No database connection available within {timeout:.1f}s "
+                        f"({self._in_use} in use, max_size={self.max_size})"
+                    )
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+            self._in_use += 1
+            waited = time.monotonic() - started
+            self._checkouts += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+
+        try:
+            if entry is not None:
+                raw, created_at = self._validate(*entry)
+            else:
+                raw, created_at = None, None
+            if raw is None:
+                raw, created_at = self._open(), time.monotonic()
+        except Exception:
+            # The slot we reserved never produced a usable connection.
+            with self._cond:
+                self._size -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        return PooledConnection(self, raw, created_at)
+
+    def stats(self):
+        """Snapshot of pool counters, safe to call from any thread."""
+        with self._cond:
+            return {
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "size": self._size,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "waiting": self._waiting,
+                "checkouts": self._checkouts,
+                "connections_created": self._created,
+                "connections_discarded": self._discarded,
+                "ping_failures": self._ping_failures,
+                "timeouts": self._timeouts,
+                "wait_time_total": self._wait_total,
+                "wait_time_max": self._wait_max,
+                "wait_time_avg": self._wait_total / self._checkouts if self._checkouts else 0.0,
+            }
+
+    def close(self):
+        """Closes idle connections; connections still checked out are closed on return."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = list(self._idle), deque()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for raw, _, _ in idle:
+            self._close_raw(raw)
+
+    # --- internals ---
+
+    def _open(self):
+        raw = self._connect()
+        with self._cond:
+            self._created += 1
+        return raw
+
+    def _validate(self, raw, created_at, last_used):
+        """Returns (raw, created_at) if the idle connection is still usable, else (None, None)."""
+        now = time.monotonic()
+        if self.recycle is not None and now - created_at > self.recycle:
+            self._close_raw(raw)
+            return None, None
+        if self.pre_ping and now - last_used > self.ping_after:
+            try:
+                cursor = raw.cursor()
+                cursor.execute(self.ping_sql)
+                cursor.fetchall()
+                cursor.close()
+            except Exception:
+                with self._cond:
+                    self._ping_failures += 1
+                self._close_raw(raw)
+                return None, None
+        return raw, created_at
+
+    def _release(self, raw, created_at):
+        keep = True
+        try:
+            # Never hand the next borrower an open transaction.
+            raw.rollback()
+        except Exception:
+            keep = False
+        now = time.monotonic()
+        if self.recycle is not None and now - created_at > self.recycle:
+            keep = False
+        with self._cond:
+            self._in_use -= 1
+            discard = not keep or self._closed
+            if discard:
+                self._size -= 1
+            else:
+                self._idle.append((raw, created_at, now))
+            self._cond.notify()
+        if discard:
+            self._close_raw(raw)
+
+    def _close_raw(self, raw):
+        with self._cond:
+            self._discarded += 1
+        try:
+            raw.close()
+        except Exception:
+            pass
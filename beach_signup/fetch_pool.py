@@ -0,0 +1,60 @@
+"""
+Runs independent reads at the same time on a small, bounded thread pool, so a page
+waits for its slowest query instead of the sum of all of them.
+"""
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+
+class FetchPool:
+    """
+    Process-wide worker threads for page reads.
+
+    At most `max_workers` calls run on the pool at once (keep it below the connection
+    pool's max_size so page reads can't starve writes); gather() also runs one call on
+    the calling thread. The calls must not use st.* themselves: worker threads have no
+    Streamlit script context. Data layer functions are fine.
+    """
+
+    def __init__(self, max_workers=4, name="fetch"):
+        if max_workers < 1:
+            raise ValueError(f"Invalid max_workers: {max_workers}")
+        self.max_workers = max_workers
+        self._local = threading.local()
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix=name, initializer=self._mark_worker)
+
+    def _mark_worker(self):
+        self._local.is_worker = True
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Starts fn(*args, **kwargs) on the pool and returns its Future. Called from one of
+        the pool's own workers it runs inline instead: a worker waiting on work queued
+        behind itself would deadlock a busy pool.
+        """
+        if getattr(self._local, "is_worker", False):
+            future = Future()
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+            return future
+        return self._executor.submit(fn, *args, **kwargs)
+
+    def gather(self, *calls):
+        """
+        Runs the zero-argument callables in `calls` concurrently and returns their
+        results as a list, in the same order. Waits for every call to finish; if any
+        raised, the first one's exception (in call order) is re-raised.
+        """
+        if len(calls) <= 1:
+            return [call() for call in calls]
+        futures = [self.submit(call) for call in calls[1:]]
+        try:
+            first = calls[0]()
+        finally:
+            wait(futures)
+        return [first] + [future.result() for future in futures]
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,257 @@
+"""
+Always-on, in-process metrics for the data layer.
+
+Instrumentation keeps, per data_manager function and per SQL statement, the call
+count, a latency histogram, the rows returned and the errors by exception type,
+plus a histogram of connection acquire times. Recording is a perf_counter() pair,
+a bisect into fixed buckets and a few integer updates under one lock, so it can
+stay on in production. snapshot() returns everything as plain dicts; dump() writes
+that as JSON. Plain labelled counters (count()) and recently seen sessions
+(touch_session()) cover the app-level numbers the metrics endpoint exports.
+"""
+import functools
+import json
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+
+# Upper bounds (ms) of the latency buckets; anything slower lands in a final overflow bucket
+LATENCY_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "total_ms", "max_ms")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms):
+        self.counts[bisect_left(LATENCY_BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def percentile(self, pct):
+        """Upper bound of the bucket holding the pct-th percentile (max_ms for the overflow bucket)."""
+        if not self.count:
+            return None
+        rank = pct / 100 * self.count
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS_MS, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "total_ms": self.total_ms,
+            "mean_ms": self.total_ms / self.count if self.count else None,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "max_ms": self.max_ms,
+            "buckets": {str(bound): count for bound, count in zip(LATENCY_BUCKETS_MS + ("+Inf",), self.counts)},
+        }
+
+
+class OperationStats:
+    __slots__ = ("calls", "rows", "errors", "latency")
+
+    def __init__(self):
+        self.calls = 0
+        self.rows = 0
+        self.errors = Counter()
+        self.latency = Histogram()
+
+    def to_dict(self):
+        return {
+            "calls": self.calls,
+            "rows": self.rows,
+            "errors": sum(self.errors.values()),
+            "error_types": dict(self.errors),
+            **self.latency.to_dict(),
+        }
+
+
+@functools.lru_cache(maxsize=2048)
+def normalize_sql(sql):
+    """One line of SQL, with placeholder lists such as IN (?, ?, ?) collapsed, so variants share a key."""
+    return re.sub(r"\?(?:\s*,\s*\?)+", "?, ...", " ".join(sql.split()))
+
+
+def _result_rows(result):
+    if isinstance(result, (list, tuple)) or hasattr(result, "shape"): # Row lists and DataFrames
+        return len(result)
+    return 0
+
+
+class Instrumentation:
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._sessions = {} # session id -> time.monotonic() of its last rerun
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.functions = {}
+            self.statements = {}
+            self.acquire = OperationStats()
+            self.counters = {} # metric -> Counter of label -> count
+            self.started_at = time.time()
+
+    def count(self, metric, label, amount=1):
+        with self._lock:
+            counter = self.counters.get(metric)
+            if counter is None:
+                counter = self.counters[metric] = Counter()
+            counter[label] += amount
+
+    def counts(self, metric):
+        with self._lock:
+            return dict(self.counters.get(metric, {}))
+
+    def touch_session(self, session_id):
+        with self._lock:
+            self._sessions[session_id] = time.monotonic()
+
+    def active_sessions(self, window):
+        """Sessions that reran within the last `window` seconds (older ones are forgotten)."""
+        cutoff = time.monotonic() - window
+        with self._lock:
+            self._sessions = {sid: seen for sid, seen in self._sessions.items() if seen >= cutoff}
+            return len(self._sessions)
+
+    def _stats(self, table, key):
+        stats = table.get(key)
+        if stats is None:
+            stats = table[key] = OperationStats()
+        return stats
+
+    def _record(self, stats, seconds, rows, error):
+        stats.calls += 1
+        stats.rows += rows
+        stats.latency.observe(seconds * 1000)
+        if error is not None:
+            stats.errors[type(error).__name__] += 1
+
+    def record_function(self, name, seconds, rows=0, error=None):
+        with self._lock:
+            self._record(self._stats(self.functions, name), seconds, rows, error)
+
+    def record_statement(self, sql, seconds, error=None):
+        """Records one execute; returns the stats that fetched rows should be added to."""
+        key = normalize_sql(sql)
+        with self._lock:
+            stats = self._stats(self.statements, key)
+            self._record(stats, seconds, 0, error)
+        return stats
+
+    def add_rows(self, stats, rows):
+        with self._lock:
+            stats.rows += rows
+
+    def record_acquire(self, seconds, error=None):
+        with self._lock:
+            self._record(self.acquire, seconds, 0, error)
+
+    def instrumented(self, fn):
+        """Decorator recording each call of `fn` under its name."""
+        name = fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not self.enabled:
+                return fn(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                self.record_function(name, time.perf_counter() - started, error=e)
+                raise
+            self.record_function(name, time.perf_counter() - started, _result_rows(result))
+            return result
+        return wrapper
+
+    def wrap_cursor(self, cursor):
+        return InstrumentedCursor(cursor, self) if self.enabled else cursor
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "started_at": self.started_at,
+                "taken_at": time.time(),
+                "functions": {name: stats.to_dict() for name, stats in sorted(self.functions.items())},
+                "statements": {sql: stats.to_dict() for sql, stats in sorted(self.statements.items())},
+                "connection_acquire": self.acquire.to_dict(),
+                "counters": {metric: dict(counter) for metric, counter in sorted(self.counters.items())},
+            }
+
+    def dump(self, path):
+        """Writes snapshot() to `path` as JSON and returns the path."""
+        with open(path, "w") as f:
+            json.dump(self.snapshot(), f, indent=2, default=str)
+        return path
+
+
+class InstrumentedCursor:
+    """DB-API cursor proxy that times execute/executemany and counts fetched rows per statement."""
+    __slots__ = ("_cursor", "_instrumentation", "_stats")
+
+    def __init__(self, cursor, instrumentation):
+        object.__setattr__(self, "_cursor", cursor)
+        object.__setattr__(self, "_instrumentation", instrumentation)
+        object.__setattr__(self, "_stats", None)
+
+    def _run(self, method, sql, args):
+        started = time.perf_counter()
+        try:
+            method(sql, *args)
+        except Exception as e:
+            object.__setattr__(self, "_stats", None)
+            self._instrumentation.record_statement(sql, time.perf_counter() - started, e)
+            raise
+        object.__setattr__(self, "_stats", self._instrumentation.record_statement(sql, time.perf_counter() - started))
+        return self
+
+    def execute(self, sql, *args):
+        return self._run(self._cursor.execute, sql, args)
+
+    def executemany(self, sql, *args):
+        return self._run(self._cursor.executemany, sql, args)
+
+    def _count(self, rows):
+        if self._stats is not None and rows:
+            self._instrumentation.add_rows(self._stats, rows)
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        self._count(0 if row is None else 1)
+        return row
+
+    def fetchmany(self, *args):
+        rows = self._cursor.fetchmany(*args)
+        self._count(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._count(len(rows))
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._cursor, name, value)
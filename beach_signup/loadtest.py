@@ -0,0 +1,310 @@
+"""
+Signup load test against a local database.
+
+Simulates the opening of signups: `users` participants arrive (all at once, evenly
+spread, or as a Poisson process) and book a slot through data_manager, a share of
+them hammering the first timeslot. Afterwards some cancel (and may rebook), some get
+checked in by passphrase, and some double-submit. Runs `threads` worker threads in
+each of `processes` processes, then reports throughput and p50/p95/p99 latency per
+operation and checks the booking invariants.
+
+    python loadtest.py --db /tmp/load.db --users 500 --threads 32 --processes 4 --arrival burst
+
+Without --db it uses the configured backend (secrets / BEACH_DB_BACKEND); point
+that at an empty local database, as the invariants count every registration.
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import data_manager as dm
+from db_backends import SQLiteBackend
+
+LOAD_DEFAULTS = {
+    "users": 200,
+    "threads": 16,
+    "processes": 1,
+    "arrival": "burst",  # burst, uniform or poisson
+    "spread": 1.0,       # seconds the uniform / poisson arrivals are spread over
+    "hot_share": 0.5,    # share of users going for the first timeslot
+    "churn": 0.3,        # share of successful bookings that are cancelled or checked in
+    "rebook": 0.5,       # share of cancellations followed by a new booking
+    "resubmit": 0.1,     # share of users who submit the signup form twice
+    "seed": 0,
+}
+
+def arrival_offsets(pattern, count, spread, rng):
+    """Seconds after opening at which each of `count` users arrives, in order."""
+    if pattern == "burst":
+        return [0.0] * count
+    if pattern == "uniform":
+        return [spread * i / count for i in range(count)]
+    if pattern == "poisson":
+        offsets, now = [], 0.0
+        for _ in range(count):
+            now += rng.expovariate(count / spread) if spread > 0 else 0.0
+            offsets.append(now)
+        return offsets
+    raise ValueError(f"Unknown arrival pattern: {pattern!r}")
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def _use_database(db_path, threads):
+    if db_path:
+        # Enough connections that worker threads don't queue on the pool
+        dm.use_backend(SQLiteBackend(db_path), max_size=threads + 2, timeout=60.0)
+
+
+def _slots():
+    return [(activity["name"], timeslot) for activity in dm.ACTIVITIES for timeslot in dm.get_timeslots(activity["duration"])]
+
+
+class _Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.records = [] # (op, status, seconds)
+        self.issued = []  # passphrases of successful bookings
+
+    def timed(self, op, call, describe=str):
+        started = time.perf_counter()
+        result = call()
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.records.append((op, describe(result), elapsed))
+        return result
+
+    def issue(self, passphrase):
+        with self._lock:
+            self.issued.append(passphrase)
+
+
+def _signup_status(result):
+    return result[2]
+
+def _ok(result):
+    return "OK" if result else "REFUSED"
+
+
+def _user_session(recorder, user_id, opening, offset, settings, rng):
+    delay = opening + offset - time.time()
+    if delay > 0:
+        time.sleep(delay)
+    slots = _slots()
+    activity, timeslot = slots[0] if rng.random() < settings["hot_share"] else rng.choice(slots)
+    name = f"Load {user_id}"
+
+    booking = _signup(recorder, user_id, name, activity, timeslot)
+    if rng.random() < settings["resubmit"]:
+        _signup(recorder, user_id, name, activity, timeslot)
+    if booking is None or rng.random() >= settings["churn"]:
+        return
+
+    registration_id, passphrase = booking
+    if rng.random() < 0.5:
+        found = recorder.timed("lookup", lambda: dm.get_registration_by_passphrase(passphrase), _ok)
+        if found is not None:
+            recorder.timed("check_in", lambda: dm.check_in_registration(found.id), _ok)
+    elif recorder.timed("cancel", lambda: dm.cancel_registration(registration_id), _ok):
+        if rng.random() < settings["rebook"]:
+            activity, timeslot = rng.choice(slots)
+            _signup(recorder, user_id, name, activity, timeslot)
+
+def _signup(recorder, user_id, name, activity, timeslot):
+    registration_id, passphrase, status = recorder.timed(
+        "signup", lambda: dm.add_registration(user_id, name, activity, timeslot), _signup_status
+    )
+    if status != "SUCCESS":
+        return None
+    recorder.issue(passphrase)
+    return registration_id, passphrase
+
+
+def _run_worker(user_ids, settings, process_index, ready=None):
+    """Runs one process' share of the users; returns (opening, finished, records, issued)."""
+    dm.load_word_list()
+    rng = random.Random(settings["seed"] * 1000 + process_index)
+    offsets = arrival_offsets(settings["arrival"], len(user_ids), settings["spread"], rng)
+    if ready is not None:
+        ready.wait() # Every process opens at the same moment
+    recorder = _Recorder()
+    opening = time.time()
+    with ThreadPoolExecutor(settings["threads"], thread_name_prefix="load") as pool:
+        futures = [
+            pool.submit(_user_session, recorder, user_id, opening, offset, settings, random.Random(rng.random()))
+            for user_id, offset in zip(user_ids, offsets)
+        ]
+        for future in futures:
+            future.result()
+    return opening, time.time(), recorder.records, recorder.issued
+
+def _process_main(db_path, user_ids, settings, process_index, ready, results):
+    try:
+        _use_database(db_path, settings["threads"])
+        dm.ensure_database()
+        results.put(("ok", _run_worker(user_ids, settings, process_index, ready)))
+    except BaseException as e:
+        ready.abort()
+        results.put(("error", repr(e)))
+
+
+def run_load(db_path=None, **settings):
+    """
+    Runs the load test and returns a report dict: elapsed seconds, per-operation
+    counts, statuses, throughput and p50/p95/p99 latency (ms), and a list of
+    invariant violations (empty when everything held).
+    """
+    unknown = set(settings) - set(LOAD_DEFAULTS)
+    if unknown:
+        raise TypeError(f"Unknown load settings: {sorted(unknown)}")
+    settings = {**LOAD_DEFAULTS, **settings}
+    _use_database(db_path, settings["threads"])
+    dm.ensure_database()
+
+    processes = max(1, settings["processes"])
+    run_id = f"{settings['seed']}-{os.getpid()}-{int(time.time() * 1000)}"
+    user_ids = [f"load-{run_id}-{i}" for i in range(settings["users"])]
+    shares = [user_ids[i::processes] for i in range(processes)]
+
+    if processes == 1:
+        outcomes = [_run_worker(shares[0], settings, 0)]
+    else:
+        ctx = multiprocessing.get_context("spawn")
+        ready, results = ctx.Barrier(processes), ctx.Queue()
+        workers = [
+            ctx.Process(target=_process_main, args=(db_path, share, settings, i, ready, results), daemon=True)
+            for i, share in enumerate(shares)
+        ]
+        for worker in workers:
+            worker.start()
+        outcomes, errors = [], []
+        for _ in workers:
+            kind, payload = results.get()
+            (outcomes if kind == "ok" else errors).append(payload)
+        for worker in workers:
+            worker.join()
+        if errors:
+            raise RuntimeError(f"Load worker failed: {errors[0]}")
+
+    elapsed = max(finished for _, finished, _, _ in outcomes) - min(opening for opening, _, _, _ in outcomes)
+    records = [record for _, _, worker_records, _ in outcomes for record in worker_records]
+    issued = [phrase for _, _, _, worker_issued in outcomes for phrase in worker_issued]
+    report = summarize(records, elapsed)
+    report["settings"] = settings
+    report["violations"] = check_invariants(user_ids, issued, records)
+    return report
+
+
+def summarize(records, elapsed):
+    latencies, statuses = defaultdict(list), defaultdict(Counter)
+    for op, status, seconds in records:
+        latencies[op].append(seconds)
+        statuses[op][status] += 1
+    ops = {}
+    for op, values in latencies.items():
+        values.sort()
+        ops[op] = {
+            "count": len(values),
+            "statuses": dict(statuses[op]),
+            "errors": statuses[op]["DB_ERROR"], # SLOT_FULL, LIMIT_REACHED etc. are correct refusals
+            "throughput": len(values) / elapsed if elapsed > 0 else None,
+            "p50_ms": percentile(values, 50) * 1000,
+            "p95_ms": percentile(values, 95) * 1000,
+            "p99_ms": percentile(values, 99) * 1000,
+        }
+    return {"elapsed": elapsed, "ops": ops}
+
+
+def check_invariants(user_ids, issued, records):
+    """
+    Booking invariants after a run. Returns a list of human-readable violations:
+    - no slot holds more registrations than its activity's `slots`
+    - no user holds more than one booking
+    - every passphrase handed out is unique, and stored passphrases are unique
+    - the slot counters agree with the registrations table
+    - successful signups minus successful cancellations equals this run's bookings
+    """
+    violations = []
+    capacities = {activity["name"]: activity["slots"] for activity in dm.ACTIVITIES}
+    with dm.pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT activity, timeslot, COUNT(*) FROM registrations GROUP BY activity, timeslot")
+        for activity, timeslot, booked in cursor.fetchall():
+            if booked > capacities.get(activity, 0):
+                violations.append(f"Overbooked {activity} {timeslot}: {booked} > {capacities.get(activity, 0)}")
+        cursor.execute("SELECT user_id, COUNT(*) FROM registrations GROUP BY user_id HAVING COUNT(*) > 1")
+        for user_id, count in cursor.fetchall():
+            violations.append(f"User {user_id} holds {count} bookings")
+        cursor.execute(
+            "SELECT registration_passphrase, COUNT(*) FROM registrations GROUP BY registration_passphrase HAVING COUNT(*) > 1"
+        )
+        for passphrase, count in cursor.fetchall():
+            violations.append(f"Passphrase {passphrase!r} stored {count} times")
+        run_users = set(user_ids)
+        cursor.execute("SELECT user_id FROM registrations")
+        booked_now = sum(1 for (user_id,) in cursor.fetchall() if user_id in run_users)
+
+    for passphrase, count in Counter(issued).items():
+        if count > 1:
+            violations.append(f"Passphrase {passphrase!r} issued {count} times")
+    drifts = dm.reconcile_slot_counters(repair=False)
+    if drifts is None:
+        violations.append("Slot counter check failed (database error, see log)")
+    for drift in drifts or []:
+        violations.append(f"Slot counter drift: {drift}")
+
+    outcomes = Counter((op, status) for op, status, _ in records)
+    expected = outcomes[("signup", "SUCCESS")] - outcomes[("cancel", "OK")]
+    if booked_now != expected:
+        violations.append(f"{booked_now} bookings stored, expected {expected} from the signup and cancel results")
+    return violations
+
+
+def format_report(report):
+    lines = [f"{'op':<10}{'count':>8}{'ops/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}  statuses"]
+    for op, stats in sorted(report["ops"].items()):
+        lines.append(
+            f"{op:<10}{stats['count']:>8}{stats['throughput']:>10.1f}{stats['p50_ms']:>10.1f}"
+            f"{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}  {stats['statuses']}"
+        )
+    lines.append(f"elapsed {report['elapsed']:.2f}s")
+    if report["violations"]:
+        lines += ["INVARIANT VIOLATIONS:"] + [f"  {violation}" for violation in report["violations"]]
+    else:
+        lines.append("All invariants held.")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent signup load test against a local database.")
+    parser.add_argument("--db", help="SQLite file to use (default: the configured backend)")
+    for key, default in LOAD_DEFAULTS.items():
+        parser.add_argument(f"--{key.replace('_', '-')}", type=type(default), default=default)
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = vars(parser.parse_args(argv))
+    db_path, json_path = args.pop("db"), args.pop("json")
+
+    report = run_load(db_path, **args)
+    print(format_report(report))
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump(report, f, indent=2)
+    return 1 if report["violations"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
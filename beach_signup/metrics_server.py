@@ -0,0 +1,176 @@
+"""
+Metrics and health endpoints, served from the app process on their own port.
+
+    GET /metrics  Prometheus text format (version 0.0.4)
+    GET /ready    200 when the database answers and the schema is current, else 503 (JSON details)
+    GET /health   200 while the process is up
+
+The server is a ThreadingHTTPServer on a daemon thread, so scrapes and load
+balancer probes never run on a Streamlit session thread.
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Signup outcomes always exported, so dashboards see zeros rather than missing series
+SIGNUP_STATUSES = ("SUCCESS", "LIMIT_REACHED", "SLOT_FULL", "ALREADY_BOOKED_TIMESLOT", "DB_ERROR")
+
+# ConnectionPool.stats() keys exported; all zero until the pool exists
+POOL_STATS = ("in_use", "idle", "max_size", "waiting", "checkouts", "connections_created",
+              "connections_discarded", "ping_failures", "timeouts", "wait_time_total")
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+def _number(value):
+    if value is None:
+        return "NaN"
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class PrometheusText:
+    """Builds the exposition text one metric family at a time."""
+
+    def __init__(self):
+        self.lines = []
+
+    def family(self, name, kind, help_text, samples):
+        """samples: iterable of (labels dict, value)."""
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            self.lines.append(f"{name}{_labels(labels)} {_number(value)}")
+
+    def histogram(self, name, help_text, series):
+        """series: iterable of (labels dict, Instrumentation histogram dict); exported in seconds."""
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} histogram")
+        for labels, histogram in series:
+            cumulative = 0
+            for bound, count in histogram["buckets"].items():
+                cumulative += count
+                le = "+Inf" if bound == "+Inf" else _number(float(bound) / 1000)
+                self.lines.append(f"{name}_bucket{_labels({**labels, 'le': le})} {cumulative}")
+            self.lines.append(f"{name}_sum{_labels(labels)} {_number(histogram['total_ms'] / 1000)}")
+            self.lines.append(f"{name}_count{_labels(labels)} {histogram['count']}")
+
+    def text(self):
+        return "\n".join(self.lines) + "\n"
+
+
+def render_prometheus(metrics, pool, ping, active_sessions):
+    """
+    Exposition text from an Instrumentation snapshot (`metrics`), connection pool
+    stats (None before the pool exists, exported as zeros), a database ping result
+    (ok, latency_ms) and the active session count.
+    """
+    if pool is None:
+        pool = dict.fromkeys(POOL_STATS, 0)
+    out = PrometheusText()
+    out.family("beach_db_up", "gauge", "1 if the last database ping succeeded.", [({}, 1 if ping["ok"] else 0)])
+    out.family("beach_db_ping_seconds", "gauge", "Latency of the last database ping, including connection checkout.",
+               [({}, ping["latency_ms"] / 1000)])
+
+    out.family("beach_db_pool_connections", "gauge", "Open pooled connections by state.",
+               [({"state": "in_use"}, pool["in_use"]), ({"state": "idle"}, pool["idle"])])
+    out.family("beach_db_pool_max_connections", "gauge", "Connection pool max_size.", [({}, pool["max_size"])])
+    out.family("beach_db_pool_waiting", "gauge", "Threads waiting for a pooled connection.", [({}, pool["waiting"])])
+    for key, help_text in (
+        ("checkouts", "Connections checked out of the pool."),
+        ("connections_created", "Database connections opened by the pool."),
+        ("connections_discarded", "Pooled connections closed (recycled, failed ping or pool shrink)."),
+        ("ping_failures", "Idle connections that failed their pre-ping."),
+        ("timeouts", "Checkouts that gave up waiting for a connection."),
+    ):
+        out.family(f"beach_db_pool_{key}_total", "counter", help_text, [({}, pool[key])])
+    out.family("beach_db_pool_wait_seconds_total", "counter", "Time spent waiting for pooled connections.",
+               [({}, pool["wait_time_total"])])
+    out.histogram("beach_db_connection_acquire_seconds", "Time to borrow a connection, including opening or pinging it.",
+                  [({}, metrics["connection_acquire"])])
+
+    out.family("beach_streamlit_active_sessions", "gauge", "Streamlit sessions that reran recently.", [({}, active_sessions)])
+    reruns = metrics["counters"].get("page_reruns", {})
+    out.family("beach_page_reruns_total", "counter", "Script reruns per page.",
+               [({"page": page}, count) for page, count in sorted(reruns.items())])
+
+    signups = metrics["counters"].get("signup_status", {})
+    statuses = list(SIGNUP_STATUSES) + sorted(set(signups) - set(SIGNUP_STATUSES))
+    out.family("beach_signups_total", "counter", "Signup attempts by result status.",
+               [({"status": status}, signups.get(status, 0)) for status in statuses])
+
+    functions = metrics["functions"]
+    out.histogram("beach_dm_call_duration_seconds", "data_manager call latency.",
+                  [({"function": name}, stats) for name, stats in functions.items()])
+    out.family("beach_dm_call_errors_total", "counter", "data_manager calls that raised, by exception type.",
+               [({"function": name, "type": error}, count)
+                for name, stats in functions.items() for error, count in stats["error_types"].items()])
+    return out.text()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "BeachMetrics/1.0"
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        try:
+            if path == "/metrics":
+                self._send(200, PROMETHEUS_CONTENT_TYPE, self.server.render_metrics())
+            elif path == "/ready":
+                ready, details = self.server.check_ready()
+                self._send(200 if ready else 503, "application/json", json.dumps(details, default=str))
+            elif path in ("/health", "/healthz"):
+                self._send(200, "text/plain; charset=utf-8", "ok\n")
+            else:
+                self._send(404, "text/plain; charset=utf-8", "not found\n")
+        except Exception as e:
+            print(f"Metrics endpoint {path} failed: {e}")
+            self._send(500, "text/plain; charset=utf-8", "error\n")
+
+    def _send(self, status, content_type, body):
+        payload = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass # Probes every few seconds would flood the container log
+
+
+class MetricsServer:
+    """
+    Serves `render_metrics()` (text) on /metrics and `check_ready()` ->
+    (ready, details dict) on /ready. port=0 picks a free port (see .port).
+    """
+
+    def __init__(self, render_metrics, check_ready, host="127.0.0.1", port=9101):
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.render_metrics = render_metrics
+        self._httpd.check_ready = check_ready
+        self._thread = None
+
+    @property
+    def port(self):
+        return self._httpd.server_address[1]
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._httpd.serve_forever, name="metrics-server", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
@@ -0,0 +1,110 @@
+"""
+Numbered schema migrations.
+
+The database records the last applied migration in a single-row schema_version
+table. migrate() reads that row (one query when the schema is current) and
+applies only the pending migrations, under a lock so replicas starting at the
+same time don't race each other. Every migration is idempotent, so databases
+created before schema_version existed are brought up to date safely too.
+
+To change the schema, append a migration; never edit or renumber one that has shipped.
+"""
+from datetime import datetime
+
+from db_backends import DB_ERRORS
+import standings
+
+
+def _create_tables(*tables):
+    def apply(backend, cursor):
+        for table in tables:
+            if not backend.table_exists(cursor, table):
+                cursor.execute(backend.SCHEMA[table])
+    return apply
+
+def _backfill_slot_counters(backend, cursor):
+    # Counters for slots that already have bookings; capacity is refreshed by the next booking
+    cursor.execute(
+        """
+        INSERT INTO slot_counters (activity, timeslot, capacity, booked, checked_in)
+        SELECT r.activity, r.timeslot, COUNT(*), COUNT(*), SUM(CASE WHEN r.checked_in = 1 THEN 1 ELSE 0 END)
+        FROM registrations r
+        WHERE NOT EXISTS (SELECT 1 FROM slot_counters c WHERE c.activity = r.activity AND c.timeslot = r.timeslot)
+        GROUP BY r.activity, r.timeslot
+        """
+    )
+
+def _backfill_standings(backend, cursor):
+    standings.add_teams(cursor, datetime.now())
+
+def _seed_scoreboard_version(backend, cursor):
+    cursor.execute("SELECT 1 FROM scoreboard_version WHERE id = 1")
+    if cursor.fetchone() is None:
+        cursor.execute("INSERT INTO scoreboard_version (id, version) VALUES (1, 1)")
+
+def create_indexes(backend, cursor, indexes=None):
+    """Creates whichever of `indexes` (default: all of backend.INDEXES) don't exist; also repairs dropped ones."""
+    for index in indexes or backend.INDEXES:
+        if not backend.index_exists(cursor, index):
+            cursor.execute(backend.INDEXES[index])
+
+def _create_indexes(*indexes):
+    def apply(backend, cursor):
+        create_indexes(backend, cursor, indexes)
+    return apply
+
+
+# (version, description, apply(backend, cursor))
+MIGRATIONS = [
+    (1, "base tables", _create_tables("participants", "registrations", "competitive_games", "teams", "game_scores")),
+    (2, "passphrase reservations", _create_tables("passphrase_reservations")),
+    (3, "slot counters", _create_tables("slot_counters")),
+    (4, "backfill slot counters", _backfill_slot_counters),
+    (5, "hot lookup indexes", _create_indexes(
+        "IX_registrations_slot", "IX_registrations_user_time", "IX_registrations_checked_in", "IX_game_scores_team")),
+    (6, "team standings", _create_tables("team_standings")),
+    (7, "standings index", _create_indexes("IX_team_standings_rank")),
+    (8, "backfill team standings", _backfill_standings),
+    (9, "scoreboard version", _create_tables("scoreboard_version")),
+    (10, "seed scoreboard version", _seed_scoreboard_version),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn):
+    """The recorded schema version, or 0 for a new (or pre-versioning) database."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT version FROM schema_version")
+        row = cursor.fetchone()
+    except DB_ERRORS: # No schema_version table yet
+        conn.rollback()
+        return 0
+    return row[0] if row else 0
+
+
+def migrate(conn, backend):
+    """Applies pending migrations and commits. Returns the (version, description) pairs applied."""
+    if current_version(conn) >= LATEST_VERSION:
+        return []
+    cursor = conn.cursor()
+    try:
+        backend.migration_lock(cursor)
+        if not backend.table_exists(cursor, "schema_version"):
+            cursor.execute(backend.SCHEMA["schema_version"])
+        version = current_version(conn) # Another replica may have migrated while we waited for the lock
+        applied = []
+        for number, description, apply in MIGRATIONS:
+            if number > version:
+                apply(backend, cursor)
+                applied.append((number, description))
+        if applied:
+            cursor.execute("UPDATE schema_version SET version = ?, updated_time = ? WHERE id = 1", (LATEST_VERSION, datetime.now()))
+            if cursor.rowcount == 0:
+                cursor.execute("INSERT INTO schema_version (id, version, updated_time) VALUES (1, ?, ?)", (LATEST_VERSION, datetime.now()))
+        conn.commit()
+        return applied
+    except Exception:
+        conn.rollback()
+        raise
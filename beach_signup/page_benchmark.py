@@ -0,0 +1,254 @@
+"""
+Page-level performance checks: runs each page script headlessly with Streamlit's
+AppTest against a seeded local SQLite database and records, per rerun, the wall
+time, the SQL statements executed and the pooled connections borrowed.
+
+The shared caches are cleared before every measured rerun, so the numbers are the
+worst case (a rerun right after the cache expired) and don't depend on timing.
+A scenario fails when any measured rerun goes over its PAGE_BUDGETS entry. The
+test suite checks only the query and checkout counts, which are deterministic;
+the millisecond budgets are enforced by this command, on a known machine.
+
+    python page_benchmark.py --reruns 10
+    python page_benchmark.py --budgets budgets.json --out pages.json
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from streamlit.testing.v1 import AppTest
+
+import data_manager as dm
+from db_backends import SQLiteBackend
+
+PAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pages")
+ACTIVITY = "Massage by SAVH"
+ADMIN_SECRETS = {"username": "bench-admin", "password": "bench-password"}
+
+# Per-rerun limits: SQL statements, pooled connection checkouts and wall time (ms).
+# Statement counts are deterministic, so they are set to what the pages do today:
+# a change that adds queries to a page has to raise its budget here.
+PAGE_BUDGETS = {
+    "signup:new_guest": {"queries": 3, "checkouts": 3, "ms": 1500},
+    "signup:returning": {"queries": 3, "checkouts": 3, "ms": 1500},
+    "signup:my_bookings": {"queries": 3, "checkouts": 3, "ms": 1500},
+    "admin:overview": {"queries": 2, "checkouts": 2, "ms": 1500},
+    "admin:scores": {"queries": 11, "checkouts": 11, "ms": 2000}, # Every tab renders, each loading games and teams
+    "scores:public": {"queries": 0, "checkouts": 0, "ms": 1500},  # Served from the shared snapshot
+}
+
+TRANSACTION_CONTROL = ("BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE", "PRAGMA")
+BACKGROUND_THREADS = ("scoreboard-broadcaster",) # Shared work, not caused by the rerun
+LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+class StatementCounter:
+    """sqlite3 trace callback that counts the statements run on behalf of the page."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.statements = Counter()
+
+    def record(self, sql):
+        statement = LITERALS.sub("?", " ".join(sql.split())) # The trace has the parameters filled in
+        if statement.upper().startswith(TRANSACTION_CONTROL):
+            return
+        if threading.current_thread().name.startswith(BACKGROUND_THREADS):
+            return
+        with self._lock:
+            self.statements[statement[:120]] += 1
+
+    def take(self):
+        """Returns and resets the statements counted so far."""
+        with self._lock:
+            statements, self.statements = self.statements, Counter()
+        return statements
+
+
+class TracingSQLiteBackend(SQLiteBackend):
+    """SQLiteBackend whose connections report every statement to a StatementCounter."""
+
+    def __init__(self, path, counter, **kwargs):
+        super().__init__(path, **kwargs)
+        self.counter = counter
+
+    def connect(self):
+        conn = super().connect()
+        conn.set_trace_callback(self.counter.record)
+        return conn
+
+
+def seed_pages(bookings=60, teams=6, games=4):
+    """Registrations across the configured slots, teams, games and scores. Returns a user id with a booking."""
+    timeslots = dm.get_timeslots(dm.get_activity_details(ACTIVITY)["duration"])
+    for i in range(bookings):
+        dm.add_registration(f"page-user-{i}", f"Page User {i}", ACTIVITY, timeslots[i % len(timeslots)])
+    for i in range(teams):
+        dm.add_team(f"Team {i}")
+    for i in range(games):
+        dm.add_competitive_game(f"Game {i}")
+    dm.update_scores_bulk([(game.id, team.id, (game.id * team.id) % 17) for game in dm.get_competitive_games() for team in dm.get_teams()])
+    return "page-user-0"
+
+
+def _select(key, value):
+    return lambda at: at.selectbox(key=key).select(value)
+
+def scenarios(returning_user):
+    """name -> (page file, session_state, interactions applied once before measuring)."""
+    admin_state = {"admin_auth_token": "bench-token"}
+    return {
+        "signup:new_guest": ("3_Massage_Sign_Up.py", {}, []),
+        "signup:returning": ("3_Massage_Sign_Up.py", {"user_id": returning_user}, []),
+        "signup:my_bookings": ("3_Massage_Sign_Up.py", {"user_id": returning_user}, [_select("user_action_select_v2", "My Bookings")]),
+        "admin:overview": ("4_Admin_Dashboard.py", admin_state, []),
+        "admin:scores": ("4_Admin_Dashboard.py", admin_state, [_select("admin_main_action_select_page", "Manage Competitive Games & Scores")]),
+        "scores:public": ("5_Competitive_Scores.py", {}, []),
+    }
+
+
+def measure_page(page, session_state, interactions, counter, reruns, timeout=30):
+    """
+    Runs `page` once to warm up (plus once per interaction), then `reruns` more times.
+    Returns {"warmup": run, "runs": [run, ...]}, where each run has ms, queries,
+    checkouts, connections_created, statements and exceptions.
+    """
+    at = AppTest.from_file(os.path.join(PAGES_DIR, page), default_timeout=timeout)
+    at.secrets["admin"] = ADMIN_SECRETS
+    for key, value in session_state.items():
+        at.session_state[key] = value
+
+    def run(step=None):
+        dm.invalidate_availability()
+        counter.take()
+        pool_before = dm.get_pool_stats()
+        started = time.perf_counter()
+        if step is None:
+            at.run()
+        else:
+            step(at).run()
+        elapsed = (time.perf_counter() - started) * 1000
+        pool_after = dm.get_pool_stats()
+        statements = counter.take()
+        return {
+            "ms": elapsed,
+            "queries": sum(statements.values()),
+            "checkouts": pool_after["checkouts"] - pool_before["checkouts"],
+            "connections_created": pool_after["connections_created"] - pool_before["connections_created"],
+            "statements": dict(statements),
+            "exceptions": [str(e.value) for e in at.exception],
+        }
+
+    warmup = run()
+    for interaction in interactions:
+        warmup = run(interaction)
+    return {"warmup": warmup, "runs": [run() for _ in range(reruns)]}
+
+
+def summarize(measured):
+    runs = measured["runs"]
+    return {
+        "reruns": len(runs),
+        "warmup_ms": measured["warmup"]["ms"],
+        "median_ms": statistics.median(run["ms"] for run in runs),
+        "max_ms": max(run["ms"] for run in runs),
+        "queries": max(run["queries"] for run in runs),
+        "checkouts": max(run["checkouts"] for run in runs),
+        "connections_created": sum(run["connections_created"] for run in runs),
+        "statements": max(runs, key=lambda run: run["queries"])["statements"],
+        "exceptions": sorted({e for run in [measured["warmup"], *runs] for e in run["exceptions"]}),
+    }
+
+
+def check_budgets(results, budgets=PAGE_BUDGETS, timing=True):
+    """
+    Human-readable budget violations (and page exceptions) for the summarized results.
+    timing=False skips the wall-time budgets, for runs on shared or slow machines.
+    """
+    problems = []
+    for name, result in results.items():
+        for exception in result["exceptions"]:
+            problems.append(f"{name}: page raised {exception}")
+        budget = budgets.get(name)
+        if budget is None:
+            continue
+        if result["queries"] > budget["queries"]:
+            problems.append(f"{name}: {result['queries']} queries per rerun, budget {budget['queries']}")
+        if result["checkouts"] > budget["checkouts"]:
+            problems.append(f"{name}: {result['checkouts']} connection checkouts per rerun, budget {budget['checkouts']}")
+        if timing and result["max_ms"] > budget["ms"]:
+            problems.append(f"{name}: {result['max_ms']:.0f} ms rerun, budget {budget['ms']} ms")
+    return problems
+
+
+def run_page_benchmarks(reruns=5, workdir=None, only=None):
+    """Seeds a fresh database, measures every scenario and returns {scenario: summary}."""
+    counter = StatementCounter()
+    with tempfile.TemporaryDirectory() as scratch:
+        db_path = os.path.join(workdir or scratch, "pages.db")
+        dm.use_backend(TracingSQLiteBackend(db_path, counter), max_size=8)
+        try:
+            dm.initialize_database()
+            returning_user = seed_pages()
+            # Keep the scoreboard thread from polling mid-measurement; score writes still poke it
+            dm.get_scoreboard_broadcaster().interval = 3600
+            results = {}
+            for name, (page, state, interactions) in scenarios(returning_user).items():
+                if only and name not in only:
+                    continue
+                results[name] = summarize(measure_page(page, state, interactions, counter, reruns))
+            return results
+        finally:
+            dm.use_backend(None)
+
+
+def format_results(results, budgets=PAGE_BUDGETS):
+    lines = [f"{'scenario':<22}{'median ms':>10}{'max ms':>9}{'warmup ms':>11}{'queries':>9}{'checkouts':>11}{'budget q/c/ms':>16}"]
+    for name, r in results.items():
+        b = budgets.get(name)
+        budget = f"{b['queries']}/{b['checkouts']}/{b['ms']}" if b else "-"
+        lines.append(
+            f"{name:<22}{r['median_ms']:>10.1f}{r['max_ms']:>9.1f}{r['warmup_ms']:>11.1f}"
+            f"{r['queries']:>9}{r['checkouts']:>11}{budget:>16}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure page reruns (time, queries, connections) against budgets.")
+    parser.add_argument("--reruns", type=int, default=5)
+    parser.add_argument("--only", nargs="+", help="Scenario names to run")
+    parser.add_argument("--budgets", help="JSON file of budgets overriding PAGE_BUDGETS entries")
+    parser.add_argument("--out", help="Write the results JSON here")
+    parser.add_argument("--verbose", action="store_true", help="List the statements of each scenario")
+    args = parser.parse_args(argv)
+
+    budgets = dict(PAGE_BUDGETS)
+    if args.budgets:
+        with open(args.budgets) as f:
+            budgets.update(json.load(f))
+    results = run_page_benchmarks(args.reruns, only=args.only)
+    print(format_results(results, budgets))
+    if args.verbose:
+        for name, result in results.items():
+            print(f"\n{name}:")
+            for statement, count in result["statements"].items():
+                print(f"  {count} x {statement}")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"budgets": budgets, "results": results}, f, indent=2)
+    problems = check_budgets(results, budgets)
+    for problem in problems:
+        print(f"OVER BUDGET {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
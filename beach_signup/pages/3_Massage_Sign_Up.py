@@ -4,7 +4,6 @@ import uuid
 import os
 import sys
 import datetime
-import ntplib
 import pytz
 
 # Path Adjustment for imports
@@ -40,26 +39,24 @@ display_minimal_session_header()
 import data_manager as dm
 import utils as ut
 
+dm.ensure_database() # Applies pending schema migrations once per process
+dm.record_page_run("signup") # Rerun and active-session metrics
+
 # --- NTP Time Function ---
 def get_current_singapore_time():
-    """Fetches time from NTP and converts to Singapore timezone."""
-    try:
-        ntp_client = ntplib.NTPClient()
-        response = ntp_client.request('pool.ntp.org', version=3)
-        ntp_time = datetime.datetime.fromtimestamp(response.tx_time, datetime.timezone.utc)
-        singapore_tz = pytz.timezone('Asia/Singapore')
-        return ntp_time.astimezone(singapore_tz)
-    except Exception as e:
-        st.error(f"Error fetching NTP time: {e}. Falling back to system time for checks (this might be inaccurate).")
-        # Fallback to system time in case NTP fails, but make it clear it's a fallback.
-        # For a production system, you might want a more robust fallback or error handling.
-        return datetime.datetime.now(pytz.timezone('Asia/Singapore'))
+    """
+    Singapore time corrected by the NTP offset that the shared clock service measures
+    in the background. Never waits on the network; until NTP has answered (or if it
+    can't be reached) this is the system time.
+    """
+    return dm.get_clock().now()
 
 # ADMIN_USERNAME and ADMIN_PASSWORD removed
 # show_admin_dashboard_page function removed
 
 # Function to display the participant sign-up page
-def show_signup_page(participant_session_id, current_participant_profile):
+# availability and user_existing_registrations are fetched up front by display_user_portal
+def show_signup_page(participant_session_id, current_participant_profile, availability, user_existing_registrations):
     st.header("📝 Sign Up For Massage by SAVH")
 
     # --- Display Activity Availability Grid (Moved Up) ---
@@ -70,10 +67,10 @@ def show_signup_page(participant_session_id, current_participant_profile):
     for activity_detail in all_activities_details:
         activity_name = activity_detail["name"]
         activity_duration = activity_detail["duration"]
-        activity_capacity = activity_detail["slots"]
         
         with st.expander(label=f"{activity_name} (Duration: {activity_duration} mins)", expanded=False):
-            activity_specific_timeslots = dm.get_timeslots(activity_duration)
+            activity_slots = availability.get(activity_name, [])
+            activity_specific_timeslots = [slot["timeslot"] for slot in activity_slots]
             activity_timeslots_info = []
             all_slots_for_activity_full = True
 
@@ -81,14 +78,14 @@ def show_signup_page(participant_session_id, current_participant_profile):
                 st.markdown("<font color='orange'>No timeslots available for this activity based on its duration and event schedule.</font>", unsafe_allow_html=True)
                 continue
 
-            for timeslot_item in activity_specific_timeslots:
-                count = dm.get_signup_count(activity_name, timeslot_item)
-                available_slots = activity_capacity - count
+            for slot in activity_slots:
+                timeslot_item = slot["timeslot"]
+                available_slots = slot["remaining"]
 
                 status_text = ""
-                if available_slots <= 0:
+                if slot["is_full"]:
                     status_text = f"**{timeslot_item}:** <font color='red'>Full</font>"
-                elif available_slots <= (activity_capacity * 0.1): # e.g., <= 3 if capacity is 30
+                elif slot["is_low"]: # e.g., <= 3 if capacity is 30
                     status_text = f"**{timeslot_item}:** <font color='orange'>{available_slots} Slots Available</font>"
                     all_slots_for_activity_full = False
                 else:
@@ -118,14 +115,12 @@ def show_signup_page(participant_session_id, current_participant_profile):
                         st.markdown(info_md, unsafe_allow_html=True)
 
     # --- Conditional Display: Warning or Signup Form ---
-    user_existing_registrations = dm.get_user_registrations(participant_session_id)
-
     if user_existing_registrations:
         st.warning("You already have an active booking. You can only sign up for one activity at a time.")
         st.info("Please visit the 'My Bookings' page (accessible from the sidebar if added to navigation) to view or cancel your current booking if you wish to sign up for a different activity.")
     else:
         st.subheader("Book Your Slot")
-        default_name = current_participant_profile['name'] if current_participant_profile else ""
+        default_name = current_participant_profile.name if current_participant_profile else ""
         
         activity_names_list = dm.get_activities() # Get just the names for the first selectbox
 
@@ -160,11 +155,10 @@ def show_signup_page(participant_session_id, current_participant_profile):
             # If no activity available, no error, form will just be mostly disabled.
 
             is_slot_full_check = False 
-            current_activity_capacity = 0 
             if activity_details and selected_timeslot : 
-                current_activity_capacity = activity_details["slots"]
-                if dm.get_signup_count(activity_details["name"], selected_timeslot) >= current_activity_capacity:
-                    is_slot_full_check = True
+                for slot in availability.get(activity_details["name"], []):
+                    if slot["timeslot"] == selected_timeslot and slot["is_full"]:
+                        is_slot_full_check = True
             
             submit_button_disabled = is_slot_full_check or not selected_timeslot or not activity_specific_timeslots or not activity_details
             submit_button = st.form_submit_button("Sign Up", disabled=submit_button_disabled)
@@ -181,18 +175,9 @@ def show_signup_page(participant_session_id, current_participant_profile):
                 if not final_activity_details:
                     st.error("Critical error: Activity details not found on submit. Please refresh.")
                     return
-                
-                final_activity_capacity = final_activity_details["slots"]
-                current_count_on_submit = dm.get_signup_count(final_selected_activity_name, final_selected_timeslot)
-                
-                if current_count_on_submit >= final_activity_capacity:
-                    st.error(f"Sorry, {final_selected_activity_name} at {final_selected_timeslot} just became full as you were submitting.")
-                    st.rerun()
-                    return
 
-                if not current_participant_profile: 
-                    dm.create_participant(participant_session_id, name.strip())
-                
+                # Creates the participant profile if needed and checks the slot capacity
+                # in the same transaction as the booking, so no separate checks here.
                 reg_id, new_passphrase, status_msg = dm.add_registration(
                     participant_session_id, 
                     name.strip(), 
@@ -211,45 +196,45 @@ def show_signup_page(participant_session_id, current_participant_profile):
                 elif status_msg == "LIMIT_REACHED":
                      st.error("You already have an active booking. This form should not have been available.")
                      st.rerun()
+                elif status_msg == "SLOT_FULL":
+                    st.error(f"Sorry, {final_selected_activity_name} at {final_selected_timeslot} just became full as you were submitting.")
                 elif status_msg == "ALREADY_BOOKED_TIMESLOT": 
                      st.error(f"It seems you have already booked this specific slot ({final_selected_activity_name} at {final_selected_timeslot}) or another conflicting booking.")
                 else:
                     st.error(f"Signup failed due to an unexpected issue ({status_msg}). Please try again or contact support.")
 
-def show_my_bookings_page(user_id, participant_profile):
+def show_my_bookings_page(user_id, participant_profile, user_registrations):
     st.header("My Active Booking")
 
     if not participant_profile:
         st.warning("Please register your name on the 'Sign Up For Activities' page first if you are a new user.")
         return
 
-    user_registrations = dm.get_user_registrations(user_id)
-
     if not user_registrations:
         st.info("You have no active bookings.")
         st.write("Feel free to sign up for an activity!")
     else:
         current_booking = user_registrations[0]
 
-        st.subheader(f"Your booking for: {current_booking['activity']}")
-        st.markdown(f"**Timeslot:** {current_booking['timeslot']}")
-        st.markdown(f"**Your Name (for this booking):** {current_booking['participant_name']}")
+        st.subheader(f"Your booking for: {current_booking.activity}")
+        st.markdown(f"**Timeslot:** {current_booking.timeslot}")
+        st.markdown(f"**Your Name (for this booking):** {current_booking.participant_name}")
 
         st.markdown("---")
         st.subheader("Your Verification Passphrase:")
-        st.code(ut.format_passphrase_display(current_booking['registration_passphrase']))
+        st.code(ut.format_passphrase_display(current_booking.registration_passphrase))
         st.warning("IMPORTANT: Do not share this passphrase with anyone. It is your unique code for check-in.")
         st.markdown("---")
 
-        is_checked_in = bool(current_booking['checked_in']) # Convert 0/1 to False/True
+        is_checked_in = bool(current_booking.checked_in) # Convert 0/1 to False/True
 
         if is_checked_in:
             st.warning("🔒 This booking cannot be canceled as you are already checked in for the activity.")
 
         cancel_button_disabled = is_checked_in
 
-        if st.button("Cancel This Booking", key=f"cancel_booking_{current_booking['id']}", type="primary", disabled=cancel_button_disabled):
-            if dm.cancel_registration(current_booking['id']):
+        if st.button("Cancel This Booking", key=f"cancel_booking_{current_booking.id}", type="primary", disabled=cancel_button_disabled):
+            if dm.cancel_registration(current_booking.id):
                 st.success("Your booking has been successfully cancelled.")
                 st.info("You can now sign up for a new activity.")
                 st.balloons()
@@ -277,7 +262,12 @@ def display_user_portal():
     #     return # Stop further execution if portal is locked
 
     user_id = st.session_state.user_id
-    participant_profile = dm.find_participant_by_id(user_id)
+    # Independent reads run in parallel, so this waits for the slowest one only
+    participant_profile, availability, user_registrations = dm.fetch_together(
+        lambda: dm.find_participant_by_id(user_id),
+        dm.get_availability_snapshot, # Every activity and timeslot in one query
+        lambda: dm.get_user_registrations(user_id),
+    )
 
     # Logic from the former "User Section"
     if st.session_state.get('signup_success'):
@@ -301,30 +291,30 @@ def display_user_portal():
     )
 
     if participant_profile:
-        participant_name_display = participant_profile['name'] if participant_profile else "Guest"
+        participant_name_display = participant_profile.name if participant_profile else "Guest"
         st.sidebar.info(f"Welcome, {participant_name_display}!")
         user_page_options = ["Sign Up For Activities", "My Bookings"]
         user_action = st.sidebar.selectbox("What would you like to do?", user_page_options, key="user_action_select_v2")
 
         if user_action == "Sign Up For Activities":
-            show_signup_page(user_id, participant_profile)
+            show_signup_page(user_id, participant_profile, availability, user_registrations)
         elif user_action == "My Bookings":
-            show_my_bookings_page(user_id, participant_profile)
+            show_my_bookings_page(user_id, participant_profile, user_registrations)
 
-        my_registrations = dm.get_registrations_for_participant(user_id)
+        my_registrations = user_registrations # Same rows as get_registrations_for_participant
         if my_registrations:
             with st.expander("View My Current Registrations"):
                 if not my_registrations:
                      st.write("No registrations found.")
                 else:
                     for reg in my_registrations:
-                        st.markdown(f"- **Activity:** {reg['activity']}")
-                        st.markdown(f"  **Timeslot:** {reg['timeslot']}")
-                        st.markdown(f"  **Passphrase:** {ut.format_passphrase_display(reg['registration_passphrase'])}")
+                        st.markdown(f"- **Activity:** {reg.activity}")
+                        st.markdown(f"  **Timeslot:** {reg.timeslot}")
+                        st.markdown(f"  **Passphrase:** {ut.format_passphrase_display(reg.registration_passphrase)}")
                         st.markdown("---")
     else:
         st.sidebar.info("Welcome, new guest! Please sign up for an activity to register.")
-        show_signup_page(user_id, participant_profile) # participant_profile will be None here
+        show_signup_page(user_id, participant_profile, availability, user_registrations) # participant_profile will be None here
 
 # Call the main function for this page
 display_user_portal()
\ No newline at end of file
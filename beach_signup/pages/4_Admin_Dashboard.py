@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
 import secrets
+import json
 import os
 import sys
 
@@ -20,8 +21,12 @@ initialize_user_if_needed()
 # -----------------------------------------
 
 import data_manager as dm
+import scoreboard
 import utils as ut
 
+dm.ensure_database() # Applies pending schema migrations once per process
+dm.record_page_run("admin") # Rerun and active-session metrics
+
 # Admin Credentials
 ADMIN_USERNAME = st.secrets["admin"]["username"]
 ADMIN_PASSWORD = st.secrets["admin"]["password"]
@@ -31,13 +36,10 @@ def show_admin_dashboard_page():
     st.header("👑 Admin Dashboard")
 
     # --- Admin Metrics Overview ---
-    total_registrations = dm.get_total_registration_count()
-    checked_in_count = dm.get_checked_in_count()
-
-    if total_registrations > 0:
-        check_in_rate = (checked_in_count / total_registrations) * 100
-    else:
-        check_in_rate = 0
+    stats = dm.get_registration_stats() # Overall, per-activity and per-timeslot numbers in one query
+    total_registrations = stats["total"]
+    checked_in_count = stats["checked_in"]
+    check_in_rate = stats["check_in_rate"]
 
     st.subheader("Event Snapshot")
     col1, col2, col3 = st.columns(3)
@@ -49,7 +51,9 @@ def show_admin_dashboard_page():
     admin_action_options = [
         "View Activity Status & Check-In", 
         "Verify by Passphrase & Check-In",
-        "Manage Competitive Games & Scores"
+        "Manage Competitive Games & Scores",
+        "Export Data",
+        "Performance Metrics"
     ]
     admin_action = st.selectbox("Admin Actions:",
                                 admin_action_options,
@@ -71,9 +75,10 @@ def show_admin_dashboard_page():
         st.markdown(f"### Activity: {selected_activity}")
         st.info("Only one activity is configured for this event.")
         
-        activity_total_regs = dm.get_total_registration_count_for_activity(selected_activity)
-        activity_checked_in = dm.get_checked_in_count_for_activity(selected_activity)
-        activity_check_in_rate = (activity_checked_in / activity_total_regs) * 100 if activity_total_regs > 0 else 0
+        activity_stats = stats["activities"].get(selected_activity, {"total": 0, "checked_in": 0, "check_in_rate": 0, "timeslots": {}})
+        activity_total_regs = activity_stats["total"]
+        activity_checked_in = activity_stats["checked_in"]
+        activity_check_in_rate = activity_stats["check_in_rate"]
 
         act_col1, act_col2, act_col3 = st.columns(3)
         act_col1.metric(f"Total Registrations", activity_total_regs)
@@ -81,34 +86,48 @@ def show_admin_dashboard_page():
         act_col3.metric(f"Check-In Rate", f"{activity_check_in_rate:.2f}%")
         st.markdown("---")
 
-        # Get timeslots for the selected activity
+        # Get timeslots (with booked/remaining counts) for the selected activity
         activity_details = dm.get_activity_details(selected_activity)
         if activity_details:
-            timeslots = dm.get_timeslots(activity_details["duration"])
+            activity_slots = dm.get_availability_snapshot().get(selected_activity, [])
+            timeslots = [slot["timeslot"] for slot in activity_slots]
             
             if not timeslots:
                 st.warning("No timeslots available for this activity.")
                 return
-                
-            selected_timeslot = st.selectbox("Select Timeslot:", [""] + timeslots, key="admin_select_timeslot_page")
+
+            st.dataframe(
+                pd.DataFrame([{
+                    "Timeslot": slot["timeslot"],
+                    "Booked": slot["booked"],
+                    "Remaining": slot["remaining"],
+                    "Checked-In": activity_stats["timeslots"].get(slot["timeslot"], {}).get("checked_in", 0),
+                    "Status": "Full" if slot["is_full"] else ("Almost full" if slot["is_low"] else "Open"),
+                } for slot in activity_slots]),
+                use_container_width=True,
+                hide_index=True
+            )
+
+            slot_labels = {slot["timeslot"]: f'{slot["timeslot"]} ({slot["booked"]}/{slot["capacity"]} booked)' for slot in activity_slots}
+            selected_timeslot = st.selectbox(
+                "Select Timeslot:", [""] + timeslots,
+                format_func=lambda timeslot: slot_labels.get(timeslot, timeslot),
+                key="admin_select_timeslot_page"
+            )
 
             if selected_timeslot:
                 st.markdown(f"**Registrations for {selected_activity} at {selected_timeslot}:**")
-                registrations = dm.get_registrations_for_timeslot(selected_activity, selected_timeslot)
-                if not registrations:
+                roster = dm.get_registrations_frame(selected_activity, selected_timeslot) # Columnar, no per-row dicts
+                if roster.empty:
                     st.info("No registrations for this timeslot yet.")
                 else:
-                    display_data = []
-                    for reg in registrations:
-                        is_checked_in = bool(reg['checked_in'])
-                        display_data.append({
-                            "Reg ID": reg['id'],
-                            "Name": reg['participant_name'],
-                            "Passphrase": ut.format_passphrase_display(reg['registration_passphrase']),
-                            "Checked In": is_checked_in,
-                            "Remove": False,  # New column for deletion
-                        })
-                    registrations_df = pd.DataFrame(display_data)
+                    registrations_df = pd.DataFrame({
+                        "Reg ID": roster["id"],
+                        "Name": roster["participant_name"],
+                        "Passphrase": roster["registration_passphrase"].map(ut.format_passphrase_display),
+                        "Checked In": roster["checked_in"].fillna(0).astype(bool),
+                        "Remove": False,  # New column for deletion
+                    })
                     if not registrations_df.empty:
                         disabled_columns = [col for col in registrations_df.columns if col not in ["Checked In", "Remove"]]
                         edited_df = st.data_editor(
@@ -189,20 +208,20 @@ def show_admin_dashboard_page():
             if not registration:
                 st.error("Invalid or unknown passphrase. Please check the input (format: word-word-word-word).")
             else:
-                st.success(f"Registration Found for Passphrase: **{ut.format_passphrase_display(registration['registration_passphrase'])}**")
+                st.success(f"Registration Found for Passphrase: **{ut.format_passphrase_display(registration.registration_passphrase)}**")
                 details_cols = st.columns(2)
-                details_cols[0].markdown(f"**Name:** {registration['participant_name']}")
-                details_cols[1].markdown(f"**Activity:** {registration['activity']}")
-                details_cols[1].markdown(f"**Timeslot:** {registration['timeslot']}")
+                details_cols[0].markdown(f"**Name:** {registration.participant_name}")
+                details_cols[1].markdown(f"**Activity:** {registration.activity}")
+                details_cols[1].markdown(f"**Timeslot:** {registration.timeslot}")
                 st.markdown("---")
-                if bool(registration['checked_in']):
+                if bool(registration.checked_in):
                     st.warning("This participant is already checked-in.")
                 else:
                     st.info("Status: Pending Check-In")
-                    checkin_button_key = f"passphrase_checkin_verify_view_page_{registration['id']}"
+                    checkin_button_key = f"passphrase_checkin_verify_view_page_{registration.id}"
                     if st.button("Check-In Participant", key=checkin_button_key, type="primary"):
-                        if dm.check_in_registration(registration['id']):
-                            st.success(f"Successfully checked in {registration['participant_name']} for {registration['activity']}.")
+                        if dm.check_in_registration(registration.id):
+                            st.success(f"Successfully checked in {registration.participant_name} for {registration.activity}.")
                             st.balloons()
                             st.rerun()
                         else:
@@ -212,38 +231,28 @@ def show_admin_dashboard_page():
 
     elif admin_action == "Manage Competitive Games & Scores":
         st.subheader("🏅 Manage Competitive Games & Scores")
-        tab1, tab2, tab3 = st.tabs(["Manage Scores", "Manage Games", "Manage Teams"])
+        tab1, tab2, tab3, tab4 = st.tabs(["Manage Scores", "Manage Games", "Manage Teams", "Judge Station"])
 
         with tab1: # Manage Scores
             st.markdown("#### Update Team Scores")
             
-            games = dm.get_competitive_games()
-            teams = dm.get_teams()
+            games, teams = dm.fetch_together(dm.get_competitive_games, dm.get_teams)
 
             if not games or not teams:
                 st.warning("Please add games and teams first using the 'Manage Games' and 'Manage Teams' tabs before updating scores.")
             else:
                 # Fetch current scores for display and editing
-                score_data, game_names, team_names = dm.get_all_scores()
+                # Rows: Teams, Columns: Game Names, Values: Scores
+                score_matrix = dm.get_score_matrix()
 
-                if not game_names or not team_names:
+                if score_matrix.empty:
                     st.info("No games or teams available to score. Add them in the respective tabs.")
                 else:
-                    # Create a DataFrame for st.data_editor
-                    # Rows: Teams, Columns: Game Names, Values: Scores
-                    editor_data = []
-                    for team_name in team_names:
-                        row = {'Team': team_name}
-                        # Ensure all games are columns for each team
-                        for game_name in game_names:
-                            row[game_name] = score_data.get(team_name, {}).get(game_name, 0)
-                        editor_data.append(row)
-                    
-                    scores_df = pd.DataFrame(editor_data)
-                    
+                    scores_df = score_matrix.reset_index()
+
                     # Get team and game maps for ID lookup
-                    team_map = {team['name']: team['id'] for team in teams}
-                    game_map = {game['name']: game['id'] for game in games}
+                    team_map = {team.name: team.id for team in teams}
+                    game_map = {game.name: game.id for game in games}
 
                     edited_df = st.data_editor(
                         scores_df,
@@ -255,42 +264,31 @@ def show_admin_dashboard_page():
                     )
                     
                     if st.button("Save All Score Changes", key="save_all_scores_button"):
-                        changes_made = 0
+                        # One whole-frame compare finds the changed cells (and the invalid ones)
+                        changed, problems = scoreboard.changed_cells(score_matrix, edited_df.set_index('Team'))
                         errors = 0
-                        for index, row in edited_df.iterrows():
-                            team_name = row['Team']
-                            if team_name not in team_map:
+                        for team_name, game_name in problems:
+                            if game_name is None:
                                 st.error(f"Team '{team_name}' not found in mapping. Skipping.")
-                                errors +=1
-                                continue
-                            
-                            team_id = team_map[team_name]
-                            
-                            for game_name in game_names: # Iterate through game_names to ensure all are checked
-                                if game_name not in game_map:
-                                    st.error(f"Game '{game_name}' not found in mapping. Skipping for team {team_name}.")
-                                    errors +=1
-                                    continue
-                                
-                                game_id = game_map[game_name]
-                                new_score = row[game_name]
-                                
-                                # Check if score actually changed to avoid unnecessary DB calls
-                                original_score = score_data.get(team_name, {}).get(game_name, 0)
-                                try:
-                                    new_score_val = int(new_score) # Ensure score is an int
-                                except ValueError:
-                                    st.error(f"Invalid score '{new_score}' for {team_name} in {game_name}. Must be a number. Score not updated.")
-                                    errors +=1
-                                    continue
-
-                                if new_score_val != original_score:
-                                    if dm.update_score(game_id, team_id, new_score_val):
-                                        changes_made += 1
-                                    else:
-                                        st.error(f"Failed to update score for {team_name} in {game_name}.")
-                                        errors += 1
-                        
+                            else:
+                                st.error(f"Invalid score for {team_name} in {game_name}. Must be a whole number. Score not updated.")
+                            errors += 1
+
+                        changes = [
+                            (game_map[game_name], team_map[team_name], score)
+                            for team_name, game_name, score in changed
+                            if team_name in team_map and game_name in game_map
+                        ]
+
+                        # All changed cells are saved together in one transaction
+                        changes_made = 0
+                        if changes:
+                            if dm.update_scores_bulk(changes):
+                                changes_made = len(changes)
+                            else:
+                                st.error(f"Failed to save {len(changes)} score change(s). No scores were updated.")
+                                errors += 1
+
                         if changes_made > 0:
                             st.success(f"{changes_made} score(s) updated successfully!")
                         if errors == 0 and changes_made == 0:
@@ -320,16 +318,15 @@ def show_admin_dashboard_page():
             if not current_games:
                 st.info("No competitive games added yet.")
             else:
-                games_df = pd.DataFrame(current_games)
-                for index, row in games_df.iterrows():
+                for game in current_games:
                     col1, col2 = st.columns([0.8, 0.2])
-                    col1.write(row['name'])
-                    if col2.button("🗑️ Delete", key=f"delete_game_{row['id']}", help=f"Delete game '{row['name']}'. This will also delete all associated scores."):
-                        if dm.delete_competitive_game(row['id']):
-                            st.success(f"Game '{row['name']}' and its scores deleted.")
+                    col1.write(game.name)
+                    if col2.button("🗑️ Delete", key=f"delete_game_{game.id}", help=f"Delete game '{game.name}'. This will also delete all associated scores."):
+                        if dm.delete_competitive_game(game.id):
+                            st.success(f"Game '{game.name}' and its scores deleted.")
                             st.rerun()
                         else:
-                            st.error(f"Failed to delete game '{row['name']}'.")
+                            st.error(f"Failed to delete game '{game.name}'.")
         
         with tab3: # Manage Teams
             st.markdown("#### Add New Team")
@@ -351,16 +348,116 @@ def show_admin_dashboard_page():
             if not current_teams:
                 st.info("No teams added yet.")
             else:
-                teams_df = pd.DataFrame(current_teams)
-                for index, row in teams_df.iterrows():
+                for team in current_teams:
                     col1, col2 = st.columns([0.8, 0.2])
-                    col1.write(row['name'])
-                    if col2.button("🗑️ Delete", key=f"delete_team_{row['id']}", help=f"Delete team '{row['name']}'. This will also delete all associated scores."):
-                        if dm.delete_team(row['id']):
-                            st.success(f"Team '{row['name']}' and its scores deleted.")
+                    col1.write(team.name)
+                    if col2.button("🗑️ Delete", key=f"delete_team_{team.id}", help=f"Delete team '{team.name}'. This will also delete all associated scores."):
+                        if dm.delete_team(team.id):
+                            st.success(f"Team '{team.name}' and its scores deleted.")
                             st.rerun()
                         else:
-                            st.error(f"Failed to delete team '{row['name']}'.")
+                            st.error(f"Failed to delete team '{team.name}'.")
+
+        with tab4: # Judge Station
+            st.markdown("#### Judge Station")
+            st.caption("Add or take away points at your station. Points are added to the current score, "
+                       "so several judges can enter points at the same time.")
+            games, teams = dm.fetch_together(dm.get_competitive_games, dm.get_teams)
+            if not games or not teams:
+                st.warning("Please add games and teams first using the 'Manage Games' and 'Manage Teams' tabs.")
+            else:
+                game_map = {game.name: game.id for game in games}
+                team_map = {team.name: team.id for team in teams}
+                station = st.selectbox("Your station", list(game_map), key="judge_station_game")
+                with st.form("judge_points_form"):
+                    team_name = st.selectbox("Team", list(team_map), key="judge_station_team")
+                    points = st.number_input("Points (negative to deduct)", value=1, step=1, key="judge_station_points")
+                    submit_points = st.form_submit_button("Add Points")
+                if submit_points:
+                    if points == 0:
+                        st.info("Enter a non-zero number of points.")
+                    else:
+                        new_score = dm.add_points(game_map[station], team_map[team_name], int(points))
+                        if new_score is None:
+                            st.error(f"Failed to add points for {team_name}.")
+                        else:
+                            st.success(f"{team_name} now has {new_score} point(s) in {station}.")
+
+                station_scores = dm.get_scores_for_game(game_map[station])
+                if station_scores:
+                    st.dataframe(
+                        pd.DataFrame({'Team': [entry.team_name for entry in station_scores],
+                                      'Score': [entry.score for entry in station_scores]}),
+                        use_container_width=True,
+                        hide_index=True
+                    )
+
+    elif admin_action == "Export Data":
+        st.subheader("📥 Export Data")
+        st.caption("Downloads are built when you click Prepare, straight from the database.")
+        if st.button("Prepare Exports", key="prepare_exports_button"):
+            registrations_export, scores_export = dm.fetch_together(dm.get_registrations_frame, dm.get_scores_frame)
+            col1, col2 = st.columns(2)
+            col1.download_button(
+                f"Registrations ({len(registrations_export)} rows)",
+                registrations_export.to_csv(index=False),
+                file_name="registrations.csv",
+                mime="text/csv",
+            )
+            col2.download_button(
+                f"Scores ({len(scores_export)} rows)",
+                scores_export.to_csv(index=False),
+                file_name="scores.csv",
+                mime="text/csv",
+            )
+
+    elif admin_action == "Performance Metrics":
+        st.subheader("⏱️ Performance Metrics")
+        instrumentation = dm.get_instrumentation()
+        metrics = instrumentation.snapshot()
+        started = pd.Timestamp(metrics["started_at"], unit="s").strftime("%Y-%m-%d %H:%M:%S")
+        st.caption(f"Collected by this app process since {started} (UTC). Latency percentiles are bucket upper bounds.")
+
+        pool = dm.get_pool_stats()
+        acquire = metrics["connection_acquire"]
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Connections in use", f"{pool['in_use']} / {pool['max_size']}")
+        col2.metric("Pool waits / timeouts", f"{pool['waiting']} / {pool['timeouts']}")
+        col3.metric("Acquire p95 (ms)", f"{acquire['p95_ms'] or 0:.2f}")
+        col4.metric("Acquire max (ms)", f"{acquire['max_ms']:.2f}")
+
+        def metrics_table(rows, label):
+            return pd.DataFrame([
+                {label: name, "Calls": m["calls"], "Errors": m["errors"], "Rows": m["rows"],
+                 "Mean ms": m["mean_ms"], "p50 ms": m["p50_ms"], "p95 ms": m["p95_ms"], "p99 ms": m["p99_ms"],
+                 "Max ms": m["max_ms"], "Error types": ", ".join(f"{k}: {v}" for k, v in m["error_types"].items())}
+                for name, m in rows.items()
+            ])
+
+        st.markdown("#### data_manager functions")
+        if metrics["functions"]:
+            st.dataframe(metrics_table(metrics["functions"], "Function").sort_values("Calls", ascending=False),
+                         use_container_width=True, hide_index=True)
+        else:
+            st.info("No calls recorded yet.")
+        st.markdown("#### SQL statements")
+        if metrics["statements"]:
+            st.dataframe(metrics_table(metrics["statements"], "Statement").sort_values("Calls", ascending=False),
+                         use_container_width=True, hide_index=True)
+        else:
+            st.info("No statements recorded yet.")
+
+        col1, col2, col3 = st.columns(3)
+        col1.download_button("Download JSON", json.dumps(metrics, indent=2, default=str),
+                             file_name="instrumentation.json", mime="application/json")
+        if col2.button("Write Dump File", key="dump_instrumentation_button"):
+            try:
+                st.success(f"Metrics written to {dm.dump_instrumentation()}")
+            except OSError as e:
+                st.error(f"Could not write the metrics file: {e}")
+        if col3.button("Reset Metrics", key="reset_instrumentation_button"):
+            instrumentation.reset()
+            st.rerun()
 
 def display_admin_page():
     st.title("🔒 Admin Dashboard")
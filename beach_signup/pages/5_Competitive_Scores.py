@@ -23,35 +23,53 @@ def show_competitive_scores_page():
     st.title("🏆 Competitive Games Scoreboard 🏆")
     st.markdown("---")
 
-    score_data, game_names, team_names = dm.get_all_scores()
-    team_total_scores = dm.get_team_total_scores()
+    # The snapshot the background broadcaster shares between all viewers: no queries here
+    snapshot = dm.get_scoreboard_snapshot()
+    st.session_state.scoreboard_version = snapshot.version
+    show_scoreboard(snapshot)
+    watch_scoreboard()
+
+# Only this runs on the timer. It compares the version the broadcaster has published
+# (a read from memory) with the one on screen and reruns the page only when it moved,
+# so an unchanged scoreboard is neither fetched nor redrawn.
+@st.fragment(run_every=dm.get_scoreboard_page_refresh())
+def watch_scoreboard():
+    if dm.get_published_scoreboard_version() != st.session_state.get("scoreboard_version"):
+        st.rerun()
+
+def show_scoreboard(snapshot):
+    score_data, game_names, team_names = snapshot.score_data, snapshot.game_names, snapshot.team_names
+    team_standings = snapshot.standings # Totals and ranks are maintained as scores change
 
     if not team_names or not game_names:
         st.info("No teams or games found. Scores will be displayed once games and teams are added by an admin.")
         return
 
     st.subheader("🚀 Overall Team Standings")
-    if team_total_scores:
-        # Create a DataFrame for total scores
-        total_scores_df = pd.DataFrame(team_total_scores)
-        total_scores_df.index = total_scores_df.index + 1 # Rank starting from 1
-        total_scores_df.rename(columns={'team_name': 'Team', 'total_score': 'Total Score'}, inplace=True)
+    if team_standings:
+        # Create a DataFrame for total scores (tied teams share a rank)
+        total_scores_df = pd.DataFrame({
+            'Rank': [row.standing_rank for row in team_standings],
+            'Team': [row.team_name for row in team_standings],
+            'Total Score': [row.total_score for row in team_standings],
+        })
         
         # Display with medals for top 3
         def highlight_top_three(row):
-            if row.name == 1: # Rank 1
+            if row['Rank'] == 1:
                 return ['background-color: gold; color: black'] * len(row)
-            elif row.name == 2: # Rank 2
+            elif row['Rank'] == 2:
                 return ['background-color: silver; color: black'] * len(row)
-            elif row.name == 3: # Rank 3
+            elif row['Rank'] == 3:
                 return ['background-color: #CD7F32; color: white'] * len(row) # Bronze
             return [''] * len(row)
 
         st.dataframe(
             total_scores_df.style.apply(highlight_top_three, axis=1),
             use_container_width=True,
-            hide_index=False,
+            hide_index=True,
             column_config={
+                "Rank": st.column_config.NumberColumn(label="Rank", format="%d"),
                 "Team": st.column_config.TextColumn(label="Team"),
                 "Total Score": st.column_config.NumberColumn(label="Total Score", format="%d"),
             }
@@ -66,38 +84,20 @@ def show_competitive_scores_page():
         st.info("No scores recorded yet.")
         return
 
-    # Prepare data for the main scoreboard DataFrame
-    # Rows: Teams, Columns: Games, Values: Scores
-    df_data = []
-    for team_name in team_names:
-        row = {'Team': team_name}
-        for game_name in game_names:
-            row[game_name] = score_data.get(team_name, {}).get(game_name, 0)
-        df_data.append(row)
-
-    scores_df = pd.DataFrame(df_data)
-    scores_df = scores_df.set_index('Team')
-
-    # Calculate total scores for each team and add as a new column
-    scores_df['Total Score'] = scores_df.sum(axis=1)
-    
-    # Sort by Total Score descending
-    scores_df = scores_df.sort_values(by='Total Score', ascending=False)
-
-    # Display the DataFrame
-    st.dataframe(scores_df.style.format("{:.0f}"), use_container_width=True)
+    # Rows: Teams (in standing order), Columns: Games plus 'Total Score'.
+    # Built once per scoreboard version by the broadcaster and shared, so don't modify it.
+    st.dataframe(snapshot.table.style.format("{:.0f}"), use_container_width=True)
 
     st.markdown("---")
     st.caption("Scores are updated live as admins input them.")
 
 # Entry point for the page
 if __name__ == "__main__":
-    # Initialize database if it hasn't been (e.g., when running this page directly after pulling changes)
-    # This is more for robustness during development/first run.
-    # In a deployed app, initialization typically happens at app startup.
+    # Applies pending schema migrations once per process; a no-op on later reruns
     try:
-        dm.initialize_database() 
+        dm.ensure_database()
     except Exception as e:
-        print(f"Could not initialize database (might be already initialized or connection issue): {e}")
-    
+        print(f"Could not initialize database (connection issue?): {e}")
+    dm.record_page_run("scores") # Timer checks that find no new scores don't rerun the page, so aren't counted
+
     show_competitive_scores_page()
@@ -0,0 +1,79 @@
+import hashlib
+import hmac
+
+
+class PassphraseCodec:
+    """
+    Keyed, format-preserving permutation between registration ids and 4-word passphrases.
+
+    With W words there are W**4 phrases. An id is written as a pair of digits
+    in base W**2 and scrambled with a balanced Feistel network whose round
+    function is HMAC-SHA256 under a secret key; the result is spelled out as
+    four words. Every id < W**4 maps to a different phrase, phrases can't be
+    predicted from ids without the key, and decode() inverts encode().
+
+    Unlike reserved-pool phrases, a derived phrase may repeat a word
+    ("coral-sunny-coral-waves"): all W**4 combinations are used, which keeps
+    the mapping a simple permutation.
+    """
+    ROUNDS = 8
+
+    def __init__(self, words, key):
+        if not key:
+            raise ValueError("A secret key is required for derived passphrases")
+        self._words = list(dict.fromkeys(words)) # Dedupe, keep file order (must match across replicas)
+        if len(self._words) < 2:
+            raise ValueError("At least two distinct words are needed for derived passphrases")
+        self._index = {word: i for i, word in enumerate(self._words)}
+        self._key = key.encode() if isinstance(key, str) else key
+        self._half = len(self._words) ** 2
+        self.capacity = self._half ** 2 # Number of distinct ids/phrases
+
+    def encode(self, registration_id):
+        if not 0 <= registration_id < self.capacity:
+            raise ValueError(f"Registration id {registration_id} is outside the passphrase space")
+        left, right = divmod(registration_id, self._half)
+        for round_number in range(self.ROUNDS):
+            left, right = right, (left + self._round(round_number, right)) % self._half
+        value = left * self._half + right
+        base = len(self._words)
+        indexes = []
+        for _ in range(4):
+            value, digit = divmod(value, base)
+            indexes.append(digit)
+        return '-'.join(self._words[i] for i in reversed(indexes))
+
+    def decode(self, passphrase):
+        """Returns the registration id for a phrase, or None if it isn't a valid 4-word phrase."""
+        parts = passphrase.strip().lower().split('-')
+        if len(parts) != 4 or any(part not in self._index for part in parts):
+            return None
+        value = 0
+        for part in parts:
+            value = value * len(self._words) + self._index[part]
+        left, right = divmod(value, self._half)
+        for round_number in reversed(range(self.ROUNDS)):
+            left, right = (right - self._round(round_number, left)) % self._half, left
+        return left * self._half + right
+
+    def _round(self, round_number, value):
+        digest = hmac.new(self._key, f"{round_number}:{value}".encode(), hashlib.sha256).digest()
+        return int.from_bytes(digest[:8], "big") % self._half
+
+    def sql_params(self):
+        """
+        What a database needs to run encode() itself (see AzureSQLBackend.REGISTER_BATCH):
+        the HMAC inner and outer padded keys, the words as fixed-width text, the width, the
+        word count, and 2**64 mod W**2 for reading a round digest as an unsigned number.
+        """
+        key = self._key if len(self._key) <= 64 else hashlib.sha256(self._key).digest() # HMAC block size
+        key = key.ljust(64, b"\0")
+        width = max(len(word) for word in self._words)
+        return {
+            "ipad": bytes(byte ^ 0x36 for byte in key),
+            "opad": bytes(byte ^ 0x5C for byte in key),
+            "words": "".join(word.ljust(width) for word in self._words),
+            "word_width": width,
+            "base": len(self._words),
+            "wrap": 2 ** 64 % self._half,
+        }
@@ -0,0 +1,82 @@
+import random
+import threading
+from collections import deque
+
+
+def random_passphrase(words):
+    """Four distinct random words joined with dashes, e.g. 'apple-ocean-sunny-beach'."""
+    if len(words) < 4:
+        return f"reg-code-{random.randrange(10**9)}"
+    return '-'.join(random.sample(words, 4))
+
+
+class PassphraseAllocator:
+    """
+    Hands out registration passphrases from an in-memory pool.
+
+    Candidates are generated from the word list and reserved in batches through
+    `reserve(candidates) -> reserved`, which records them in the database so no
+    other replica can hand out the same phrase. take() is an O(1) pop; when the
+    pool drops below `low_water` a background thread reserves the next batch.
+    Only one refill runs at a time, so a burst of signups on an empty pool
+    waits for a single batch instead of each thread reserving its own.
+    """
+
+    def __init__(self, reserve, words, batch_size=50, low_water=10):
+        self._reserve = reserve
+        self._words = words
+        self.batch_size = batch_size
+        self.low_water = low_water
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._refilling = False
+
+    def available(self):
+        with self._cond:
+            return len(self._queue)
+
+    def take(self):
+        with self._cond:
+            while True:
+                if self._queue:
+                    passphrase = self._queue.popleft()
+                    if len(self._queue) < self.low_water and not self._refilling:
+                        self._refilling = True
+                        threading.Thread(target=self._refill, kwargs={"background": True}, daemon=True).start()
+                    return passphrase
+                if not self._refilling:
+                    self._refilling = True
+                    break
+                self._cond.wait(1.0)
+        # Pool is empty and nobody is refilling it: reserve a batch on this thread.
+        self._refill(background=False)
+        return self.take()
+
+    def give_back(self, passphrase):
+        """Returns an unused (still reserved) passphrase, e.g. after a full slot."""
+        with self._cond:
+            self._queue.appendleft(passphrase)
+            self._cond.notify()
+
+    def _refill(self, background):
+        reserved = []
+        try:
+            with self._cond:
+                in_pool = set(self._queue)
+            candidates = set()
+            while len(candidates) < self.batch_size:
+                candidate = random_passphrase(self._words)
+                if candidate not in in_pool:
+                    candidates.add(candidate)
+            reserved = self._reserve(sorted(candidates))
+            if not reserved and not background:
+                raise RuntimeError("Could not reserve any new passphrases")
+        except Exception as e:
+            if not background:
+                raise
+            print(f"Background passphrase refill failed: {e}")
+        finally:
+            with self._cond:
+                self._queue.extend(reserved)
+                self._refilling = False
+                self._cond.notify_all()
@@ -0,0 +1,107 @@
+"""
+Typed rows returned by data_manager.
+
+Each class is a slotted dataclass (no per-row __dict__). row_mapper() looks up
+the column positions once per statement from cursor.description, so building a
+row is a tuple lookup plus a constructor call.
+"""
+from dataclasses import dataclass, fields
+from operator import itemgetter
+
+
+@dataclass(slots=True)
+class Participant:
+    id: str
+    name: str
+    created_time: object
+
+
+@dataclass(slots=True)
+class Registration:
+    id: int
+    user_id: str
+    participant_name: str
+    activity: str
+    timeslot: str
+    registration_passphrase: str
+    registration_time: object
+    checked_in: int
+
+
+@dataclass(slots=True)
+class Team:
+    id: int
+    name: str
+
+
+@dataclass(slots=True)
+class Game:
+    id: int
+    name: str
+
+
+@dataclass(slots=True)
+class ScoreEntry:
+    """One team's score in one game, named from whichever side the query looked up."""
+    team_name: str
+    game_name: str
+    score: int
+    last_updated_time: object
+
+
+@dataclass(slots=True)
+class TeamTotal:
+    team_name: str
+    total_score: int
+
+
+@dataclass(slots=True, frozen=True) # Shared between sessions in the scoreboard snapshot
+class TeamStanding:
+    team_name: str
+    total_score: int
+    standing_rank: int
+    last_changed_time: object
+
+
+def row_mapper(description, cls):
+    """
+    Returns a function that turns a result row into `cls`, matching columns by name.
+    Columns the class doesn't declare are ignored; fields the statement didn't select are None.
+    """
+    positions = {column[0].lower(): i for i, column in enumerate(description)}
+    names = [field.name for field in fields(cls)]
+    if all(name in positions for name in names):
+        pick = itemgetter(*[positions[name] for name in names])
+        return lambda row: cls(*pick(row))
+    # Partial select (e.g. a score list that only names the team): missing fields stay None
+    getters = [itemgetter(positions[name]) if name in positions else (lambda row: None) for name in names]
+    return lambda row: cls(*[get(row) for get in getters])
+
+
+def fetch_all(cursor, cls):
+    build = row_mapper(cursor.description, cls)
+    return [build(row) for row in cursor.fetchall()]
+
+
+def fetch_one(cursor, cls):
+    row = cursor.fetchone()
+    return row_mapper(cursor.description, cls)(row) if row else None
+
+
+FETCH_BATCH_SIZE = 1000
+
+
+def fetch_columns(cursor, batch_size=FETCH_BATCH_SIZE):
+    """
+    Reads the whole result as {column_name: [values]} in fetchmany batches, without
+    building a row object per row. Columns are present (empty) even for no rows.
+    """
+    names = [column[0] for column in cursor.description]
+    columns = [[] for _ in names]
+    while True:
+        batch = cursor.fetchmany(batch_size)
+        if not batch:
+            break
+        for column, values in zip(columns, zip(*batch)):
+            column.extend(values)
+    return dict(zip(names, columns))
@@ -0,0 +1,70 @@
+"""
+Team x game score matrix shared by the public scoreboard and the admin score editor.
+
+Everything here works on whole frames (pivot, reindex, element-wise compare), so
+building and diffing the matrix costs the same handful of pandas calls for five
+teams or five hundred.
+"""
+import numpy as np
+import pandas as pd
+
+
+def score_matrix(scores, team_names, game_names):
+    """
+    Pivots long (team_name, game_name, score) rows into a DataFrame indexed by team
+    ('Team') with one int column per game, in the given orders. Pairs without a
+    recorded score are 0.
+    """
+    if scores.empty:
+        matrix = pd.DataFrame(0, index=pd.Index(team_names), columns=pd.Index(game_names))
+    else:
+        matrix = (
+            scores.pivot(index="team_name", columns="game_name", values="score")
+            .reindex(index=team_names, columns=game_names)
+            .fillna(0)
+        )
+    matrix = matrix.astype(int)
+    matrix.index.name = "Team"
+    matrix.columns.name = None
+    return matrix
+
+
+def scoreboard_table(matrix, standings):
+    """
+    The matrix with a 'Total Score' column, rows in standing order (standings: rows.TeamStanding).
+    Teams without a standings row yet come last, totalled from their scores.
+    """
+    ranked = pd.Index([row.team_name for row in standings]).intersection(matrix.index, sort=False)
+    table = matrix.reindex(ranked.append(matrix.index.difference(ranked, sort=False)))
+    totals = pd.Series({row.team_name: row.total_score for row in standings}, dtype=float)
+    table["Total Score"] = totals.reindex(table.index).fillna(table.sum(axis=1)).astype(int)
+    return table
+
+
+def changed_cells(original, edited):
+    """
+    Compares an edited copy of a score matrix with the original.
+    Returns (changes, problems): changes is a list of (team_name, game_name, new_score)
+    for cells that differ; problems lists (team_name, game_name) cells that aren't whole
+    numbers plus (team_name, None) for rows whose team isn't in the original.
+    """
+    problems = [(team, None) for team in edited.index.difference(original.index)]
+    edited = edited[~edited.index.duplicated()]
+    kept_rows = original.index.isin(edited.index) # Rows deleted in the editor are left alone
+    numeric = edited.reindex(index=original.index, columns=original.columns).apply(pd.to_numeric, errors="coerce")
+
+    invalid = numeric.isna() | (numeric % 1 != 0)
+    invalid.loc[~kept_rows] = False
+    problems += _cells(invalid)
+
+    differs = numeric.ne(original) & ~invalid
+    differs.loc[~kept_rows] = False
+    rows, columns = np.nonzero(differs.to_numpy())
+    values = numeric.to_numpy()[rows, columns]
+    changes = [(original.index[r], original.columns[c], int(v)) for r, c, v in zip(rows, columns, values)]
+    return changes, problems
+
+
+def _cells(mask):
+    rows, columns = np.nonzero(mask.to_numpy())
+    return [(mask.index[r], mask.columns[c]) for r, c in zip(rows, columns)]
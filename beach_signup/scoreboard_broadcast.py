@@ -0,0 +1,104 @@
+import threading
+import time
+from collections import namedtuple
+from types import MappingProxyType
+
+from scoreboard import scoreboard_table
+
+# Immutable scoreboard published to every session. score_data is a read-only
+# {team_name: {game_name: score}} mapping; standings is a tuple of frozen
+# rows.TeamStanding in standing order; table is the display DataFrame (games plus
+# 'Total Score', in standing order), built once per version and treated as read-only.
+ScoreboardSnapshot = namedtuple(
+    "ScoreboardSnapshot", ["version", "built_at", "standings", "score_data", "game_names", "team_names", "table"]
+)
+
+
+def freeze_scoreboard(version, standings, matrix):
+    """Snapshot from the team standings and the score matrix (see scoreboard.score_matrix)."""
+    return ScoreboardSnapshot(
+        version=version,
+        built_at=time.time(),
+        standings=tuple(standings),
+        score_data=MappingProxyType({team: MappingProxyType(scores) for team, scores in matrix.to_dict("index").items()}),
+        game_names=tuple(matrix.columns),
+        team_names=tuple(matrix.index),
+        table=scoreboard_table(matrix, standings),
+    )
+
+
+class ScoreboardBroadcaster:
+    """
+    One background thread per process that keeps the scoreboard snapshot current.
+
+    Every `interval` seconds it runs the cheap `load_version()` query; only when the
+    version has moved does it call `load_snapshot(version)` to rebuild the scoreboard.
+    Sessions read the latest snapshot with current(), so database load does not grow
+    with the number of viewers. poke() wakes the thread early (e.g. right after a
+    score write in this process).
+    """
+
+    def __init__(self, load_version, load_snapshot, interval=2.0):
+        self._load_version = load_version
+        self._load_snapshot = load_snapshot
+        self.interval = interval
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self.rebuilds = 0
+        self.polls = 0
+
+    def current(self):
+        """The latest snapshot; the first caller builds it if the thread hasn't yet."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self._refresh()
+                snapshot = self._snapshot
+        self.start()
+        return snapshot
+
+    @property
+    def version(self):
+        """Version of the latest snapshot (None before the first build); never queries or builds."""
+        snapshot = self._snapshot
+        return None if snapshot is None else snapshot.version
+
+    def start(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None and not self._stopped.is_set():
+                    self._thread = threading.Thread(target=self._run, name="scoreboard-broadcaster", daemon=True)
+                    self._thread.start()
+
+    def poke(self):
+        self._wake.set()
+
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stopped.is_set():
+                break
+            try:
+                with self._lock:
+                    self._refresh()
+            except Exception as e:
+                print(f"Scoreboard refresh failed: {e}")
+
+    def _refresh(self):
+        # Read the version first: a write that lands during the rebuild bumps it again,
+        # so the next poll rebuilds rather than missing the change.
+        version = self._load_version()
+        self.polls += 1
+        if self._snapshot is not None and self._snapshot.version == version:
+            return
+        self._snapshot = self._load_snapshot(version)
+        self.rebuilds += 1
@@ -0,0 +1,26 @@
+"""
+Starts the metrics/readiness endpoints and applies pending migrations, then hands
+over to the Streamlit CLI, so /ready can pass before the first page is opened:
+
+    python beach_signup/serve.py run <entry script> --server.port=$PORT
+
+Arguments are passed to `streamlit` unchanged.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import data_manager as dm
+from streamlit.web import cli
+
+
+if __name__ == "__main__":
+    dm.start_metrics_server()
+    # Migrate up front so /ready can pass before anyone opens a page
+    try:
+        dm.ensure_database()
+    except Exception as e:
+        print(f"Could not initialize database (connection issue?): {e}")
+    sys.argv = ["streamlit", *sys.argv[1:]]
+    sys.exit(cli.main())
@@ -0,0 +1,111 @@
+"""
+Incremental maintenance of the team_standings table (per-team total score, dense
+rank and the time the total last changed), so the scoreboard reads standings with
+one indexed query instead of aggregating game_scores on every rerun.
+
+A score write re-ranks only the teams whose rank can move: those between the
+team's old and new totals shift by one, and the teams below both shift only when
+the set of distinct totals gains or loses a value. Adding or deleting teams (rare,
+admin-only) recomputes every rank with rerank().
+
+Call these inside the transaction that changed the scores, after taking the
+backend's standings lock, so concurrent writers apply their changes in turn. The
+lock covers the whole table because one changed total can move the dense rank of
+every team below it.
+The SQL is portable between Azure SQL and SQLite.
+"""
+
+
+def refresh_totals(cursor, team_ids, now):
+    """Recomputes the totals of `team_ids` from game_scores (one indexed SUM per team) and re-ranks them."""
+    if not team_ids:
+        return
+    team_ids = sorted(set(team_ids))
+    placeholders = ", ".join("?" for _ in team_ids)
+    cursor.execute(
+        f"""
+        SELECT team_id, total_score,
+               (SELECT COALESCE(SUM(gs.score), 0) FROM game_scores gs WHERE gs.team_id = team_standings.team_id)
+        FROM team_standings
+        WHERE team_id IN ({placeholders})
+        """,
+        tuple(team_ids)
+    )
+    for team_id, old, new in cursor.fetchall():
+        if new != old:
+            _set_total(cursor, team_id, old, new, now)
+
+def add_to_total(cursor, team_id, delta, now):
+    """Applies a known score change without re-summing, then re-ranks the teams it can move."""
+    cursor.execute("SELECT total_score FROM team_standings WHERE team_id = ?", (team_id,))
+    row = cursor.fetchone()
+    if row is None:
+        return
+    _set_total(cursor, team_id, row[0], row[0] + delta, now)
+
+def _set_total(cursor, team_id, old, new, now):
+    """Writes one team's new total and updates the ranks that change with it (ranks must be current)."""
+    cursor.execute(
+        "UPDATE team_standings SET total_score = ?, last_changed_time = ? WHERE team_id = ?",
+        (new, now, team_id)
+    )
+    if new == old:
+        return
+    cursor.execute(
+        """
+        SELECT (SELECT COUNT(*) FROM team_standings WHERE total_score = ? AND team_id <> ?),
+               (SELECT COUNT(*) FROM team_standings WHERE total_score = ? AND team_id <> ?)
+        """,
+        (old, team_id, new, team_id)
+    )
+    old_shared, new_existed = cursor.fetchone()
+    gains_total = 0 if new_existed else 1 # `new` joins the distinct totals
+    loses_total = 0 if old_shared else 1 # `old` leaves them
+    low, high = min(old, new), max(old, new)
+    # Teams between the two totals see one more (rising) or one fewer (falling) distinct total above them
+    band_shift = gains_total if new > old else -loses_total
+    if band_shift:
+        cursor.execute(
+            "UPDATE team_standings SET standing_rank = standing_rank + ? "
+            "WHERE total_score >= ? AND total_score < ? AND team_id <> ?",
+            (band_shift, low, high, team_id)
+        )
+    # Teams below both totals see both changes
+    if gains_total != loses_total:
+        cursor.execute(
+            "UPDATE team_standings SET standing_rank = standing_rank + ? WHERE total_score < ?",
+            (gains_total - loses_total, low)
+        )
+    cursor.execute(
+        """
+        UPDATE team_standings
+        SET standing_rank = 1 + (SELECT COUNT(DISTINCT s.total_score) FROM team_standings s WHERE s.total_score > ?)
+        WHERE team_id = ?
+        """,
+        (new, team_id)
+    )
+
+def add_teams(cursor, now):
+    """Adds a standings row, with its current total, for every team that doesn't have one yet."""
+    cursor.execute(
+        """
+        INSERT INTO team_standings (team_id, total_score, standing_rank, last_changed_time)
+        SELECT t.id, COALESCE((SELECT SUM(gs.score) FROM game_scores gs WHERE gs.team_id = t.id), 0), 0, ?
+        FROM teams t
+        WHERE NOT EXISTS (SELECT 1 FROM team_standings s WHERE s.team_id = t.id)
+        """,
+        (now,)
+    )
+    rerank(cursor)
+
+def rerank(cursor):
+    """Recomputes every rank: dense rank by total (ties share a rank, the next rank follows on); only rows whose rank moved are written."""
+    cursor.execute(
+        """
+        UPDATE team_standings
+        SET standing_rank = 1 + (SELECT COUNT(DISTINCT s.total_score) FROM team_standings s
+                                 WHERE s.total_score > team_standings.total_score)
+        WHERE standing_rank <> 1 + (SELECT COUNT(DISTINCT s.total_score) FROM team_standings s
+                                    WHERE s.total_score > team_standings.total_score)
+        """
+    )
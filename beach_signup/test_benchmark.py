@@ -0,0 +1,26 @@
+import json
+
+import benchmark
+import data_manager
+
+
+def test_benchmarks_time_every_case(tmp_path):
+    activities = data_manager.ACTIVITIES
+    results = benchmark.run_benchmarks([100], str(tmp_path), repeat=3, max_time=0.1, teams=3, games=2)
+
+    assert data_manager.ACTIVITIES is activities # Synthetic activities are swapped back
+    cases = results["results"]["100"]
+    assert {"add_registration", "get_registration_by_passphrase", "get_all_scores", "flow:signup"} <= set(cases)
+    for stats in cases.values():
+        assert stats["iterations"] >= 3
+        assert stats["min_ms"] <= stats["median_ms"] <= stats["p95_ms"]
+    json.dumps(results) # Machine-readable as is
+
+
+def test_compare_flags_slowdowns_beyond_threshold():
+    baseline = {"results": {"100": {"fast": {"median_ms": 1.0}, "noise": {"median_ms": 0.01}, "gone": {"median_ms": 1.0}}}}
+    current = {"results": {"100": {"fast": {"median_ms": 1.5}, "noise": {"median_ms": 0.03}, "new": {"median_ms": 9.0}}}}
+
+    regressions = benchmark.compare(current, baseline, threshold=0.25, min_delta_ms=0.05)
+    assert [(r["case"], r["ratio"]) for r in regressions] == [("fast", 1.5)]
+    assert benchmark.compare(current, baseline, threshold=0.6) == []
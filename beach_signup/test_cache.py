@@ -0,0 +1,62 @@
+import threading
+import time
+
+from cache import SingleFlightCache
+
+
+def test_concurrent_misses_load_once():
+    cache = SingleFlightCache(ttl=60)
+    calls = []
+    release = threading.Event()
+
+    def load():
+        calls.append(1)
+        release.wait()
+        return "value"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("k", load))) for _ in range(10)]
+    for t in threads:
+        t.start()
+    time.sleep(0.05)
+    release.set()
+    for t in threads:
+        t.join()
+    assert results == ["value"] * 10
+    assert len(calls) == 1
+
+
+def test_ttl_expiry():
+    cache = SingleFlightCache(ttl=0.01)
+    values = iter([1, 2])
+    assert cache.get("k", lambda: next(values)) == 1
+    time.sleep(0.02)
+    assert cache.get("k", lambda: next(values)) == 2
+
+
+def test_invalidate_during_load_is_not_cached():
+    cache = SingleFlightCache(ttl=60)
+    started, release = threading.Event(), threading.Event()
+
+    def slow_load():
+        started.set()
+        release.wait()
+        return "stale"
+
+    t = threading.Thread(target=cache.get, args=("k", slow_load))
+    t.start()
+    started.wait()
+    cache.invalidate()  # a write happened while the old value was being loaded
+    assert cache.get("k", lambda: "fresh") == "fresh"
+    release.set()
+    t.join()
+    assert cache.get("k", lambda: "unused") == "fresh"
+
+
+def test_own_write_is_visible_immediately(dm):
+    activity = "Massage by SAVH"
+    assert dm.get_signup_count(activity, "14:30") == 0
+    reg_id, _, _ = dm.add_registration("u1", "Alice", activity, "14:30")
+    assert dm.get_signup_count(activity, "14:30") == 1
+    dm.cancel_registration(reg_id)
+    assert dm.get_availability_snapshot()[activity][0]["booked"] == 0
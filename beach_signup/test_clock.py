@@ -0,0 +1,92 @@
+import socket
+import threading
+import time
+
+import ntplib
+import pytest
+
+from clock import ClockService
+
+
+class FakeNTPServer:
+    """Answers NTP queries on localhost as a server whose clock is `skew` seconds ahead."""
+
+    def __init__(self, skew):
+        self.skew = skew
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.settimeout(0.1)
+        self.port = self.sock.getsockname()[1]
+        self.requests = 0
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def _serve(self):
+        while not self._stopped.is_set():
+            try:
+                data, addr = self.sock.recvfrom(256)
+            except socket.timeout:
+                continue
+            query = ntplib.NTPPacket()
+            query.from_data(data)
+            reply = ntplib.NTPPacket(version=query.version, mode=4)
+            reply.stratum = 2
+            reply.orig_timestamp = query.tx_timestamp
+            reply.recv_timestamp = ntplib.system_to_ntp_time(time.time() + self.skew)
+            reply.tx_timestamp = ntplib.system_to_ntp_time(time.time() + self.skew)
+            self.requests += 1
+            self.sock.sendto(reply.to_data(), addr)
+
+    def close(self):
+        self._stopped.set()
+        self._thread.join()
+        self.sock.close()
+
+
+@pytest.fixture
+def ntp_server():
+    server = FakeNTPServer(skew=120.0)
+    yield server
+    server.close()
+
+
+def test_sync_applies_server_offset(ntp_server):
+    clock = ClockService("127.0.0.1", port=ntp_server.port, timeout=1.0)
+    assert clock.sync()
+    assert clock.status()["offset"] == pytest.approx(120.0, abs=0.5)
+    assert (clock.now().timestamp() - time.time()) == pytest.approx(120.0, abs=0.5)
+    clock.stop()
+
+
+def test_background_thread_syncs_without_blocking_now(ntp_server):
+    clock = ClockService("127.0.0.1", port=ntp_server.port, interval=60.0, timeout=1.0)
+    clock.now() # Starts the thread; returns right away
+    deadline = time.monotonic() + 2
+    while not clock.status()["synced"]:
+        assert time.monotonic() < deadline, "clock never synced"
+        time.sleep(0.01)
+    assert clock.now().utcoffset().total_seconds() == 8 * 3600 # Asia/Singapore
+    clock.stop()
+
+
+def test_unreachable_server_keeps_last_offset(ntp_server):
+    clock = ClockService("127.0.0.1", port=ntp_server.port, timeout=0.2)
+    assert clock.sync()
+    ntp_server.close()
+
+    assert not clock.sync()
+    status = clock.status()
+    assert status["offset"] == pytest.approx(120.0, abs=0.5)
+    assert status["last_error"] and status["failures"] == 1
+    clock.stop()
+
+
+def test_never_synced_falls_back_to_system_time():
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock: # A port with nobody listening
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    clock = ClockService("127.0.0.1", port=port, timeout=0.2)
+    assert not clock.sync()
+    assert clock.now().timestamp() == pytest.approx(time.time(), abs=0.5)
+    clock.stop()
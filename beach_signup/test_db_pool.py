@@ -0,0 +1,85 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from db_pool import ConnectionPool, PoolTimeout
+
+
+def make_pool(**kwargs):
+    return ConnectionPool(lambda: sqlite3.connect(":memory:", check_same_thread=False), **kwargs)
+
+
+def test_connections_are_reused():
+    pool = make_pool(max_size=2)
+    conn = pool.connection()
+    raw = conn._raw
+    conn.close()
+    conn.close()  # second close is a no-op
+    again = pool.connection()
+    assert again._raw is raw
+    again.close()
+    stats = pool.stats()
+    assert stats["connections_created"] == 1
+    assert stats["checkouts"] == 2
+    assert stats["in_use"] == 0 and stats["idle"] == 1
+
+
+def test_warm_opens_min_size():
+    pool = make_pool(min_size=3, max_size=5)
+    pool.warm()
+    assert pool.stats()["idle"] == 3
+
+
+def test_checkout_times_out_when_exhausted():
+    pool = make_pool(max_size=1, timeout=0.05)
+    held = pool.connection()
+    with pytest.raises(PoolTimeout):
+        pool.connection()
+    assert pool.stats()["timeouts"] == 1
+    held.close()
+
+
+def test_waiter_gets_released_connection():
+    pool = make_pool(max_size=1, timeout=2)
+    held = pool.connection()
+    got = []
+
+    def borrow():
+        conn = pool.connection()
+        got.append(conn)
+        conn.close()
+
+    t = threading.Thread(target=borrow)
+    t.start()
+    time.sleep(0.05)
+    held.close()
+    t.join()
+    assert len(got) == 1
+    assert pool.stats()["wait_time_max"] > 0
+
+
+def test_stale_connections_are_recycled():
+    pool = make_pool(recycle=0.01)
+    conn = pool.connection()
+    raw = conn._raw
+    time.sleep(0.02)
+    conn.close()
+    again = pool.connection()
+    assert again._raw is not raw
+    again.close()
+    assert pool.stats()["connections_discarded"] >= 1
+
+
+def test_failed_ping_replaces_connection():
+    pool = make_pool(pre_ping=True, ping_after=0)
+    conn = pool.connection()
+    raw = conn._raw
+    conn.close()
+    raw.close()  # simulate the server dropping the connection while idle
+    again = pool.connection()
+    assert again._raw is not raw
+    again.cursor().execute("SELECT 1")
+    again.close()
+    assert pool.stats()["ping_failures"] == 1
@@ -0,0 +1,53 @@
+import threading
+
+import pytest
+
+from fetch_pool import FetchPool
+
+
+def test_gather_runs_calls_concurrently_and_keeps_order():
+    pool = FetchPool(max_workers=2)
+    # Each call waits until all three are running, so this only finishes if they overlap
+    barrier = threading.Barrier(3, timeout=2)
+
+    def call(value):
+        barrier.wait()
+        return value
+
+    try:
+        assert pool.gather(lambda: call("a"), lambda: call("b"), lambda: call("c")) == ["a", "b", "c"]
+    finally:
+        pool.shutdown()
+
+
+def test_gather_reraises_after_all_calls_finish():
+    pool = FetchPool(max_workers=2)
+    finished = []
+
+    def fail():
+        raise ValueError("boom")
+
+    try:
+        with pytest.raises(ValueError):
+            pool.gather(lambda: finished.append(1), fail, lambda: finished.append(2))
+        assert sorted(finished) == [1, 2]
+    finally:
+        pool.shutdown()
+
+
+def test_nested_gather_does_not_deadlock():
+    pool = FetchPool(max_workers=1)
+    try:
+        inner = lambda: pool.gather(lambda: 1, lambda: 2)
+        assert pool.gather(inner, inner) == [[1, 2], [1, 2]]
+    finally:
+        pool.shutdown()
+
+
+def test_fetch_together_with_data_manager(dm):
+    dm.add_team("Sharks")
+    dm.add_competitive_game("Raft")
+    games, teams, matrix = dm.fetch_together(dm.get_competitive_games, dm.get_teams, dm.get_score_matrix)
+    assert [game.name for game in games] == ["Raft"]
+    assert [team.name for team in teams] == ["Sharks"]
+    assert matrix.loc["Sharks", "Raft"] == 0
@@ -0,0 +1,52 @@
+import json
+import sqlite3
+
+import pytest
+
+from instrumentation import Histogram, Instrumentation, normalize_sql
+
+
+def test_histogram_percentiles_use_bucket_bounds():
+    histogram = Histogram()
+    for ms in [0.2] * 90 + [7.0] * 9 + [30000.0]:
+        histogram.observe(ms)
+    assert histogram.percentile(50) == 0.25
+    assert histogram.percentile(95) == 10
+    assert histogram.percentile(100) == 30000.0
+    assert histogram.to_dict()["buckets"]["+Inf"] == 1
+
+
+def test_placeholder_lists_share_a_statement_key():
+    assert normalize_sql("SELECT *\n  FROM t WHERE id IN (?, ?,?)") == normalize_sql("SELECT * FROM t WHERE id IN (?, ?)")
+
+
+def test_cursor_records_rows_and_errors():
+    instrumentation = Instrumentation()
+    conn = sqlite3.connect(":memory:")
+    cursor = instrumentation.wrap_cursor(conn.cursor())
+    cursor.execute("CREATE TABLE t (x INTEGER)")
+    cursor.executemany("INSERT INTO t VALUES (?)", [(1,), (2,), (3,)])
+    assert cursor.execute("SELECT x FROM t").fetchall() == [(1,), (2,), (3,)]
+    with pytest.raises(sqlite3.OperationalError):
+        cursor.execute("SELECT * FROM missing")
+
+    statements = instrumentation.snapshot()["statements"]
+    assert statements["SELECT x FROM t"]["rows"] == 3
+    assert statements["SELECT * FROM missing"]["error_types"] == {"OperationalError": 1}
+
+
+def test_data_manager_calls_are_recorded(dm, tmp_path):
+    instrumentation = dm.get_instrumentation()
+    instrumentation.reset()
+    dm.add_registration("u1", "Ann", "Massage by SAVH", "14:30")
+    dm.get_user_registrations("u1")
+
+    metrics = instrumentation.snapshot()
+    assert metrics["functions"]["add_registration"]["calls"] == 1
+    assert metrics["functions"]["get_user_registrations"]["rows"] == 1
+    assert metrics["statements"]["SELECT * FROM registrations WHERE user_id = ? ORDER BY registration_time DESC"]["rows"] == 1
+    assert metrics["connection_acquire"]["calls"] >= 2
+
+    path = dm.dump_instrumentation(str(tmp_path / "metrics.json"))
+    with open(path) as f:
+        assert json.load(f)["functions"]["add_registration"]["calls"] == 1
@@ -0,0 +1,76 @@
+import threading
+
+import pytest
+
+import loadtest
+
+ACTIVITY = "Massage by SAVH"
+
+
+def run_together(*calls):
+    results = [None] * len(calls)
+    start = threading.Barrier(len(calls))
+
+    def run(i, call):
+        start.wait()
+        results[i] = call()
+
+    threads = [threading.Thread(target=run, args=(i, call)) for i, call in enumerate(calls)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_last_seat_goes_to_exactly_one_user(dm):
+    capacity = dm.get_activity_details(ACTIVITY)["slots"]
+    for i in range(capacity - 1):
+        assert dm.add_registration(f"early-{i}", f"Early {i}", ACTIVITY, "14:30")[2] == "SUCCESS"
+    assert dm.add_registration("booked-elsewhere", "Dana", ACTIVITY, "15:10")[2] == "SUCCESS"
+
+    calls = [lambda i=i: dm.add_registration(f"racer-{i}", f"Racer {i}", ACTIVITY, "14:30")[2] for i in range(10)]
+    calls.append(lambda: dm.add_registration("booked-elsewhere", "Dana", ACTIVITY, "14:30")[2])
+    statuses = run_together(*calls)
+
+    assert statuses[:-1].count("SUCCESS") == 1
+    assert statuses[:-1].count("SLOT_FULL") == 9
+    assert statuses[-1] in ("LIMIT_REACHED", "SLOT_FULL")
+    assert dm.get_signup_count(ACTIVITY, "14:30") == capacity
+
+
+def test_cancel_racing_check_in_leaves_counters_consistent(dm):
+    registrations = [dm.add_registration(f"user-{i}", f"User {i}", ACTIVITY, "14:30")[0] for i in range(8)]
+    for registration_id in registrations:
+        cancelled, _ = run_together(
+            lambda: dm.cancel_registration(registration_id),
+            lambda: dm.check_in_registration(registration_id),
+        )
+        assert cancelled
+
+    assert dm.get_signup_count(ACTIVITY, "14:30") == 0
+    assert dm.reconcile_slot_counters(repair=False) == []
+
+
+@pytest.mark.parametrize("processes, arrival", [(1, "burst"), (2, "poisson")])
+def test_load_harness_holds_invariants(tmp_path, processes, arrival):
+    import data_manager
+
+    try:
+        report = loadtest.run_load(
+            str(tmp_path / "load.db"), users=120, threads=8, processes=processes, arrival=arrival, spread=0.2,
+            churn=0.5, resubmit=0.2,
+        )
+    finally:
+        data_manager.use_backend(None)
+
+    assert report["violations"] == []
+    signup = report["ops"]["signup"]
+    assert signup["errors"] == 0
+    assert signup["statuses"]["SUCCESS"] > 0
+    assert signup["p50_ms"] <= signup["p95_ms"] <= signup["p99_ms"]
+
+
+def test_invariants_fail_when_the_counter_check_cannot_run(dm, monkeypatch):
+    monkeypatch.setattr(dm, "reconcile_slot_counters", lambda repair=True: None)
+    assert loadtest.check_invariants([], [], []) == ["Slot counter check failed (database error, see log)"]
@@ -0,0 +1,104 @@
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+from instrumentation import Instrumentation
+from metrics_server import MetricsServer, render_prometheus
+
+
+def _get(server, path):
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.port}{path}", timeout=5) as response:
+            return response.status, response.headers["Content-Type"], response.read().decode()
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers["Content-Type"], e.read().decode()
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(render_metrics, check_ready):
+        server = MetricsServer(render_metrics, check_ready, host="127.0.0.1", port=0).start()
+        servers.append(server)
+        return server
+    yield start
+    for server in servers:
+        server.stop()
+
+
+def test_metrics_and_readiness_from_data_manager(dm, serve):
+    dm.get_instrumentation().reset()
+    activity = dm.ACTIVITIES[0]["name"]
+    timeslot = dm.get_timeslots(dm.ACTIVITIES[0]["duration"])[0]
+    assert dm.add_registration("u1", "User 1", activity, timeslot)[2] == "SUCCESS"
+    assert dm.add_registration("u1", "User 1", activity, timeslot)[2] != "SUCCESS"
+    dm.record_page_run("signup")
+    server = serve(dm.render_metrics, dm.get_readiness)
+
+    status, content_type, body = _get(server, "/metrics")
+    assert status == 200 and content_type.startswith("text/plain; version=0.0.4")
+    lines = body.splitlines()
+    assert "beach_db_up 1" in lines
+    assert 'beach_signups_total{status="SUCCESS"} 1' in lines
+    assert 'beach_signups_total{status="SLOT_FULL"} 0' in lines
+    assert 'beach_page_reruns_total{page="signup"} 1' in lines
+    assert 'beach_dm_call_duration_seconds_count{function="add_registration"} 2' in lines
+    assert 'beach_dm_call_duration_seconds_bucket{function="add_registration",le="+Inf"} 2' in lines
+
+    status, _, body = _get(server, "/ready")
+    details = json.loads(body)
+    assert status == 200 and details["ok"] and details["schema_version"] == details["expected_schema_version"]
+    assert _get(server, "/health")[0] == 200
+    assert _get(server, "/nope")[0] == 404
+
+
+def test_not_ready_and_failing_render(serve):
+    def broken():
+        raise RuntimeError("boom")
+
+    server = serve(broken, lambda: (False, {"reason": "database unreachable"}))
+    status, _, body = _get(server, "/ready")
+    assert status == 503 and json.loads(body)["reason"] == "database unreachable"
+    assert _get(server, "/metrics")[0] == 500
+
+
+def test_metrics_render_while_the_database_is_unreachable(tmp_path):
+    import data_manager as dm
+    from db_backends import SQLiteBackend
+
+    dm.use_backend(SQLiteBackend(str(tmp_path / "missing" / "beach_day.db")))
+    try:
+        lines = dm.render_metrics().splitlines()
+        assert "beach_db_up 0" in lines
+        assert 'beach_db_pool_connections{state="idle"} 0' in lines
+        assert dm.get_readiness()[0] is False
+    finally:
+        dm.use_backend(None)
+
+
+def test_histograms_are_cumulative_and_labels_escaped():
+    instrumentation = Instrumentation()
+    instrumentation.record_function('odd"name\\', 0.0002)
+    instrumentation.record_function('odd"name\\', 0.003)
+    text = render_prometheus(instrumentation.snapshot(), None, {"ok": False, "latency_ms": 2000.0}, 0)
+    lines = text.splitlines()
+    assert "beach_db_up 0" in lines
+    assert 'beach_dm_call_duration_seconds_bucket{function="odd\\"name\\\\",le="0.00025"} 1' in lines
+    assert 'beach_dm_call_duration_seconds_bucket{function="odd\\"name\\\\",le="0.005"} 2' in lines
+    assert 'beach_dm_call_duration_seconds_count{function="odd\\"name\\\\"} 2' in lines
+
+
+def test_bind_address_comes_from_the_environment(dm, monkeypatch):
+    monkeypatch.setenv("BEACH_METRICS_HOST", "0.0.0.0")
+    monkeypatch.setitem(dm._metrics_settings, "port", 0)
+    monkeypatch.setattr(dm, "_metrics_server", None)
+    monkeypatch.setattr(dm, "_metrics_server_started", False)
+    server = dm.start_metrics_server()
+    try:
+        assert server._httpd.server_address[0] == "0.0.0.0"
+        assert _get(server, "/health")[0] == 200
+    finally:
+        server.stop()
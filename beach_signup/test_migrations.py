@@ -0,0 +1,59 @@
+import threading
+
+import migrations
+from db_backends import SQLiteBackend
+
+
+def test_fresh_database_is_migrated_to_latest(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "fresh.db"))
+    conn = backend.connect()
+    applied = migrations.migrate(conn, backend)
+    assert [version for version, _ in applied] == [version for version, _, _ in migrations.MIGRATIONS]
+    assert migrations.current_version(conn) == migrations.LATEST_VERSION
+    for index in backend.INDEXES:
+        assert backend.index_exists(conn.cursor(), index)
+
+
+def test_up_to_date_database_costs_one_query(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "current.db"))
+    conn = backend.connect()
+    migrations.migrate(conn, backend)
+    statements = []
+    conn.set_trace_callback(statements.append)
+    assert migrations.migrate(conn, backend) == []
+    assert statements == ["SELECT version FROM schema_version"]
+
+
+def test_legacy_database_is_upgraded_in_place(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "legacy.db"))
+    conn = backend.connect()
+    for table in ["participants", "registrations"]:
+        conn.execute(backend.SCHEMA[table])
+    conn.execute("INSERT INTO participants (id, name, created_time) VALUES ('u1', 'Ann', '2025-07-10 13:00:00')")
+    conn.execute(
+        "INSERT INTO registrations (user_id, participant_name, activity, timeslot, registration_passphrase, registration_time, checked_in) "
+        "VALUES ('u1', 'Ann', 'Massage by SAVH', '14:30', 'a-b-c-d', '2025-07-10 13:00:00', 1)"
+    )
+    conn.commit()
+
+    migrations.migrate(conn, backend)
+    row = conn.execute("SELECT booked, checked_in FROM slot_counters").fetchone()
+    assert tuple(row) == (1, 1)
+    assert conn.execute("SELECT COUNT(*) FROM registrations").fetchone()[0] == 1
+
+
+def test_replicas_starting_together_migrate_once(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "shared.db"))
+    results = []
+
+    def start_replica():
+        conn = backend.connect()
+        results.append(migrations.migrate(conn, backend))
+        conn.close()
+
+    threads = [threading.Thread(target=start_replica) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sum(1 for applied in results if applied) == 1
@@ -0,0 +1,36 @@
+import page_benchmark
+
+
+def test_pages_stay_within_budgets():
+    results = page_benchmark.run_page_benchmarks(reruns=2)
+
+    assert set(results) == set(page_benchmark.PAGE_BUDGETS)
+    assert page_benchmark.check_budgets(results, timing=False) == [] # Wall time is left to the CLI run
+    assert results["signup:returning"]["queries"] > 0
+
+
+def test_statement_counter_normalizes_and_skips_transaction_control():
+    counter = page_benchmark.StatementCounter()
+    counter.record("SELECT * FROM participants WHERE id = 'abc'")
+    counter.record("SELECT * FROM participants WHERE id = 'it''s'")
+    counter.record("BEGIN IMMEDIATE")
+    counter.record("UPDATE slot_counters SET booked = booked + 1 WHERE id = 42")
+
+    assert counter.take() == {
+        "SELECT * FROM participants WHERE id = ?": 2,
+        "UPDATE slot_counters SET booked = booked + ? WHERE id = ?": 1,
+    }
+    assert counter.take() == {}
+
+
+def test_over_budget_is_reported():
+    result = {"queries": 5, "checkouts": 2, "max_ms": 10.0, "exceptions": []}
+    problems = page_benchmark.check_budgets({"page": result}, {"page": {"queries": 4, "checkouts": 2, "ms": 100}})
+    assert problems == ["page: 5 queries per rerun, budget 4"]
+
+
+def test_timing_budgets_can_be_skipped():
+    result = {"queries": 4, "checkouts": 2, "max_ms": 500.0, "exceptions": []}
+    budgets = {"page": {"queries": 4, "checkouts": 2, "ms": 100}}
+    assert page_benchmark.check_budgets({"page": result}, budgets) == ["page: 500 ms rerun, budget 100 ms"]
+    assert page_benchmark.check_budgets({"page": result}, budgets, timing=False) == []
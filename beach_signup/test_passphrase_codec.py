@@ -0,0 +1,98 @@
+import hashlib
+
+import pytest
+
+from passphrase_codec import PassphraseCodec
+
+WORDS = ["apple", "beach", "happy", "ocean", "sunny", "coral", "shell", "waves"]
+
+
+def test_round_trip_and_uniqueness():
+    codec = PassphraseCodec(WORDS, "secret")
+    phrases = [codec.encode(i) for i in range(codec.capacity)]
+    assert len(set(phrases)) == codec.capacity
+    assert all(codec.decode(phrase) == i for i, phrase in enumerate(phrases[:500]))
+
+
+def test_phrases_depend_on_key():
+    assert PassphraseCodec(WORDS, "one").encode(42) != PassphraseCodec(WORDS, "two").encode(42)
+
+
+def test_decode_rejects_unknown_words():
+    codec = PassphraseCodec(WORDS, "secret")
+    assert codec.decode("apple-beach-happy") is None
+    assert codec.decode("apple-beach-happy-zebra") is None
+    with pytest.raises(ValueError):
+        codec.encode(codec.capacity)
+
+
+def test_derived_mode_signup_and_lookup(dm):
+    dm.use_passphrase_codec(PassphraseCodec(dm.load_word_list(), "event-key"))
+    try:
+        reg_id, passphrase, status = dm.add_registration("u1", "Alice", "Massage by SAVH", "14:30")
+        assert status == "SUCCESS"
+        assert passphrase == dm.get_passphrase_codec().encode(reg_id)
+        assert dm.get_registration_by_passphrase(passphrase).id == reg_id
+        assert dm.get_user_registrations("u1")[0].registration_passphrase == passphrase
+    finally:
+        dm.use_passphrase_codec(None)
+
+
+def _encode_like_register_batch(params, registration_id):
+    """AzureSQLBackend.REGISTER_BATCH's derivation step by step, with T-SQL's signed BIGINT and truncating %."""
+    def tsql_mod(a, b):
+        return a - b * int(a / b)
+
+    base, width, words = params["base"], params["word_width"], params["words"]
+    half = base * base
+    left, right = registration_id // half, registration_id % half
+    for round_number in range(8):
+        inner = hashlib.sha256(params["ipad"] + f"{round_number}:{right}".encode()).digest()
+        digest = int.from_bytes(hashlib.sha256(params["opad"] + inner).digest()[:8], "big", signed=True)
+        f = tsql_mod(tsql_mod(digest, half) + half, half)
+        if digest < 0:
+            f = (f + params["wrap"]) % half
+        left, right = right, (left + f) % half
+    value = left * half + right
+    digits = [(value // (half * base)) % base, (value // half) % base, (value // base) % base, value % base]
+    return "-".join(words[d * width:(d + 1) * width].rstrip() for d in digits)
+
+
+@pytest.mark.parametrize("key", ["event-key", "k" * 100])
+def test_sql_params_reproduce_encode(dm, key):
+    codec = PassphraseCodec(dm.load_word_list(), key)
+    params = codec.sql_params()
+    for registration_id in list(range(300)) + [codec.capacity - 1, 123456789 % codec.capacity]:
+        assert _encode_like_register_batch(params, registration_id) == codec.encode(registration_id)
+
+
+def test_derived_mode_reports_an_exhausted_passphrase_space(dm):
+    codec = PassphraseCodec(["apple", "beach"], "event-key")
+    dm.use_passphrase_codec(codec)
+    try:
+        timeslots = dm.get_timeslots(dm.get_activity_details("Massage by SAVH")["duration"])
+        for i in range(1, codec.capacity): # Ids start at 1, so the last one that fits is capacity - 1
+            reg_id, _, status = dm.add_registration(f"user-{i}", "Guest", "Massage by SAVH", timeslots[i % 2])
+            assert (reg_id, status) == (i, "SUCCESS")
+        assert dm.add_registration("one-too-many", "Guest", "Massage by SAVH", timeslots[0]) == (None, None, "DB_ERROR")
+        assert dm.get_user_registrations("one-too-many") == []
+    finally:
+        dm.use_passphrase_codec(None)
+
+
+def test_derived_phrase_colliding_with_a_stored_one_is_a_db_error(dm):
+    codec = PassphraseCodec(dm.load_word_list(), "event-key")
+    reg_id, _, status = dm.add_registration("u1", "Alice", "Massage by SAVH", "14:30")
+    assert status == "SUCCESS"
+    conn = dm.get_backend().connect()
+    try:
+        # Pretend reserved mode once issued the phrase the next derived id will get
+        conn.execute("UPDATE registrations SET registration_passphrase = ? WHERE id = ?", (codec.encode(reg_id + 1), reg_id))
+        conn.commit()
+    finally:
+        conn.close()
+    dm.use_passphrase_codec(codec)
+    try:
+        assert dm.add_registration("u2", "Bob", "Massage by SAVH", "14:30") == (None, None, "DB_ERROR")
+    finally:
+        dm.use_passphrase_codec(None)
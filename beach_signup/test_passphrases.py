@@ -0,0 +1,46 @@
+import threading
+
+from passphrases import PassphraseAllocator
+
+
+def test_take_reserves_in_batches():
+    calls = []
+
+    def reserve(candidates):
+        calls.append(len(candidates))
+        return candidates
+
+    allocator = PassphraseAllocator(reserve, ["apple", "beach", "happy", "ocean", "sunny", "coral"], batch_size=20, low_water=0)
+    taken = [allocator.take() for _ in range(20)]
+    assert len(set(taken)) == 20
+    assert calls == [20]
+    allocator.give_back(taken[0])
+    assert allocator.take() == taken[0]
+
+
+def test_replicas_never_share_a_passphrase(dm):
+    # Two allocators on the same database behave like two app replicas.
+    words = dm.load_word_list()
+    replicas = [PassphraseAllocator(dm._reserve_passphrases, words, batch_size=30, low_water=5) for _ in range(2)]
+    taken = []
+    lock = threading.Lock()
+
+    def worker(allocator):
+        for _ in range(60):
+            phrase = allocator.take()
+            with lock:
+                taken.append(phrase)
+
+    threads = [threading.Thread(target=worker, args=(replica,)) for replica in replicas for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(taken) == 240
+    assert len(set(taken)) == 240
+
+
+def test_reservation_skips_registered_passphrases(dm):
+    reg_id, passphrase, status = dm.add_registration("u1", "Alice", "Massage by SAVH", "14:30")
+    assert status == "SUCCESS"
+    assert dm._reserve_passphrases([passphrase, "new-phrase-for-test"]) == ["new-phrase-for-test"]
@@ -0,0 +1,159 @@
+import sqlite3
+import threading
+
+ACTIVITY = "Massage by SAVH"
+
+
+def test_registration_creates_participant(dm):
+    reg_id, passphrase, status = dm.add_registration("new-user", "Bob", ACTIVITY, "14:30")
+    assert status == "SUCCESS"
+    assert dm.find_participant_by_id("new-user").name == "Bob"
+
+
+def test_unknown_activity_is_rejected(dm):
+    assert dm.add_registration("u1", "Bob", "Surfing Lessons", "14:30") == (None, None, "DB_ERROR")
+
+
+def test_unknown_timeslot_is_rejected(dm):
+    assert dm.add_registration("u1", "Bob", ACTIVITY, "99:99") == (None, None, "DB_ERROR")
+    with dm.pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM slot_counters WHERE timeslot = ?", ("99:99",))
+        assert cursor.fetchone()[0] == 0
+
+
+def test_integrity_error_gives_the_passphrase_back(dm, monkeypatch):
+    allocator = dm.get_passphrase_allocator()
+    passphrase = allocator.take()
+    allocator.give_back(passphrase)
+
+    def register(*args):
+        raise sqlite3.IntegrityError("UNIQUE constraint failed: registrations.user_id, registrations.activity, registrations.timeslot")
+    monkeypatch.setattr(dm.get_backend(), "register", register)
+    assert dm.add_registration("u1", "Bob", ACTIVITY, "14:30") == (None, None, "ALREADY_BOOKED_TIMESLOT")
+    assert allocator.take() == passphrase
+
+
+def test_concurrent_signups_never_overbook(dm):
+    capacity = dm.get_activity_details(ACTIVITY)["slots"]
+    statuses = []
+    lock = threading.Lock()
+
+    def signup(i):
+        _, _, status = dm.add_registration(f"user-{i}", f"User {i}", ACTIVITY, "14:30")
+        with lock:
+            statuses.append(status)
+
+    threads = [threading.Thread(target=signup, args=(i,)) for i in range(capacity * 3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert statuses.count("SUCCESS") == capacity
+    assert statuses.count("SLOT_FULL") == capacity * 2
+    assert dm.get_signup_count(ACTIVITY, "14:30") == capacity
+
+
+def test_concurrent_double_submit_books_once(dm):
+    statuses = []
+
+    def signup(timeslot):
+        statuses.append(dm.add_registration("same-user", "Carol", ACTIVITY, timeslot)[2])
+
+    threads = [threading.Thread(target=signup, args=(slot,)) for slot in ("14:30", "14:50", "15:10", "14:30")]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert statuses.count("SUCCESS") == 1
+    assert len(dm.get_user_registrations("same-user")) == 1
+
+
+def test_availability_snapshot(dm):
+    capacity = dm.get_activity_details(ACTIVITY)["slots"]
+    for i in range(capacity):
+        assert dm.add_registration(f"user-{i}", f"User {i}", ACTIVITY, "14:30")[2] == "SUCCESS"
+    dm.add_registration("late", "Late", ACTIVITY, "14:50")
+
+    slots = {slot["timeslot"]: slot for slot in dm.get_availability_snapshot()[ACTIVITY]}
+    assert list(slots) == dm.get_timeslots(dm.get_activity_details(ACTIVITY)["duration"])
+    assert slots["14:30"]["is_full"] and slots["14:30"]["remaining"] == 0
+    assert slots["14:50"]["booked"] == 1 and not slots["14:50"]["is_full"]
+    assert slots["15:10"]["remaining"] == capacity and not slots["15:10"]["is_low"]
+
+
+def test_registration_stats_rollup(dm):
+    ids = [dm.add_registration(f"user-{i}", f"User {i}", ACTIVITY, "14:30")[0] for i in range(3)]
+    dm.add_registration("other", "Other", ACTIVITY, "15:10")
+    assert dm.check_in_registration(ids[0])
+
+    stats = dm.get_registration_stats()
+    assert (stats["total"], stats["checked_in"]) == (4, 1)
+    assert stats["check_in_rate"] == 25
+    activity = stats["activities"][ACTIVITY]
+    assert activity["timeslots"]["14:30"] == {"total": 3, "checked_in": 1, "check_in_rate": 1 / 3 * 100}
+    assert activity["timeslots"]["14:50"]["total"] == 0
+
+    assert dm.uncheck_in_registration(ids[0])
+    assert dm.get_registration_stats()["checked_in"] == 0
+
+
+def slot_counter(dm, timeslot):
+    with dm.pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT booked, checked_in FROM slot_counters WHERE activity = ? AND timeslot = ?", (ACTIVITY, timeslot))
+        return tuple(cursor.fetchone())
+
+
+def test_slot_counters_follow_bookings(dm):
+    first, _, _ = dm.add_registration("u1", "Ann", ACTIVITY, "14:30")
+    second, _, _ = dm.add_registration("u2", "Bob", ACTIVITY, "14:30")
+    assert slot_counter(dm, "14:30") == (2, 0)
+
+    assert dm.check_in_registration(first)
+    assert not dm.check_in_registration(first) # Already checked in
+    assert slot_counter(dm, "14:30") == (2, 1)
+
+    assert dm.cancel_registration(first)
+    assert not dm.cancel_registration(first)
+    assert slot_counter(dm, "14:30") == (1, 0)
+
+    assert dm.uncheck_in_registration(second)
+    assert slot_counter(dm, "14:30") == (1, 0)
+    assert dm.reconcile_slot_counters() == []
+
+
+def test_reconcile_repairs_drifted_counters(dm):
+    dm.add_registration("u1", "Ann", ACTIVITY, "14:30")
+    with dm.pooled_connection() as conn:
+        conn.cursor().execute("UPDATE slot_counters SET booked = 7 WHERE activity = ? AND timeslot = ?", (ACTIVITY, "14:30"))
+        conn.commit()
+
+    drift = dm.reconcile_slot_counters(repair=False)
+    assert drift == [{"activity": ACTIVITY, "timeslot": "14:30", "counted": (1, 0), "stored": (7, 0)}]
+    assert slot_counter(dm, "14:30") == (7, 0)
+
+    assert dm.reconcile_slot_counters() == drift
+    assert slot_counter(dm, "14:30") == (1, 0)
+    assert dm.get_signup_count(ACTIVITY, "14:30") == 1
+
+
+def test_registrations_frame(dm):
+    empty = dm.get_registrations_frame(ACTIVITY, "14:30")
+    assert empty.empty and "registration_passphrase" in empty.columns
+
+    dm.add_registration("u1", "Ann", ACTIVITY, "14:30")
+    dm.add_registration("u2", "Bob", ACTIVITY, "14:30")
+    dm.add_registration("u3", "Cid", ACTIVITY, "14:50")
+    roster = dm.get_registrations_frame(ACTIVITY, "14:30")
+    assert list(roster["participant_name"]) == ["Ann", "Bob"]
+    assert len(dm.get_registrations_frame()) == 3
+
+
+def test_reconcile_reports_a_failed_check_as_none(dm, monkeypatch):
+    def lock_registrations(cursor):
+        raise sqlite3.OperationalError("database is locked")
+    monkeypatch.setattr(dm.get_backend(), "lock_registrations", lock_registrations)
+    assert dm.reconcile_slot_counters(repair=False) is None
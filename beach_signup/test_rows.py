@@ -0,0 +1,31 @@
+import sqlite3
+
+from rows import Registration, ScoreEntry, Team, fetch_all, fetch_columns, fetch_one
+
+
+def test_columns_are_matched_by_name():
+    conn = sqlite3.connect(":memory:")
+    cursor = conn.execute("SELECT 'Sharks' AS name, 3 AS id")
+    assert fetch_one(cursor, Team) == Team(id=3, name="Sharks")
+
+
+def test_partial_select_leaves_missing_fields_none():
+    conn = sqlite3.connect(":memory:")
+    cursor = conn.execute("SELECT 'Sharks' AS team_name, 5 AS score, NULL AS last_updated_time UNION ALL SELECT 'Dolphins', 2, NULL")
+    entries = fetch_all(cursor, ScoreEntry)
+    assert [(entry.team_name, entry.game_name, entry.score) for entry in entries] == [("Sharks", None, 5), ("Dolphins", None, 2)]
+
+
+def test_rows_have_no_instance_dict():
+    registration = Registration(1, "u1", "Ann", "Massage", "14:30", "a-b-c-d", None, 0)
+    assert not hasattr(registration, "__dict__")
+    assert fetch_one(sqlite3.connect(":memory:").execute("SELECT 1 AS id, 'x' AS name WHERE 0"), Team) is None
+
+
+def test_fetch_columns_reads_in_batches():
+    conn = sqlite3.connect(":memory:")
+    cursor = conn.execute("WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 25) SELECT i, i * i AS square FROM n")
+    columns = fetch_columns(cursor, batch_size=10)
+    assert columns["i"] == list(range(1, 26))
+    assert columns["square"][-1] == 625
+    assert fetch_columns(conn.execute("SELECT 1 AS i WHERE 0")) == {"i": []}
@@ -0,0 +1,50 @@
+import pandas as pd
+
+from rows import TeamStanding
+from scoreboard import changed_cells, score_matrix, scoreboard_table
+
+TEAMS = ["Dolphins", "Sharks", "Turtles"]
+GAMES = ["Raft Building", "Sandcastle"]
+
+
+def scores(*rows):
+    return pd.DataFrame(rows, columns=["team_name", "game_name", "score"])
+
+
+def test_matrix_fills_missing_pairs_with_zero():
+    matrix = score_matrix(scores(("Sharks", "Sandcastle", 4), ("Dolphins", "Raft Building", 2)), TEAMS, GAMES)
+    assert list(matrix.index) == TEAMS and list(matrix.columns) == GAMES
+    assert matrix.loc["Sharks"].tolist() == [0, 4]
+    assert matrix.loc["Turtles"].tolist() == [0, 0]
+    assert score_matrix(scores(), TEAMS, GAMES).to_numpy().sum() == 0
+
+
+def test_table_follows_standings():
+    matrix = score_matrix(scores(("Sharks", "Sandcastle", 4)), TEAMS, GAMES)
+    standings = [TeamStanding("Sharks", 4, 1, None), TeamStanding("Dolphins", 0, 2, None), TeamStanding("Turtles", 0, 2, None)]
+    table = scoreboard_table(matrix, standings)
+    assert list(table.index) == ["Sharks", "Dolphins", "Turtles"]
+    assert table["Total Score"].tolist() == [4, 0, 0]
+
+
+def test_teams_without_standings_are_kept():
+    matrix = score_matrix(scores(("Sharks", "Sandcastle", 4), ("Turtles", "Raft Building", 6)), TEAMS, GAMES)
+    standings = [TeamStanding("Sharks", 4, 1, None), TeamStanding("Dolphins", 0, 2, None)]
+    table = scoreboard_table(matrix, standings)
+    assert list(table.index) == ["Sharks", "Dolphins", "Turtles"]
+    assert table["Total Score"].tolist() == [4, 0, 6]
+    assert table.loc["Turtles", "Raft Building"] == 6
+
+
+def test_changed_cells_reports_only_deltas():
+    original = score_matrix(scores(("Sharks", "Sandcastle", 4)), TEAMS, GAMES)
+    edited = original.copy().astype(object)
+    edited.loc["Sharks", "Sandcastle"] = 7
+    edited.loc["Dolphins", "Raft Building"] = "3"
+    edited.loc["Turtles", "Sandcastle"] = "lots"
+    edited.loc["Whales"] = [1, 1]
+
+    changes, problems = changed_cells(original, edited)
+    assert sorted(changes) == [("Dolphins", "Raft Building", 3), ("Sharks", "Sandcastle", 7)]
+    assert sorted(problems, key=str) == [("Turtles", "Sandcastle"), ("Whales", None)]
+    assert changed_cells(original, original.copy()) == ([], [])
@@ -0,0 +1,81 @@
+import dataclasses
+import os
+import time
+
+import pandas as pd
+import pytest
+
+from rows import TeamStanding
+from scoreboard import score_matrix
+from scoreboard_broadcast import ScoreboardBroadcaster, freeze_scoreboard
+
+NO_SCORES = score_matrix(pd.DataFrame(columns=["team_name", "game_name", "score"]), [], [])
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_rebuilds_only_when_version_changes():
+    version = [1]
+    builds = []
+
+    def load_snapshot(v):
+        builds.append(v)
+        return freeze_scoreboard(v, [], NO_SCORES)
+
+    broadcaster = ScoreboardBroadcaster(lambda: version[0], load_snapshot, interval=0.01)
+    try:
+        assert broadcaster.version is None
+        assert broadcaster.current().version == 1
+        assert broadcaster.version == 1
+        wait_for(lambda: broadcaster.polls >= 5)
+        assert builds == [1]
+
+        version[0] = 2
+        wait_for(lambda: broadcaster.current().version == 2)
+        assert builds == [1, 2]
+    finally:
+        broadcaster.stop()
+
+
+def test_snapshot_is_read_only():
+    standing = TeamStanding(team_name="Sharks", total_score=3, standing_rank=1, last_changed_time=None)
+    matrix = score_matrix(pd.DataFrame([("Sharks", "Raft", 3)], columns=["team_name", "game_name", "score"]), ["Sharks"], ["Raft"])
+    snapshot = freeze_scoreboard(1, [standing], matrix)
+    assert snapshot.table.loc["Sharks", "Total Score"] == 3
+    with pytest.raises(TypeError):
+        snapshot.score_data["Sharks"]["Raft"] = 10
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        snapshot.standings[0].total_score = 10
+
+
+def test_score_writes_reach_the_shared_snapshot(dm):
+    dm.add_team("Sharks")
+    dm.add_competitive_game("Sandcastle")
+    first = dm.get_scoreboard_snapshot()
+    assert first.standings[0].total_score == 0
+
+    dm.add_points(dm.get_competitive_games()[0].id, dm.get_teams()[0].id, 4)
+    wait_for(lambda: dm.get_scoreboard_snapshot().version > first.version)
+    snapshot = dm.get_scoreboard_snapshot()
+    assert snapshot.score_data["Sharks"]["Sandcastle"] == 4
+    assert snapshot.standings[0].total_score == 4
+
+
+def test_scores_page_redraws_only_for_a_new_version(dm):
+    from streamlit.testing.v1 import AppTest
+
+    dm.add_team("Sharks")
+    dm.add_competitive_game("Sandcastle")
+    at = AppTest.from_file(os.path.join(os.path.dirname(os.path.abspath(__file__)), "pages", "5_Competitive_Scores.py")).run()
+    assert not at.exception
+    shown = at.session_state["scoreboard_version"]
+    assert shown == dm.get_published_scoreboard_version()
+
+    dm.add_points(dm.get_competitive_games()[0].id, dm.get_teams()[0].id, 4)
+    wait_for(lambda: dm.get_published_scoreboard_version() > shown)
+    assert at.run().session_state["scoreboard_version"] == dm.get_published_scoreboard_version()
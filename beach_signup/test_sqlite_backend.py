@@ -0,0 +1,242 @@
+import random
+import sqlite3
+import threading
+
+from db_backends import SQLiteBackend
+from rows import TeamTotal
+
+ACTIVITY = "Massage by SAVH"
+
+
+def test_add_registration_statuses(dm):
+    assert dm.create_participant("u1", "Alice")
+    reg_id, passphrase, status = dm.add_registration("u1", "Alice", ACTIVITY, "14:30")
+    assert status == "SUCCESS"
+    assert isinstance(reg_id, int) and len(passphrase.split("-")) == 4
+    assert dm.get_registration_by_passphrase(passphrase).id == reg_id
+    assert dm.add_registration("u1", "Alice", ACTIVITY, "14:50") == (None, None, "LIMIT_REACHED")
+    assert dm.get_signup_count(ACTIVITY, "14:30") == 1
+
+
+def test_duplicate_slot_is_already_booked(dm):
+    dm.create_participant("u1", "Alice")
+    conn = dm.get_db_connection()
+    try:
+        conn.cursor().execute(
+            "INSERT INTO registrations (user_id, participant_name, activity, timeslot, registration_passphrase, registration_time) "
+            "VALUES ('u1', 'Alice', ?, '14:30', 'a-b-c-d', '2025-07-10 13:30:00')", (ACTIVITY,)
+        )
+        conn.commit()
+    finally:
+        conn.close()
+    backend = dm.get_backend()
+    conn = backend.connect()
+    try:
+        conn.execute(
+            "INSERT INTO registrations (user_id, participant_name, activity, timeslot, registration_passphrase, registration_time) "
+            "VALUES ('u1', 'Alice', ?, '14:30', 'e-f-g-h', '2025-07-10 13:30:00')", (ACTIVITY,)
+        )
+    except sqlite3.IntegrityError as e:
+        assert backend.is_unique_violation(e)
+    else:
+        raise AssertionError("expected a unique violation")
+    finally:
+        conn.close()
+
+
+def test_check_in_and_cancel(dm):
+    dm.create_participant("u1", "Alice")
+    reg_id, _, _ = dm.add_registration("u1", "Alice", ACTIVITY, "14:30")
+    assert dm.check_in_registration(reg_id)
+    assert not dm.check_in_registration(reg_id)
+    assert dm.get_checked_in_count() == 1
+    assert dm.uncheck_in_registration(reg_id)
+    assert dm.cancel_registration(reg_id)
+    assert dm.get_user_registrations("u1") == []
+
+
+def test_scores_and_cascading_deletes(dm):
+    assert dm.add_team("Sharks") and dm.add_team("Dolphins")
+    assert not dm.add_team("Sharks")
+    assert dm.add_competitive_game("Raft Building")
+    teams = {t.name: t.id for t in dm.get_teams()}
+    game_id = dm.get_competitive_games()[0].id
+    assert dm.update_score(game_id, teams["Sharks"], 5)
+    assert dm.update_score(game_id, teams["Sharks"], 7)
+    score_data, game_names, team_names = dm.get_all_scores()
+    assert score_data["Sharks"]["Raft Building"] == 7
+    assert score_data["Dolphins"]["Raft Building"] == 0
+    assert dm.get_team_total_scores()[0] == TeamTotal(team_name="Sharks", total_score=7)
+    assert dm.delete_competitive_game(game_id)
+    assert dm.get_scores_for_team(teams["Sharks"]) == []
+
+
+def test_bulk_score_update_is_one_transaction(dm):
+    for name in ["Sharks", "Dolphins"]:
+        dm.add_team(name)
+    for name in ["Raft Building", "Sandcastle"]:
+        dm.add_competitive_game(name)
+    teams = {t.name: t.id for t in dm.get_teams()}
+    games = {g.name: g.id for g in dm.get_competitive_games()}
+    dm.update_score(games["Raft Building"], teams["Sharks"], 1)
+
+    assert dm.update_scores_bulk([
+        (games["Raft Building"], teams["Sharks"], 4),
+        (games["Sandcastle"], teams["Sharks"], 2),
+        (games["Sandcastle"], teams["Dolphins"], 3),
+        (games["Sandcastle"], teams["Dolphins"], 6), # Last one wins
+    ])
+    score_data, _, _ = dm.get_all_scores()
+    assert score_data["Sharks"] == {"Raft Building": 4, "Sandcastle": 2}
+    assert score_data["Dolphins"] == {"Raft Building": 0, "Sandcastle": 6}
+
+    # An unknown team fails the foreign key and nothing in the batch is saved
+    assert not dm.update_scores_bulk([(games["Raft Building"], teams["Sharks"], 9), (games["Raft Building"], 999, 1)])
+    assert dm.get_all_scores()[0]["Sharks"]["Raft Building"] == 4
+
+    frame = dm.get_scores_frame()
+    assert list(frame.columns) == ["team_name", "game_name", "score", "last_updated_time"]
+    assert frame.loc[(frame.team_name == "Dolphins") & (frame.game_name == "Sandcastle"), "score"].tolist() == [6]
+
+
+def test_concurrent_add_points_lose_no_updates(dm):
+    dm.add_team("Sharks")
+    dm.add_competitive_game("Captain Ball")
+    team_id = dm.get_teams()[0].id
+    game_id = dm.get_competitive_games()[0].id
+
+    threads = [threading.Thread(target=dm.add_points, args=(game_id, team_id, 2)) for _ in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert dm.add_points(game_id, team_id, -5) == 35
+    assert dm.get_scores_for_team(team_id)[0].score == 35
+
+
+def test_standings_follow_score_changes(dm):
+    for name in ["Sharks", "Dolphins", "Turtles"]:
+        dm.add_team(name)
+    for name in ["Raft Building", "Sandcastle"]:
+        dm.add_competitive_game(name)
+    teams = {t.name: t.id for t in dm.get_teams()}
+    games = {g.name: g.id for g in dm.get_competitive_games()}
+
+    def ranking():
+        return [(row.team_name, row.total_score, row.standing_rank) for row in dm.get_team_standings()]
+
+    assert ranking() == [("Dolphins", 0, 1), ("Sharks", 0, 1), ("Turtles", 0, 1)]
+    dm.update_scores_bulk([
+        (games["Raft Building"], teams["Sharks"], 5),
+        (games["Raft Building"], teams["Dolphins"], 5),
+        (games["Sandcastle"], teams["Turtles"], 3),
+    ])
+    assert ranking() == [("Dolphins", 5, 1), ("Sharks", 5, 1), ("Turtles", 3, 2)]
+
+    dm.add_points(games["Sandcastle"], teams["Turtles"], 4)
+    assert ranking() == [("Turtles", 7, 1), ("Dolphins", 5, 2), ("Sharks", 5, 2)]
+
+    dm.delete_competitive_game(games["Sandcastle"])
+    assert ranking() == [("Dolphins", 5, 1), ("Sharks", 5, 1), ("Turtles", 0, 2)]
+    dm.delete_team(teams["Dolphins"])
+    assert ranking() == [("Sharks", 5, 1), ("Turtles", 0, 2)]
+
+
+def test_one_score_change_reranks_every_team_below_it(dm):
+    # Why score writers lock all of team_standings: Sharks moving from 20 to 30 empties the
+    # 20 rank, so Turtles and Crabs move up although their scores are outside that band
+    for name in ["Dolphins", "Sharks", "Turtles", "Crabs"]:
+        dm.add_team(name)
+    dm.add_competitive_game("Raft Building")
+    teams = {t.name: t.id for t in dm.get_teams()}
+    game_id = dm.get_competitive_games()[0].id
+    dm.update_scores_bulk([(game_id, teams["Dolphins"], 30), (game_id, teams["Sharks"], 20), (game_id, teams["Turtles"], 10)])
+    ranks = lambda: {row.team_name: row.standing_rank for row in dm.get_team_standings()}
+    assert ranks() == {"Dolphins": 1, "Sharks": 2, "Turtles": 3, "Crabs": 4}
+
+    dm.add_points(game_id, teams["Sharks"], 10)
+    assert ranks() == {"Dolphins": 1, "Sharks": 1, "Turtles": 2, "Crabs": 3}
+
+
+def test_band_reranking_matches_a_full_rerank(dm):
+    for i in range(8):
+        dm.add_team(f"Team {i}")
+    for name in ["Raft Building", "Sandcastle"]:
+        dm.add_competitive_game(name)
+    team_ids = [t.id for t in dm.get_teams()]
+    game_ids = [g.id for g in dm.get_competitive_games()]
+    rng = random.Random(7)
+    for step in range(200):
+        # Small values so totals keep tying, splitting and crossing each other
+        if step % 3:
+            dm.add_points(rng.choice(game_ids), rng.choice(team_ids), rng.randint(-3, 3))
+        else:
+            dm.update_scores_bulk([(rng.choice(game_ids), rng.choice(team_ids), rng.randint(-2, 6)) for _ in range(3)])
+        rows = dm.get_team_standings()
+        distinct = sorted({row.total_score for row in rows}, reverse=True)
+        assert [row.standing_rank for row in rows] == [distinct.index(row.total_score) + 1 for row in rows]
+
+
+def test_concurrent_score_writes_keep_dense_ranks(dm):
+    for name in ["Dolphins", "Sharks", "Turtles", "Crabs", "Gulls"]:
+        dm.add_team(name)
+    for name in ["Raft Building", "Sandcastle", "Captain Ball"]:
+        dm.add_competitive_game(name)
+    team_ids = {t.name: t.id for t in dm.get_teams()}
+    game_ids = [g.id for g in dm.get_competitive_games()]
+    ids = list(team_ids.values())
+
+    def judge(station):
+        for i in range(10):
+            dm.add_points(game_ids[station % len(game_ids)], ids[(station + i) % len(ids)], (station * 7 + i) % 5 - 1)
+
+    threads = [threading.Thread(target=judge, args=(station,)) for station in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    rows = dm.get_team_standings()
+    distinct = sorted({row.total_score for row in rows}, reverse=True)
+    for row in rows:
+        assert row.total_score == sum(score.score for score in dm.get_scores_for_team(team_ids[row.team_name]))
+        assert row.standing_rank == distinct.index(row.total_score) + 1
+
+
+def test_index_report_plans_the_statements_the_app_runs(dm):
+    from instrumentation import normalize_sql
+
+    dm.add_team("Sharks")
+    team_id = dm.get_teams()[0].id
+    instrumentation = dm.get_instrumentation()
+    instrumentation.reset()
+    dm.get_registrations_for_timeslot("Massage by SAVH", "14:30")
+    dm.get_signup_count("Massage by SAVH", "not-a-slot") # Unconfigured slots are counted directly
+    dm.reconcile_slot_counters(repair=False)
+    dm.get_user_registrations("u1")
+    dm.get_checked_in_count()
+    dm.get_checked_in_count_for_activity("Massage by SAVH")
+    dm.get_scores_for_team(team_id)
+    dm.get_team_total_scores()
+    dm.get_team_standings()
+
+    executed = set(instrumentation.snapshot()["statements"])
+    assert {normalize_sql(sql) for sql, _ in dm.INDEXED_QUERIES} <= executed
+
+
+def test_wal_mode(tmp_path):
+    conn = SQLiteBackend(str(tmp_path / "x.db")).connect()
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    conn.close()
+
+
+def test_initialize_creates_indexes_used_by_hot_queries(dm):
+    assert dm.get_index_report() == {"missing": [], "unused": []}
+
+    with dm.pooled_connection() as conn:
+        conn.cursor().execute("DROP INDEX IX_registrations_user_time")
+        conn.commit()
+    assert dm.get_index_report()["missing"] == ["IX_registrations_user_time"]
+
+    dm.create_missing_indexes()
+    assert dm.get_index_report()["missing"] == []